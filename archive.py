@@ -0,0 +1,261 @@
+import os
+import sqlite3
+import sys
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+from config import Config
+
+# Time-partitioned archival of check_records and check_events. Months older
+# than the hot window (Config.ARCHIVE_HOT_MONTHS) move out of the main
+# database into one archive file per year, archives/check_records_<YYYY>.db,
+# next to it. The archive_partitions catalog in the main database records
+# every archived month, so readers attach only the files whose months
+# overlap the date range they ask for.
+
+ARCHIVE_COLUMNS = "id, gadget_id, check_in_time, check_out_time, status, event_time"
+ARCHIVE_EVENT_COLUMNS = "id, gadget_id, event_type, event_time, officer_id, check_record_id"
+
+# SQLite attaches at most 10 databases per connection by default
+MAX_ATTACHED = 9
+
+ARCHIVE_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS {schema}.check_records (
+        id INTEGER PRIMARY KEY,
+        gadget_id INTEGER,
+        check_in_time TIMESTAMP,
+        check_out_time TIMESTAMP,
+        status TEXT NOT NULL,
+        event_time TIMESTAMP
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_check_records_event_time ON check_records (event_time)",
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_check_records_gadget_id ON check_records (gadget_id)",
+    '''CREATE INDEX IF NOT EXISTS {schema}.idx_check_records_in_date
+       ON check_records (DATE(check_in_time), strftime('%H', check_in_time))''',
+    '''
+    CREATE TABLE IF NOT EXISTS {schema}.check_events (
+        id INTEGER PRIMARY KEY,
+        gadget_id INTEGER NOT NULL,
+        event_type TEXT NOT NULL,
+        event_time TIMESTAMP NOT NULL,
+        officer_id INTEGER,
+        check_record_id INTEGER
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_check_events_gadget_time ON check_events (gadget_id, event_time)",
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_check_events_time ON check_events (event_time)",
+]
+
+def create_archive_catalog(cursor):
+    """Catalog of archived months: [start_time, end_time) lives in file_name"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS archive_partitions (
+            period TEXT PRIMARY KEY,
+            file_name TEXT NOT NULL,
+            start_time TEXT NOT NULL,
+            end_time TEXT NOT NULL,
+            row_count INTEGER NOT NULL DEFAULT 0,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_archive_partitions_range ON archive_partitions (start_time, end_time)")
+
+def archive_dir(conn):
+    """Archive directory next to the connection's main database file"""
+    main_file = next(row[2] for row in conn.execute("PRAGMA database_list") if row[1] == "main")
+    return os.path.join(os.path.dirname(main_file) or ".", Config.ARCHIVE_DIR)
+
+def _month_start(year, month):
+    return f"{year:04d}-{month:02d}-01 00:00:00"
+
+def _shift_month(year, month, months):
+    index = year * 12 + (month - 1) + months
+    return index // 12, index % 12 + 1
+
+def _file_for(period):
+    return f"check_records_{period[:4]}.db"
+
+def archive_closed_months(conn, hot_months=None, today=None):
+    """Move check_records and check_events older than the hot window into
+    the yearly archives.
+
+    Each month of both tables is copied and committed to its archive file
+    first, then deleted from the main database together with its catalog
+    row in one transaction, and only
+    for ids the archive holds, so a crash in between leaves rows in both
+    places (and the next run finishes the move) rather than losing any.
+    Must be called with no transaction open. Returns {period: check records
+    moved}.
+    """
+    hot_months = Config.ARCHIVE_HOT_MONTHS if hot_months is None else hot_months
+    today = today or date.today()
+    cutoff = _month_start(*_shift_month(today.year, today.month, -hot_months))
+
+    periods = [row[0] for row in conn.execute('''
+        SELECT substr(event_time, 1, 7) FROM check_records WHERE event_time < ?
+        UNION
+        SELECT substr(event_time, 1, 7) FROM check_events WHERE event_time < ?
+        ORDER BY 1
+    ''', (cutoff, cutoff))]
+    if not periods:
+        return {}
+
+    directory = archive_dir(conn)
+    os.makedirs(directory, exist_ok=True)
+    moved = {}
+
+    for period in periods:
+        year, month = int(period[:4]), int(period[5:7])
+        start = _month_start(year, month)
+        end = _month_start(*_shift_month(year, month, 1))
+        file_name = _file_for(period)
+
+        conn.execute("ATTACH DATABASE ? AS archive_target", (os.path.join(directory, file_name),))
+        try:
+            # 1. Copy into the archive file
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for statement in ARCHIVE_SCHEMA:
+                    conn.execute(statement.format(schema="archive_target"))
+                conn.execute(f'''
+                    INSERT OR IGNORE INTO archive_target.check_records ({ARCHIVE_COLUMNS})
+                    SELECT {ARCHIVE_COLUMNS} FROM main.check_records
+                    WHERE event_time >= ? AND event_time < ?
+                ''', (start, end))
+                conn.execute(f'''
+                    INSERT OR IGNORE INTO archive_target.check_events ({ARCHIVE_EVENT_COLUMNS})
+                    SELECT {ARCHIVE_EVENT_COLUMNS} FROM main.check_events
+                    WHERE event_time >= ? AND event_time < ?
+                ''', (start, end))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+            # 2. Drop what the archive now holds and register the month
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = conn.execute('''
+                    DELETE FROM main.check_records
+                    WHERE event_time >= ? AND event_time < ?
+                      AND id IN (SELECT id FROM archive_target.check_records
+                                 WHERE event_time >= ? AND event_time < ?)
+                ''', (start, end, start, end))
+                moved[period] = cursor.rowcount
+                conn.execute('''
+                    DELETE FROM main.check_events
+                    WHERE event_time >= ? AND event_time < ?
+                      AND id IN (SELECT id FROM archive_target.check_events
+                                 WHERE event_time >= ? AND event_time < ?)
+                ''', (start, end, start, end))
+                row_count = conn.execute('''
+                    SELECT COUNT(*) FROM archive_target.check_records
+                    WHERE event_time >= ? AND event_time < ?
+                ''', (start, end)).fetchone()[0]
+                conn.execute('''
+                    INSERT INTO archive_partitions (period, file_name, start_time, end_time, row_count)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(period) DO UPDATE SET
+                        row_count = excluded.row_count,
+                        archived_at = CURRENT_TIMESTAMP
+                ''', (period, file_name, start, end, row_count))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        finally:
+            conn.execute("DETACH DATABASE archive_target")
+
+    return moved
+
+def archive_files(conn, start_date=None, end_date=None):
+    """Archive files holding months that overlap [start_date, end_date].
+
+    Dates are 'YYYY-MM-DD' strings (inclusive); None leaves that side open.
+    Returns [] when the database has no archive catalog.
+    """
+    start_bound = f"{start_date} 00:00:00" if start_date else None
+    end_bound = None
+    if end_date:
+        end_bound = (datetime.strptime(str(end_date)[:10], '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d 00:00:00')
+    try:
+        rows = conn.execute('''
+            SELECT DISTINCT file_name FROM archive_partitions
+            WHERE (? IS NULL OR end_time > ?) AND (? IS NULL OR start_time < ?)
+            ORDER BY file_name
+        ''', (start_bound, start_bound, end_bound, end_bound)).fetchall()
+    except sqlite3.OperationalError:
+        return []
+    return [row[0] for row in rows]
+
+@contextmanager
+def archived_source(conn, table, columns, start_date=None, end_date=None):
+    """FROM-clause source for ``table`` across hot and archived months.
+
+    Attaches only the archive files overlapping the date range and yields
+    either ``table`` (nothing archived in range) or a UNION ALL subquery
+    aliased as ``table``; SQLite pushes the caller's WHERE into each arm,
+    so every file is searched through its own indexes. Archive files
+    written before ``table`` was archived are skipped. Archives are
+    detached again on exit.
+    """
+    files = archive_files(conn, start_date, end_date)
+    if not files:
+        yield table
+        return
+    if len(files) > MAX_ATTACHED:
+        raise ValueError(f"Date range spans {len(files)} archive files; at most {MAX_ATTACHED} can be queried at once")
+
+    directory = archive_dir(conn)
+    aliases = []
+    try:
+        for file_name in files:
+            path = os.path.join(directory, file_name)
+            if not os.path.exists(path):
+                print(f"⚠️ Archive file missing: {path}")
+                continue
+            alias = f"archive_{os.path.splitext(file_name)[0].rsplit('_', 1)[-1]}"
+            conn.execute("ATTACH DATABASE ? AS " + alias, (path,))
+            aliases.append(alias)
+
+        arms = [f"SELECT {columns} FROM main.{table}"]
+        for alias in aliases:
+            if conn.execute(f"SELECT 1 FROM {alias}.sqlite_master WHERE type = 'table' AND name = ?",
+                            (table,)).fetchone():
+                arms.append(f"SELECT {columns} FROM {alias}.{table}")
+        yield "(" + " UNION ALL ".join(arms) + f") AS {table}"
+    finally:
+        for alias in aliases:
+            conn.execute(f"DETACH DATABASE {alias}")
+
+def check_records_source(conn, start_date=None, end_date=None):
+    """FROM-clause source for check_records across hot and archived months"""
+    return archived_source(conn, "check_records", ARCHIVE_COLUMNS, start_date, end_date)
+
+def check_events_source(conn, start_date=None, end_date=None):
+    """FROM-clause source for check_events across hot and archived months"""
+    return archived_source(conn, "check_events", ARCHIVE_EVENT_COLUMNS, start_date, end_date)
+
+def run_archival(db_path=None, vacuum=False):
+    """Archive closed months of the main database; used by the service scheduler"""
+    conn = sqlite3.connect(db_path or Config.DATABASE_PATH, timeout=Config.DB_BUSY_TIMEOUT_MS / 1000.0)
+    try:
+        moved = archive_closed_months(conn)
+        for period, count in moved.items():
+            print(f"📦 Archived {count} check records from {period}")
+        if moved and vacuum:
+            conn.execute("VACUUM")
+            print("✅ Hot database compacted")
+        return moved
+    except Exception as e:
+        print(f"❌ Archival failed: {e}")
+        return {}
+    finally:
+        conn.close()
+
+# Archive closed months now: python archive.py [--vacuum]
+if __name__ == "__main__":
+    moved = run_archival(vacuum="--vacuum" in sys.argv)
+    print(f"✅ Archived {sum(moved.values())} check records from {len(moved)} months")
@@ -0,0 +1,265 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl
+
+from a2wsgi import WSGIMiddleware
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+
+from config import Config
+from registrations import (RegistrationError, PHOTO_FIELDS, REGISTRATION_SUBMITTED, parse_registration_form,
+                           save_registration, validate_api_registration, save_web_registration,
+                           registration_failure_message)
+from thumbnails import get_thumbnail_service
+from web_server import app as flask_app, photo_store, allowed_file
+from write_queue import get_write_queue, WriteQueueFull
+
+# Asyncio intake for registration bursts (Config.WEB_SERVER = "uvicorn").
+# POST /register and /api/register are handled here without holding a
+# thread per request: uploaded photos stream into the photo store through a
+# small file executor, and the database work goes to the group-commit
+# writer (write_queue.py), which applies concurrent registrations in shared
+# transactions. Once INTAKE_QUEUE_SIZE registrations are in progress new
+# ones get 429 with Retry-After before their body is read. Every other
+# route is served by the Flask app in web_server.py.
+
+UPLOAD_FLUSH_BYTES = 256 * 1024  # Upload data buffered before a file write
+
+class IntakeBusy(Exception):
+    """The intake queue is full; the client should retry later"""
+
+
+class RequestTooLarge(Exception):
+    pass
+
+
+class RegistrationIntake:
+    """Bounds the registrations in progress and keeps their I/O off the event loop"""
+
+    def __init__(self, db_path=None, queue_size=None, file_workers=None):
+        self.db_path = db_path or Config.DATABASE_PATH
+        self.queue_size = queue_size or Config.INTAKE_QUEUE_SIZE
+        self.file_executor = ThreadPoolExecutor(max_workers=file_workers or Config.INTAKE_FILE_WORKERS,
+                                                thread_name_prefix="intake-files")
+        self.in_flight = 0
+
+    def stop(self):
+        self.file_executor.shutdown(wait=True)
+
+    def admit(self):
+        """Reserve a slot for one registration, or raise IntakeBusy"""
+        if self.in_flight >= self.queue_size:
+            raise IntakeBusy()
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight -= 1
+
+    async def run_file(self, func, *args):
+        """Run blocking file I/O on the file executor"""
+        return await asyncio.get_running_loop().run_in_executor(self.file_executor, func, *args)
+
+    async def write(self, func, *args):
+        """Apply func(conn, *args) in the next group commit and wait for its result"""
+        try:
+            future = get_write_queue(self.db_path).submit(func, *args)
+        except WriteQueueFull:
+            raise IntakeBusy()
+        return await asyncio.wrap_future(future)
+
+    async def discard_photos(self, paths):
+        """Remove photos kept for a registration that was not saved"""
+        paths = list(paths)
+        if not paths:
+            return
+        try:
+            await self.write(photo_store.discard_unreferenced, paths)
+        except Exception as e:
+            print(f"⚠️ Could not remove unused photos: {e}")
+
+
+intake = RegistrationIntake()
+wsgi_app = WSGIMiddleware(flask_app, workers=Config.WEB_THREADS)
+
+def _header(scope, name):
+    for key, value in scope.get('headers', ()):
+        if key == name:
+            return value.decode('latin-1')
+    return ''
+
+async def _send_json(send, status, payload, headers=()):
+    body = json.dumps(payload).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'),
+                    (b'content-length', str(len(body)).encode())] + list(headers),
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+async def _send_busy(send, payload):
+    await _send_json(send, 429, payload,
+                     [(b'retry-after', str(Config.INTAKE_RETRY_AFTER_SECONDS).encode())])
+
+async def _body_chunks(receive):
+    """Request body chunks, enforcing Config.MAX_FILE_SIZE"""
+    total = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise ConnectionResetError("Client disconnected")
+        chunk = message.get('body', b'')
+        total += len(chunk)
+        if total > Config.MAX_FILE_SIZE:
+            raise RequestTooLarge()
+        more_body = message.get('more_body', False)
+        yield chunk, more_body
+        if not more_body:
+            return
+
+async def _read_body(receive):
+    return b''.join([chunk async for chunk, _ in _body_chunks(receive)])
+
+async def _read_form(scope, receive, spools):
+    """(form, files) from a form post; uploads are written straight into
+    photo store spool files (appended to ``spools``) as they arrive"""
+    mimetype, options = parse_options_header(_header(scope, b'content-type'))
+    if mimetype == 'application/x-www-form-urlencoded':
+        return dict(parse_qsl((await _read_body(receive)).decode('utf-8'))), {}
+    if mimetype != 'multipart/form-data' or 'boundary' not in options:
+        raise RegistrationError('Unsupported form encoding')
+
+    decoder = MultipartDecoder(options['boundary'].encode('latin-1'),
+                               max_form_memory_size=Config.MAX_FILE_SIZE)
+    form, files = {}, {}
+    part, buffer = None, bytearray()
+
+    async for chunk, more_body in _body_chunks(receive):
+        decoder.receive_data(chunk)
+        if not more_body:
+            decoder.receive_data(None)
+        event = decoder.next_event()
+        while not isinstance(event, (NeedData, Epilogue)):
+            if isinstance(event, File):
+                part = await intake.run_file(photo_store.spool)
+                spools.append(part)
+                files[event.name] = (part, event.filename)
+            elif isinstance(event, Field):
+                part = event.name
+            elif isinstance(event, Data):
+                buffer += event.data
+                if isinstance(part, str):
+                    if not event.more_data:
+                        form[part] = buffer.decode('utf-8')
+                        buffer = bytearray()
+                elif len(buffer) >= UPLOAD_FLUSH_BYTES or not event.more_data:
+                    await intake.run_file(part.write, bytes(buffer))
+                    buffer = bytearray()
+            event = decoder.next_event()
+        if isinstance(event, Epilogue):
+            break
+    return form, files
+
+async def register(scope, receive, send):
+    """POST /register: multipart form with up to three photos"""
+    try:
+        intake.admit()
+    except IntakeBusy:
+        await _send_busy(send, {'success': False, 'message': 'Too many registrations right now, please try again shortly'})
+        return
+
+    spools = []
+    try:
+        form, files = await _read_form(scope, receive, spools)
+        student_data, gadget_data = parse_registration_form(form)
+
+        # Keeping a photo is a rename within the store, done by the writer
+        # together with the insert; the serial number is checked in the same
+        # transaction
+        uploads = {}
+        for field in PHOTO_FIELDS:
+            spool, filename = files.get(field, (None, None))
+            if spool is not None and filename and allowed_file(filename):
+                uploads[field] = (spool, filename)
+
+        stored_photos = {}
+        try:
+            record_number = await intake.write(photo_store.commit_and_save, uploads, stored_photos,
+                                               save_registration, student_data, gadget_data)
+        except Exception:
+            await intake.discard_photos(stored_photos.values())
+            raise
+        get_thumbnail_service().submit(*stored_photos.values())
+        await _send_json(send, 200, {
+            'success': True,
+            'message': REGISTRATION_SUBMITTED,
+            'record_number': record_number
+        })
+    except IntakeBusy:
+        await _send_busy(send, {'success': False, 'message': 'Too many registrations right now, please try again shortly'})
+    except RequestTooLarge:
+        await _send_json(send, 413, {'success': False, 'message': 'Upload too large'})
+    except ConnectionResetError:
+        pass
+    except Exception as e:
+        await _send_json(send, 200, {'success': False, 'message': registration_failure_message(e)})
+    finally:
+        for spool in spools:
+            # Deletes the temp file unless the store kept it
+            await intake.run_file(spool.close)
+        intake.release()
+
+async def api_register(scope, receive, send):
+    """POST /api/register: JSON submission staged in web_registrations"""
+    try:
+        intake.admit()
+    except IntakeBusy:
+        await _send_busy(send, {'error': 'Too many registrations right now, please try again shortly'})
+        return
+
+    try:
+        try:
+            data = json.loads(await _read_body(receive) or b'null')
+        except ValueError:
+            raise RegistrationError('Expected a JSON object')
+        validate_api_registration(data)
+        record_id = await intake.write(save_web_registration, data)
+        await _send_json(send, 200, {
+            'success': True,
+            'message': 'Registration submitted successfully!',
+            'id': record_id
+        })
+    except IntakeBusy:
+        await _send_busy(send, {'error': 'Too many registrations right now, please try again shortly'})
+    except RequestTooLarge:
+        await _send_json(send, 413, {'error': 'Request too large'})
+    except RegistrationError as e:
+        await _send_json(send, 400, {'error': str(e)})
+    except ConnectionResetError:
+        pass
+    except Exception as e:
+        await _send_json(send, 500, {'error': f'Registration failed: {str(e)}'})
+    finally:
+        intake.release()
+
+INTAKE_ROUTES = {'/register': register, '/api/register': api_register}
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            intake.stop()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def app(scope, receive, send):
+    """ASGI entry point: registration posts here, everything else to Flask"""
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+    elif scope['type'] == 'http' and scope['method'] == 'POST' and scope['path'] in INTAKE_ROUTES:
+        await INTAKE_ROUTES[scope['path']](scope, receive, send)
+    else:
+        await wsgi_app(scope, receive, send)
@@ -1,9 +1,9 @@
 import hashlib
-from database import Database
+from database import get_database
 
 class AuthSystem:
     def __init__(self):
-        self.db = Database()
+        self.db = get_database()
         self.current_user = None
     
     def login(self, username, password):
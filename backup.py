@@ -0,0 +1,175 @@
+import gzip
+import hashlib
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+from config import Config
+
+# Online backups through SQLite's backup API. Pages are copied a batch at a
+# time with a pause in between, so the source database stays writable for
+# the whole run and the copy is always a consistent snapshot (a file copy of
+# a live database can catch it mid-write). Every backup gets a .sha256
+# sidecar that verify() checks before the backup is trusted or restored.
+#
+# A write from another connection restarts a stepped copy from the first
+# page. After BACKUP_MAX_RESTARTS restarts (or BACKUP_MAX_SECONDS) the copy
+# is redone in a single step, which holds a read snapshot for its duration
+# instead (in WAL mode writers are not blocked by it).
+
+# Microseconds keep two backups started in the same second (the service and
+# a manual run) from overwriting each other; older names lack them
+BACKUP_PATTERN = re.compile(r"^backup_(\d{8}_\d{6})(?:_(\d{6}))?\.db(\.gz)?$")
+
+class BackupRestarted(Exception):
+    """Concurrent writes kept restarting the stepped copy"""
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BackupEngine:
+    """Creates, verifies and prunes backups of one database file"""
+
+    def __init__(self, db_path=None, backup_dir=None):
+        self.db_path = db_path or Config.DATABASE_PATH
+        self.backup_dir = backup_dir or Config.BACKUP_DIR
+        os.makedirs(self.backup_dir, exist_ok=True)
+
+    def create_backup(self, compress=None, progress=None):
+        """Snapshot the database; returns the backup path.
+
+        The copy is integrity-checked before it is compressed (optional),
+        checksummed and renamed into place, so a listed backup is complete.
+        """
+        compress = Config.BACKUP_COMPRESS if compress is None else compress
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        backup_path = os.path.join(self.backup_dir, f"backup_{timestamp}.db")
+        tmp_path = backup_path + ".tmp"
+
+        source = sqlite3.connect(self.db_path, timeout=Config.DB_BUSY_TIMEOUT_MS / 1000.0)
+        target = sqlite3.connect(tmp_path)
+        try:
+            try:
+                source.backup(target, pages=Config.BACKUP_PAGES_PER_STEP, sleep=Config.BACKUP_STEP_SLEEP,
+                              progress=self._bounded_progress(progress))
+            except BackupRestarted as e:
+                print(f"⚠️ {e}; copying in a single step")
+                source.backup(target, pages=-1, progress=progress)
+            # A standalone file: no -wal sidecar needed to open it
+            target.execute("PRAGMA journal_mode = DELETE")
+            result = target.execute("PRAGMA integrity_check").fetchone()[0]
+            if result != "ok":
+                raise sqlite3.DatabaseError(f"Backup failed integrity check: {result}")
+        except Exception:
+            target.close()
+            os.remove(tmp_path)
+            raise
+        finally:
+            source.close()
+        target.close()
+
+        if compress:
+            backup_path += ".gz"
+            with open(tmp_path, "rb") as src, gzip.open(backup_path + ".tmp", "wb", compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            os.remove(tmp_path)
+            tmp_path = backup_path + ".tmp"
+
+        with open(backup_path + ".sha256", "w") as f:
+            f.write(f"{file_checksum(tmp_path)}  {os.path.basename(backup_path)}\n")
+        os.replace(tmp_path, backup_path)
+        return backup_path
+
+    @staticmethod
+    def _bounded_progress(progress=None):
+        """Progress callback that gives up on a stepped copy (raising
+        BackupRestarted) once it restarts or runs too often or too long"""
+        deadline = time.monotonic() + Config.BACKUP_MAX_SECONDS
+        state = {'remaining': None, 'restarts': 0}
+
+        def step(status, remaining, total):
+            # Remaining pages only go up when the copy started over
+            if state['remaining'] is not None and remaining > state['remaining']:
+                state['restarts'] += 1
+            state['remaining'] = remaining
+            if state['restarts'] > Config.BACKUP_MAX_RESTARTS:
+                raise BackupRestarted(f"Backup restarted {state['restarts']} times by concurrent writes")
+            if remaining and time.monotonic() > deadline:
+                raise BackupRestarted(f"Backup still copying after {Config.BACKUP_MAX_SECONDS}s")
+            if progress:
+                progress(status, remaining, total)
+        return step
+
+    def verify(self, backup_path):
+        """True if the backup still matches the checksum recorded when it was made"""
+        try:
+            with open(backup_path + ".sha256") as f:
+                expected = f.read().split()[0]
+        except (OSError, IndexError):
+            return False
+        return file_checksum(backup_path) == expected
+
+    def list_backups(self):
+        """(timestamp, path) for every backup, newest first"""
+        backups = []
+        for name in os.listdir(self.backup_dir):
+            match = BACKUP_PATTERN.match(name)
+            if match:
+                stamp = datetime.strptime(match.group(1), "%Y%m%d_%H%M%S")
+                if match.group(2):
+                    stamp = stamp.replace(microsecond=int(match.group(2)))
+                backups.append((stamp, os.path.join(self.backup_dir, name)))
+        return sorted(backups, reverse=True)
+
+    def apply_retention(self, keep_days=None, keep_count=None):
+        """Delete backups beyond ``keep_count`` or older than ``keep_days``.
+
+        The newest backup is always kept. Returns the paths removed.
+        """
+        keep_days = Config.BACKUP_KEEP_DAYS if keep_days is None else keep_days
+        keep_count = Config.BACKUP_KEEP_COUNT if keep_count is None else keep_count
+        cutoff = time.time() - keep_days * 24 * 60 * 60
+
+        removed = []
+        for index, (stamp, path) in enumerate(self.list_backups()):
+            if index == 0:
+                continue
+            if index >= keep_count or stamp.timestamp() < cutoff:
+                for stale in (path, path + ".sha256"):
+                    if os.path.exists(stale):
+                        os.remove(stale)
+                removed.append(path)
+        return removed
+
+    def restore(self, backup_path, target_path):
+        """Write a verified backup out as a database file (stop the app before
+        pointing ``target_path`` at the live database)"""
+        if not self.verify(backup_path):
+            raise ValueError(f"Backup checksum mismatch: {backup_path}")
+        opener = gzip.open if backup_path.endswith(".gz") else open
+        with opener(backup_path, "rb") as src, open(target_path + ".tmp", "wb") as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(target_path + ".tmp", target_path)
+        return target_path
+
+# Back up now, or check every backup: python backup.py [--verify]
+if __name__ == "__main__":
+    engine = BackupEngine()
+    if "--verify" in sys.argv:
+        for stamp, path in engine.list_backups():
+            print(f"{'✅' if engine.verify(path) else '❌'} {os.path.basename(path)}")
+    else:
+        path = engine.create_backup()
+        print(f"✅ Backup created: {path}")
+        for stale in engine.apply_retention():
+            print(f"🧹 Removed old backup: {os.path.basename(stale)}")
@@ -2,15 +2,22 @@ import time
 import threading
 from production_server import serve_app
 from config import create_backup, Config
+from archive import run_archival
+from rollups import catch_up_rollups
+from change_log import run_change_shipping
 import schedule
 
 def run_scheduler():
     """Run scheduled tasks"""
     schedule.every(24).hours.do(create_backup)
+    schedule.every().day.at("02:30").do(run_archival)
+    schedule.every().day.at("03:00").do(catch_up_rollups)
+    # Continuous backup between the daily full backups
+    schedule.every(Config.CHANGE_SHIP_INTERVAL_SECONDS).seconds.do(run_change_shipping)
     
     while True:
         schedule.run_pending()
-        time.sleep(60)
+        time.sleep(1)
 
 def main():
     print("🏫 Campus Gadget System Service Starting...")
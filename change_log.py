@@ -0,0 +1,357 @@
+import gzip
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+
+from config import Config
+from backup import BackupEngine, file_checksum
+
+# Continuous backup between full backups. Capture triggers on the base
+# tables append each row change to change_log; ship_changes() moves new
+# entries into compressed, checksummed segment files under backups/changes/
+# every few seconds and removes them from the database. restore_to_time()
+# takes the newest full backup made before the target time, replays the
+# segments on top of it and rebuilds the derived tables (counters,
+# presence, rollups, search index), so recovery loses at most one shipping
+# interval and backup cost follows the write volume instead of the
+# database size.
+#
+# Shipping runs from the service scheduler and, on installs without the
+# service, from the desktop app (start_change_shipping()).
+#
+# Only row changes are logged: take a full backup after a schema upgrade.
+
+CHANGE_LOG_TABLE = "change_log"
+TRIGGER_PREFIX = "change_log_"
+SEGMENT_DIR = "changes"
+SEGMENT_PATTERN = re.compile(r"^changes_(\d{12})_(\d{12})\.jsonl\.gz$")
+CHANGED_AT = "strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime')"
+
+# Tables holding source data. Everything else is derived from these by
+# triggers or jobs and is rebuilt after a replay instead of being logged.
+# registration_changes is kept: clients hold cursors into its sequence.
+CAPTURED_TABLES = ("users", "students", "gadgets", "check_records", "web_registrations",
+                   "check_events", "record_sequences", "archive_partitions",
+                   "registration_changes", "sync_state")
+
+def create_change_log(cursor):
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {CHANGE_LOG_TABLE} (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            op TEXT NOT NULL,
+            row_key TEXT NOT NULL,
+            row_data TEXT,
+            changed_at TEXT NOT NULL DEFAULT ({CHANGED_AT})
+        )
+    ''')
+    refresh_capture_triggers(cursor)
+
+def change_log_exists(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
+                        (CHANGE_LOG_TABLE,)).fetchone() is not None
+
+def _tracked_tables(cursor):
+    """The CAPTURED_TABLES present in this database"""
+    present = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    return [table for table in CAPTURED_TABLES if table in present]
+
+def _table_layout(cursor, table):
+    """(column names, primary key columns for WITHOUT ROWID tables else None)"""
+    columns = cursor.execute(f'PRAGMA table_info("{table}")').fetchall()
+    sql = cursor.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone()[0]
+    names = [column[1] for column in columns]
+    if re.search(r"WITHOUT\s+ROWID\s*$", sql.strip(), re.IGNORECASE):
+        return names, [column[1] for column in sorted(columns, key=lambda c: c[5]) if column[5]]
+    return names, None
+
+def refresh_capture_triggers(cursor):
+    """(Re)create the capture triggers for the current schema"""
+    for (name,) in cursor.execute("SELECT name FROM sqlite_master WHERE type='trigger' AND name LIKE ?",
+                                  (TRIGGER_PREFIX + "%",)).fetchall():
+        cursor.execute(f'DROP TRIGGER "{name}"')
+
+    for table in _tracked_tables(cursor):
+        names, primary_key = _table_layout(cursor, table)
+
+        def key(row):
+            if primary_key:
+                return "json_array(" + ", ".join(f'{row}."{c}"' for c in primary_key) + ")"
+            return f"json_array({row}.rowid)"
+
+        def data(row):
+            pairs = [f"'{c}', {row}.\"{c}\"" for c in names]
+            if not primary_key:
+                pairs.insert(0, f"'rowid', {row}.rowid")
+            return "json_object(" + ", ".join(pairs) + ")"
+
+        for event, op, key_row, data_sql in (("INSERT", "I", "new", data("new")),
+                                              ("UPDATE", "U", "old", data("new")),
+                                              ("DELETE", "D", "old", "NULL")):
+            cursor.execute(f'''
+                CREATE TRIGGER "{TRIGGER_PREFIX}{table}_{event.lower()}" AFTER {event} ON "{table}"
+                BEGIN
+                    INSERT INTO {CHANGE_LOG_TABLE} (table_name, op, row_key, row_data)
+                    VALUES ('{table}', '{op}', {key(key_row)}, {data_sql});
+                END
+            ''')
+
+# -- shipping ----------------------------------------------------------------
+
+def segment_dir(backup_dir=None):
+    return os.path.join(backup_dir or Config.BACKUP_DIR, SEGMENT_DIR)
+
+def list_segments(directory):
+    """(first seq, last seq, path) for every segment, in seq order"""
+    if not os.path.isdir(directory):
+        return []
+    segments = []
+    for name in os.listdir(directory):
+        match = SEGMENT_PATTERN.match(name)
+        if match:
+            segments.append((int(match.group(1)), int(match.group(2)), os.path.join(directory, name)))
+    return sorted(segments)
+
+def ship_changes(conn, directory=None, batch_size=None):
+    """Write logged changes to segment files and drop them from the database.
+
+    A segment is durable (fsynced, checksummed, renamed into place) before
+    its rows are deleted; if that delete is lost the rows are shipped again
+    and restore skips sequence numbers it has already applied. Returns the
+    number of changes shipped.
+    """
+    directory = directory or segment_dir()
+    batch_size = batch_size or Config.CHANGE_SEGMENT_MAX_ROWS
+    os.makedirs(directory, exist_ok=True)
+    shipped = 0
+
+    while True:
+        rows = conn.execute(f'''
+            SELECT seq, table_name, op, row_key, row_data, changed_at
+            FROM {CHANGE_LOG_TABLE} ORDER BY seq LIMIT ?
+        ''', (batch_size,)).fetchall()
+        if not rows:
+            return shipped
+
+        first, last = rows[0][0], rows[-1][0]
+        path = os.path.join(directory, f"changes_{first:012d}_{last:012d}.jsonl.gz")
+        # The service and the desktop app may ship the same rows at once
+        tmp_path = f"{path}.{os.getpid()}_{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                for seq, table, op, row_key, row_data, changed_at in rows:
+                    f.write((json.dumps({"seq": seq, "table": table, "op": op, "key": json.loads(row_key),
+                                         "data": json.loads(row_data) if row_data else None,
+                                         "at": changed_at}) + "\n").encode("utf-8"))
+            raw.flush()
+            os.fsync(raw.fileno())
+        with open(tmp_path + ".sha256", "w") as f:
+            f.write(f"{file_checksum(tmp_path)}  {os.path.basename(path)}\n")
+        os.replace(tmp_path + ".sha256", path + ".sha256")
+        os.replace(tmp_path, path)
+
+        conn.execute(f"DELETE FROM {CHANGE_LOG_TABLE} WHERE seq <= ?", (last,))
+        conn.commit()
+        shipped += len(rows)
+
+def prune_segments(directory, before):
+    """Remove segments written before ``before`` (a datetime); a full backup
+    started after a segment was written already contains its changes"""
+    for _, _, path in list_segments(directory):
+        if datetime.fromtimestamp(os.path.getmtime(path)) < before:
+            for stale in (path, path + ".sha256"):
+                if os.path.exists(stale):
+                    os.remove(stale)
+
+def run_change_shipping(db_path=None, backup_dir=None):
+    """Ship pending changes; used by the service scheduler and the desktop app"""
+    conn = sqlite3.connect(db_path or Config.DATABASE_PATH, timeout=Config.DB_BUSY_TIMEOUT_MS / 1000.0)
+    try:
+        if change_log_exists(conn):
+            ship_changes(conn, segment_dir(backup_dir))
+    except Exception as e:
+        print(f"❌ Change shipping failed: {e}")
+    finally:
+        conn.close()
+
+def start_change_shipping(db_path=None, backup_dir=None, interval=None):
+    """Ship changes now and then every ``interval`` seconds on a daemon thread.
+
+    For the desktop app, which runs without the service scheduler; without a
+    shipper change_log would grow for as long as the database is used.
+    """
+    interval = interval or Config.CHANGE_SHIP_INTERVAL_SECONDS
+    stop = threading.Event()
+
+    def run():
+        while True:
+            run_change_shipping(db_path, backup_dir)
+            if stop.wait(interval):
+                return
+
+    threading.Thread(target=run, name="change-shipping", daemon=True).start()
+    return stop
+
+# -- point-in-time restore ---------------------------------------------------
+
+def _read_segment(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+def _seq_time(conn, seq, segments):
+    """When change ``seq`` was made, from the restored database or a segment"""
+    row = conn.execute(f"SELECT changed_at FROM {CHANGE_LOG_TABLE} WHERE seq = ?", (seq,)).fetchone()
+    if row:
+        return row[0]
+    for first, last, path in segments:
+        if first <= seq <= last:
+            for change in _read_segment(path):
+                if change["seq"] == seq:
+                    return change["at"]
+    return None
+
+def _apply_change(conn, layouts, change):
+    table = change["table"]
+    if table not in layouts:
+        layouts[table] = _table_layout(conn.cursor(), table)
+    _, primary_key = layouts[table]
+    key_columns = primary_key or ["rowid"]
+    where = " AND ".join(f'"{c}" = ?' for c in key_columns)
+
+    if change["op"] in ("U", "D"):
+        conn.execute(f'DELETE FROM "{table}" WHERE {where}', change["key"])
+    if change["op"] in ("I", "U"):
+        data = change["data"]
+        columns = ", ".join(f'"{c}"' for c in data)
+        placeholders = ", ".join("?" for _ in data)
+        conn.execute(f'INSERT OR REPLACE INTO "{table}" ({columns}) VALUES ({placeholders})',
+                     list(data.values()))
+
+def replay_changes(conn, segments, base_seq, target):
+    """Apply logged changes after ``base_seq`` made at or before ``target``.
+
+    Triggers are dropped while replaying and recreated afterwards, so only
+    the logged rows change; rebuild_derived_tables() then recomputes
+    everything derived from them. Returns (changes applied, last seq applied).
+    """
+    triggers = conn.execute("SELECT name, sql FROM sqlite_master WHERE type='trigger'").fetchall()
+    for name, _ in triggers:
+        conn.execute(f'DROP TRIGGER "{name}"')
+
+    layouts = {}
+    applied = 0
+    last_seq = base_seq
+    done = False
+    for first, last, path in segments:
+        if last <= last_seq:
+            continue
+        for change in _read_segment(path):
+            if change["seq"] <= last_seq:
+                continue
+            if change["at"] > target:
+                done = True
+                break
+            if change["seq"] != last_seq + 1:
+                raise ValueError(f"Change log gap: missing changes {last_seq + 1}-{change['seq'] - 1}")
+            _apply_change(conn, layouts, change)
+            last_seq = change["seq"]
+            applied += 1
+        if done:
+            break
+
+    for _, sql in triggers:
+        conn.execute(sql)
+    # The restored database starts a fresh log after the last replayed change
+    conn.execute(f"DELETE FROM {CHANGE_LOG_TABLE}")
+    conn.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = ?", (last_seq, CHANGE_LOG_TABLE))
+    return applied, last_seq
+
+def rebuild_derived_tables(cursor, since_date):
+    """Recompute tables derived from the base tables after a replay.
+
+    ``since_date`` is the day of the full backup the replay started from;
+    activity rollups before it are kept as they were in that backup.
+    """
+    from gadget_search import search_index_exists, rebuild_search_index
+    from dashboard_counters import counters_exist, rebuild_counters
+    from rollups import rollups_exist, refill_rollups_since
+    from presence import rebuild_presence
+
+    conn = cursor.connection
+    if search_index_exists(conn):
+        rebuild_search_index(cursor)
+    if counters_exist(conn):
+        rebuild_counters(cursor)
+    if rollups_exist(conn):
+        refill_rollups_since(cursor, since_date)
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'gadget_presence'").fetchone():
+        rebuild_presence(cursor)
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'data_versions'").fetchone():
+        # Invalidates report cache entries made from the pre-restore data
+        cursor.execute("UPDATE data_versions SET version = version + 1")
+
+def restore_to_time(target, output_path, backup_dir=None):
+    """Rebuild the database as it was at ``target`` into ``output_path``.
+
+    ``target`` is a local 'YYYY-MM-DD HH:MM:SS' time or a datetime. Uses the
+    newest verified full backup whose snapshot is not after the target.
+    Returns (backup used, changes replayed).
+    """
+    if isinstance(target, datetime):
+        target = target.strftime('%Y-%m-%d %H:%M:%S.%f')[:23]
+    target_stamp = datetime.fromisoformat(target[:19])
+
+    engine = BackupEngine(backup_dir=backup_dir)
+    segments = list_segments(segment_dir(engine.backup_dir))
+    for _, _, path in segments:
+        if not engine.verify(path):
+            raise ValueError(f"Change segment checksum mismatch: {path}")
+
+    for stamp, backup_path in engine.list_backups():
+        if stamp > target_stamp:
+            continue
+        if not engine.verify(backup_path):
+            print(f"⚠️ Skipping unverified backup: {backup_path}")
+            continue
+
+        engine.restore(backup_path, output_path)
+        conn = sqlite3.connect(output_path)
+        try:
+            if not change_log_exists(conn):
+                raise ValueError(f"{backup_path} predates the change log; restore it directly instead")
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (CHANGE_LOG_TABLE,)).fetchone()
+            base_seq = row[0] if row else 0
+            base_time = _seq_time(conn, base_seq, segments) if base_seq else None
+            if base_time and base_time > target:
+                # The snapshot finished after the target; try an older backup
+                continue
+
+            applied, _ = replay_changes(conn, segments, base_seq, target)
+            rebuild_derived_tables(conn.cursor(), stamp.date().isoformat())
+            conn.commit()
+
+            result = conn.execute("PRAGMA integrity_check").fetchone()[0]
+            if result != "ok":
+                raise sqlite3.DatabaseError(f"Restored database failed integrity check: {result}")
+            return backup_path, applied
+        finally:
+            conn.close()
+
+    raise ValueError(f"No usable full backup taken before {target}")
+
+# python change_log.py ship
+# python change_log.py restore "2024-05-01 14:30:00" restored.db
+if __name__ == "__main__":
+    if len(sys.argv) >= 4 and sys.argv[1] == "restore":
+        backup_path, applied = restore_to_time(sys.argv[2], sys.argv[3])
+        print(f"✅ Restored {sys.argv[3]} from {os.path.basename(backup_path)} + {applied} changes")
+    elif len(sys.argv) >= 2 and sys.argv[1] == "ship":
+        run_change_shipping()
+        print("✅ Pending changes shipped")
+    else:
+        print("Usage: python change_log.py ship | restore <timestamp> <output.db>")
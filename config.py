@@ -6,23 +6,84 @@ class Config:
     DATABASE_PATH = "campus_gadgets.db"
     BACKUP_DIR = "backups"
     
+    # Database connections (applied by db_pool to every pooled connection)
+    DB_JOURNAL_MODE = "WAL"
+    DB_SYNCHRONOUS = "NORMAL"  # Safe with WAL, avoids an fsync per commit
+    DB_BUSY_TIMEOUT_MS = 5000
+    DB_CACHE_SIZE_KB = 16 * 1024  # 16MB page cache per connection
+    DB_MMAP_SIZE = 128 * 1024 * 1024  # 128MB memory-mapped I/O
+    DB_TEMP_STORE = "MEMORY"
+    
+    # Group commit of writes (see write_queue.py)
+    WRITE_BATCH_WINDOW_MS = 5  # Writes collected before they are committed together
+    WRITE_BATCH_MAX = 100  # Writes per transaction
+    WRITE_QUEUE_MAX = 2000  # Pending writes before new ones are refused
+    
     # Web Server
     WEB_HOST = "0.0.0.0"
     WEB_PORT = 8080
+    WEB_BASE_URL = f"http://localhost:{WEB_PORT}"  # Where the desktop app reaches the web server
     DEBUG = False
     
+    # Web serving (see production_server.py)
+    WEB_SERVER = "waitress"  # "waitress" (threads, any OS), "gunicorn" (pre-fork, Linux/macOS) or "uvicorn" (asyncio intake)
+    WEB_THREADS = 8  # Waitress threads, or threads per gunicorn worker
+    WEB_WORKERS = 0  # Gunicorn/uvicorn worker processes; 0 = 2 x CPU cores + 1
+    WEB_BACKLOG = 1024  # Connections queued by the listening socket
+    WEB_CONNECTION_LIMIT = 1000  # Open connections per process before new ones wait
+    WEB_TIMEOUT = 60  # Seconds before an idle connection / stuck worker is dropped
+    WEB_MAX_REQUESTS = 5000  # Gunicorn: recycle a worker after this many requests (0 = never)
+    API_PAGE_SIZE = 200  # Default page size for paginated API listings
+    API_MAX_PAGE_SIZE = 1000
+    API_MAX_BATCH_SIZE = 500  # IDs accepted by one batch approve/reject call
+    
+    # Async registration intake (see asgi_intake.py)
+    INTAKE_QUEUE_SIZE = 500  # Registrations in progress per process before new ones get 429
+    INTAKE_FILE_WORKERS = 4  # Threads writing uploaded photos
+    INTAKE_RETRY_AFTER_SECONDS = 5
+    
     # File Uploads
     MAX_FILE_SIZE = 16 * 1024 * 1024  # 16MB
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp'}
     UPLOAD_FOLDER = "web_uploads"
+    PHOTO_STORE_DIR = "student_photos"  # Content-addressed store for uploaded photos
+    THUMBNAIL_SIZES = ((100, 100), (300, 300))  # Derivatives generated for every photo
+    THUMBNAIL_WORKERS = 2
+    IMAGE_CACHE_MAX_MB = 64  # Decoded images kept in memory by the desktop app
+    
+    # Records view (keyset-paginated)
+    RECORDS_PAGE_SIZE = 100
+    RECORDS_MAX_ROWS = 500  # Rows kept in the table while scrolling
+    ACTIVITY_FEED_SIZE = 20  # Rows in the recent activity panel
+    
+    # Reports (background generation)
+    REPORT_WORKERS = 2  # Reports rendered concurrently
+    REPORT_MAX_PENDING = 4  # Queued + running report jobs before new ones are refused
+    REPORT_CACHE_DIR = os.path.join("reports", "cache")
+    REPORT_CACHE_MAX_MB = 200
+    REPORT_CACHE_MAX_AGE_HOURS = 24
+    ROLLUP_CATCHUP_DAYS = 2  # Days of rollups the nightly catch-up recomputes
+    
+    # Archival of check_records (see archive.py)
+    ARCHIVE_DIR = "archives"  # Next to the database file
+    ARCHIVE_HOT_MONTHS = 3  # Months kept in the main database besides the current one
     
     # Security
     SESSION_TIMEOUT = 3600  # 1 hour
     PASSWORD_MIN_LENGTH = 6
     
-    # Backups
+    # Backups (online, via the SQLite backup API - see backup.py)
     AUTO_BACKUP = True
     BACKUP_INTERVAL_HOURS = 24
+    BACKUP_COMPRESS = True  # gzip backups
+    BACKUP_KEEP_DAYS = 7
+    BACKUP_KEEP_COUNT = 14  # Newest backups kept regardless of age limit
+    BACKUP_PAGES_PER_STEP = 256  # Pages copied before yielding to writers
+    BACKUP_STEP_SLEEP = 0.05  # Seconds between steps
+    BACKUP_MAX_RESTARTS = 3  # Stepped copies restarted by writes before one single-step copy
+    BACKUP_MAX_SECONDS = 300  # Time allowed for the stepped copy before the same fallback
+    CHANGE_SHIP_INTERVAL_SECONDS = 30  # Continuous backup: change log shipped this often
+    CHANGE_SEGMENT_MAX_ROWS = 5000  # Changes per shipped segment file
     
     # Logging
     LOG_LEVEL = "INFO"
@@ -47,35 +108,22 @@ def create_backup():
         return
     
     try:
-        import shutil
-        from datetime import datetime
-        
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_file = f"{Config.BACKUP_DIR}/backup_{timestamp}.db"
+        from backup import BackupEngine
         
         if os.path.exists(Config.DATABASE_PATH):
-            shutil.copy2(Config.DATABASE_PATH, backup_file)
+            engine = BackupEngine()
+            backup_file = engine.create_backup()
             print(f"✅ Backup created: {backup_file}")
             
-            # Clean old backups (keep last 7 days)
-            clean_old_backups()
+            # Retention by age and count
+            for stale in engine.apply_retention():
+                print(f"🧹 Removed old backup: {os.path.basename(stale)}")
+            
+            # Change segments older than the oldest kept backup are covered by it
+            from change_log import prune_segments, segment_dir
+            backups = engine.list_backups()
+            if backups:
+                prune_segments(segment_dir(), backups[-1][0])
             
     except Exception as e:
-        print(f"❌ Backup failed: {e}")
-
-def clean_old_backups():
-    """Remove backups older than 7 days"""
-    try:
-        import time
-        current_time = time.time()
-        seven_days_ago = current_time - (7 * 24 * 60 * 60)
-        
-        for filename in os.listdir(Config.BACKUP_DIR):
-            if filename.startswith("backup_") and filename.endswith(".db"):
-                filepath = os.path.join(Config.BACKUP_DIR, filename)
-                if os.path.getctime(filepath) < seven_days_ago:
-                    os.remove(filepath)
-                    print(f"🧹 Removed old backup: {filename}")
-                    
-    except Exception as e:
-        print(f"❌ Backup cleanup failed: {e}")
\ No newline at end of file
+        print(f"❌ Backup failed: {e}")
\ No newline at end of file
@@ -0,0 +1,201 @@
+import sqlite3
+import sys
+from datetime import datetime
+
+# Single-row table of dashboard totals plus a per-day activity bucket, both
+# maintained by triggers so the dashboard is one indexed read instead of a
+# handful of COUNT(*) scans.
+
+COUNTER_TRIGGERS = [
+    # Gadgets
+    '''
+    CREATE TRIGGER IF NOT EXISTS counters_gadget_insert AFTER INSERT ON gadgets
+    BEGIN
+        UPDATE dashboard_counters SET
+            total_gadgets = total_gadgets + 1,
+            gadgets_in_campus = gadgets_in_campus + (new.status = 'checked_in'),
+            gadgets_out_campus = gadgets_out_campus + (new.status = 'checked_out'),
+            pending_gadgets = pending_gadgets + (new.registration_status = 'pending'),
+            approved_gadgets = approved_gadgets + (new.registration_status = 'approved')
+        WHERE id = 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS counters_gadget_delete AFTER DELETE ON gadgets
+    BEGIN
+        UPDATE dashboard_counters SET
+            total_gadgets = total_gadgets - 1,
+            gadgets_in_campus = gadgets_in_campus - (old.status = 'checked_in'),
+            gadgets_out_campus = gadgets_out_campus - (old.status = 'checked_out'),
+            pending_gadgets = pending_gadgets - (old.registration_status = 'pending'),
+            approved_gadgets = approved_gadgets - (old.registration_status = 'approved')
+        WHERE id = 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS counters_gadget_update
+    AFTER UPDATE OF status, registration_status ON gadgets
+    BEGIN
+        UPDATE dashboard_counters SET
+            gadgets_in_campus = gadgets_in_campus
+                - (old.status = 'checked_in') + (new.status = 'checked_in'),
+            gadgets_out_campus = gadgets_out_campus
+                - (old.status = 'checked_out') + (new.status = 'checked_out'),
+            pending_gadgets = pending_gadgets
+                - (old.registration_status = 'pending') + (new.registration_status = 'pending'),
+            approved_gadgets = approved_gadgets
+                - (old.registration_status = 'approved') + (new.registration_status = 'approved')
+        WHERE id = 1;
+    END
+    ''',
+    # Students and users
+    '''
+    CREATE TRIGGER IF NOT EXISTS counters_student_insert AFTER INSERT ON students
+    BEGIN
+        UPDATE dashboard_counters SET total_students = total_students + 1 WHERE id = 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS counters_student_delete AFTER DELETE ON students
+    BEGIN
+        UPDATE dashboard_counters SET total_students = total_students - 1 WHERE id = 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS counters_user_insert AFTER INSERT ON users
+    BEGIN
+        UPDATE dashboard_counters SET total_users = total_users + 1 WHERE id = 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS counters_user_delete AFTER DELETE ON users
+    BEGIN
+        UPDATE dashboard_counters SET total_users = total_users - 1 WHERE id = 1;
+    END
+    ''',
+    # Check records: a record counts once for each distinct day it touches,
+    # matching "DATE(check_in_time) = ? OR DATE(check_out_time) = ?"
+    '''
+    CREATE TRIGGER IF NOT EXISTS counters_check_record_insert AFTER INSERT ON check_records
+    BEGIN
+        INSERT INTO daily_activity_counts (activity_date, activity_count)
+        SELECT day, 1 FROM (
+            SELECT DATE(new.check_in_time) AS day
+            UNION
+            SELECT DATE(new.check_out_time)
+        ) WHERE day IS NOT NULL
+        ON CONFLICT(activity_date) DO UPDATE SET activity_count = activity_count + 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS counters_check_record_delete AFTER DELETE ON check_records
+    BEGIN
+        UPDATE daily_activity_counts SET activity_count = activity_count - 1
+        WHERE activity_date IN (DATE(old.check_in_time), DATE(old.check_out_time));
+    END
+    ''',
+]
+
+def create_counters(cursor):
+    """Create the counter tables and triggers, then fill them from live data"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS dashboard_counters (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            total_gadgets INTEGER NOT NULL DEFAULT 0,
+            gadgets_in_campus INTEGER NOT NULL DEFAULT 0,
+            gadgets_out_campus INTEGER NOT NULL DEFAULT 0,
+            pending_gadgets INTEGER NOT NULL DEFAULT 0,
+            approved_gadgets INTEGER NOT NULL DEFAULT 0,
+            total_students INTEGER NOT NULL DEFAULT 0,
+            total_users INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS daily_activity_counts (
+            activity_date TEXT PRIMARY KEY,
+            activity_count INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    for trigger in COUNTER_TRIGGERS:
+        cursor.execute(trigger)
+
+    rebuild_counters(cursor)
+
+def rebuild_counters(cursor):
+    """Recompute every counter from the base tables (drift repair)"""
+    cursor.execute("INSERT OR IGNORE INTO dashboard_counters (id) VALUES (1)")
+    cursor.execute('''
+        UPDATE dashboard_counters SET
+            total_gadgets = (SELECT COUNT(*) FROM gadgets),
+            gadgets_in_campus = (SELECT COUNT(*) FROM gadgets WHERE status = 'checked_in'),
+            gadgets_out_campus = (SELECT COUNT(*) FROM gadgets WHERE status = 'checked_out'),
+            pending_gadgets = (SELECT COUNT(*) FROM gadgets WHERE registration_status = 'pending'),
+            approved_gadgets = (SELECT COUNT(*) FROM gadgets WHERE registration_status = 'approved'),
+            total_students = (SELECT COUNT(*) FROM students),
+            total_users = (SELECT COUNT(*) FROM users)
+        WHERE id = 1
+    ''')
+    cursor.execute("DELETE FROM daily_activity_counts")
+    cursor.execute('''
+        INSERT INTO daily_activity_counts (activity_date, activity_count)
+        SELECT day, COUNT(*) FROM (
+            SELECT id, DATE(check_in_time) AS day FROM check_records
+            UNION
+            SELECT id, DATE(check_out_time) FROM check_records
+        )
+        WHERE day IS NOT NULL
+        GROUP BY day
+    ''')
+
+def counters_exist(conn):
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='dashboard_counters'"
+    ).fetchone()
+    return row is not None
+
+def get_dashboard_counters(conn, day=None):
+    """Read all dashboard statistics in one query.
+
+    Returns a dict with total_gadgets, gadgets_in_campus, gadgets_out_campus,
+    pending_gadgets, approved_gadgets, total_students, total_users and
+    today_activity (for ``day``, default today), or None if the counters
+    have not been created in this database.
+    """
+    if not counters_exist(conn):
+        return None
+
+    day = day or datetime.now().strftime('%Y-%m-%d')
+    cursor = conn.execute('''
+        SELECT c.total_gadgets, c.gadgets_in_campus, c.gadgets_out_campus,
+               c.pending_gadgets, c.approved_gadgets, c.total_students, c.total_users,
+               COALESCE((SELECT activity_count FROM daily_activity_counts
+                         WHERE activity_date = ?), 0)
+        FROM dashboard_counters c
+        WHERE c.id = 1
+    ''', (day,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+
+    keys = ['total_gadgets', 'gadgets_in_campus', 'gadgets_out_campus', 'pending_gadgets',
+            'approved_gadgets', 'total_students', 'total_users', 'today_activity']
+    return dict(zip(keys, row))
+
+# Rebuild counters from the command line: python dashboard_counters.py [db_path]
+if __name__ == "__main__":
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "campus_gadgets.db"
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.cursor()
+        if counters_exist(conn):
+            rebuild_counters(cursor)
+        else:
+            create_counters(cursor)
+        conn.commit()
+        print(f"✅ Dashboard counters rebuilt: {get_dashboard_counters(conn)}")
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Counter rebuild failed: {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
@@ -1,26 +1,55 @@
-import sqlite3
 import hashlib
 import os
 import sys
-from datetime import datetime
+import threading
+from datetime import datetime, timedelta
+import db_pool
+from migrate_database import apply_migrations, create_base_schema, BASE_TABLES, MIGRATIONS, SCHEMA_VERSION
+
+# Present in an up-to-date database; with user_version at SCHEMA_VERSION they
+# mean there is no setup work left to do
+SCHEMA_OBJECTS = BASE_TABLES + tuple(marker for _, _, _, marker in MIGRATIONS)
+
+def default_db_path():
+    """Database path inside the installation directory"""
+    if getattr(sys, 'frozen', False):
+        # Running as executable
+        base_path = os.path.dirname(sys.executable)
+    else:
+        # Running as script
+        base_path = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base_path, "data", "campus_gadgets.db")
 
 class Database:
     def __init__(self, db_path=None):
-        if db_path is None:
-            # Auto-detect installation path
-            if getattr(sys, 'frozen', False):
-                # Running as executable
-                base_path = os.path.dirname(sys.executable)
-            else:
-                # Running as script
-                base_path = os.path.dirname(os.path.abspath(__file__))
-            
-            db_path = os.path.join(base_path, "data", "campus_gadgets.db")
+        self.db_path = db_path or default_db_path()
+        self.backup_dir = os.path.join(os.path.dirname(self.db_path), "..", "backups")
         
-        self.db_path = db_path
-        self.ensure_directories()
-        self.init_database()
-        self.update_web_registrations_table()
+        # Fast path: an up-to-date database needs no DDL at all
+        if not self.schema_is_current():
+            self.ensure_directories()
+            self.init_database()
+            self.apply_migrations()
+    
+    def schema_is_current(self):
+        """Cheap check on open: schema version stamp plus the base tables and
+        the object each migration creates (a stamp alone can be wrong), and
+        at least one user account"""
+        if not os.path.exists(self.db_path):
+            return False
+        conn = self.get_connection()
+        try:
+            placeholders = ", ".join("?" for _ in SCHEMA_OBJECTS)
+            version, objects = conn.execute(f'''
+                SELECT (SELECT user_version FROM pragma_user_version),
+                       (SELECT COUNT(DISTINCT name) FROM sqlite_master WHERE name IN ({placeholders}))
+            ''', SCHEMA_OBJECTS).fetchone()
+            if version < SCHEMA_VERSION or objects != len(SCHEMA_OBJECTS):
+                return False
+            # A database the web server created first has no login yet
+            return conn.execute("SELECT EXISTS (SELECT 1 FROM users)").fetchone()[0] == 1
+        finally:
+            conn.close()
     
     def ensure_directories(self):
         """Create necessary directories"""
@@ -38,87 +67,11 @@ class Database:
     
     def init_database(self):
         """Initialize database with all tables"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
         cursor = conn.cursor()
         
-        # Users table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                username TEXT UNIQUE NOT NULL,
-                password TEXT NOT NULL,
-                role TEXT NOT NULL,
-                email TEXT,
-                phone TEXT,
-                department TEXT,
-                permissions TEXT,
-                status TEXT DEFAULT 'active',
-                last_login TIMESTAMP,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Students table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS students (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                full_name TEXT NOT NULL,
-                registration_number TEXT UNIQUE NOT NULL,
-                national_id TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+        create_base_schema(cursor)
         
-        # Gadgets table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS gadgets (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id INTEGER,
-                record_number TEXT UNIQUE NOT NULL,
-                gadget_type TEXT NOT NULL,
-                brand TEXT NOT NULL,
-                model TEXT NOT NULL,
-                serial_number TEXT UNIQUE NOT NULL,
-                color TEXT,
-                additional_details TEXT,
-                passport_photo TEXT,
-                student_card_photo TEXT,
-                gadget_photo TEXT,
-                web_registered BOOLEAN DEFAULT 0,
-                registration_status TEXT DEFAULT 'pending',
-                status TEXT DEFAULT 'checked_in',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (student_id) REFERENCES students (id)
-            )
-        ''')
-        
-        # Check records table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS check_records (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                gadget_id INTEGER,
-                check_in_time TIMESTAMP,
-                check_out_time TIMESTAMP,
-                status TEXT NOT NULL,
-                FOREIGN KEY (gadget_id) REFERENCES gadgets (id)
-            )
-        ''')
-        # Web registrations table (for student-facing web form)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS web_registrations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_name TEXT NOT NULL,
-                registration_number TEXT NOT NULL,
-                national_id TEXT NOT NULL,
-                gadget_type TEXT NOT NULL,
-                brand TEXT NOT NULL,
-                model TEXT NOT NULL,
-                serial_number TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                status TEXT DEFAULT 'pending'
-            )
-        ''')
             # Create default admin user
         self.create_default_user(cursor)
             
@@ -126,53 +79,13 @@ class Database:
         conn.close()
             
         print(f"✅ Database initialized: {self.db_path}")
-    def update_web_registrations_table(self):
-        """Update web_registrations table to match API structure"""
+    def apply_migrations(self):
+        """Run pending versioned migrations (indexes etc.) from migrate_database"""
         conn = self.get_connection()
-        cursor = conn.cursor()
-        
         try:
-            # Check current table structure
-            cursor.execute("PRAGMA table_info(web_registrations)")
-            current_columns = [col[1] for col in cursor.fetchall()]
-            print(f"📋 Current columns: {current_columns}")
-            
-            # Add missing columns
-            missing_columns = []
-            
-            if 'color' not in current_columns:
-                cursor.execute("ALTER TABLE web_registrations ADD COLUMN color TEXT")
-                missing_columns.append('color')
-            
-            if 'additional_details' not in current_columns:
-                cursor.execute("ALTER TABLE web_registrations ADD COLUMN additional_details TEXT")
-                missing_columns.append('additional_details')
-            
-            if 'gadget_photo' not in current_columns:
-                cursor.execute("ALTER TABLE web_registrations ADD COLUMN gadget_photo TEXT")
-                missing_columns.append('gadget_photo')
-            
-            if 'passport_photo' not in current_columns:
-                cursor.execute("ALTER TABLE web_registrations ADD COLUMN passport_photo TEXT")
-                missing_columns.append('passport_photo')
-            
-            if 'student_card_photo' not in current_columns:
-                cursor.execute("ALTER TABLE web_registrations ADD COLUMN student_card_photo TEXT")
-                missing_columns.append('student_card_photo')
-            
-            if 'record_number' not in current_columns:
-                cursor.execute("ALTER TABLE web_registrations ADD COLUMN record_number TEXT")
-                missing_columns.append('record_number')
-            
-            if missing_columns:
-                print(f"✅ Added missing columns: {missing_columns}")
-            else:
-                print("✅ Table structure is up to date")
-            
-            conn.commit()
-            
+            apply_migrations(conn)
         except Exception as e:
-            print(f"❌ Error updating table: {str(e)}")
+            print(f"❌ Error applying migrations: {str(e)}")
         finally:
             conn.close()
     def create_default_user(self, cursor):
@@ -187,23 +100,67 @@ class Database:
             pass
     
     def get_connection(self):
-        """Get database connection"""
-        return sqlite3.connect(self.db_path)
+        """Get this thread's pooled (WAL, tuned) database connection"""
+        return db_pool.get_connection(self.db_path)
     
     def create_backup(self):
         """Create database backup"""
         try:
-            import shutil
-            backup_dir = os.path.join(os.path.dirname(self.db_path), "..", "backups")
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_file = os.path.join(backup_dir, f"backup_{timestamp}.db")
+            from backup import BackupEngine
+            from change_log import prune_segments, segment_dir
             
             if os.path.exists(self.db_path):
-                shutil.copy2(self.db_path, backup_file)
+                engine = BackupEngine(self.db_path, self.backup_dir)
+                backup_file = engine.create_backup()
+                engine.apply_retention()
+                # Change segments older than the oldest kept backup are covered by it
+                backups = engine.list_backups()
+                if backups:
+                    prune_segments(segment_dir(self.backup_dir), backups[-1][0])
                 return backup_file
         except Exception as e:
             print(f"Backup failed: {e}")
         return None
+    
+    def backup_due(self, interval_hours):
+        """True when the newest backup is older than ``interval_hours``"""
+        from backup import BackupEngine
+        
+        backups = BackupEngine(self.db_path, self.backup_dir).list_backups()
+        return not backups or datetime.now() - backups[0][0] >= timedelta(hours=interval_hours)
+    
+    def start_backup_schedule(self, interval_hours):
+        """Take a backup whenever the newest one is ``interval_hours`` old,
+        checking hourly on a daemon thread; returns an Event that stops it.
+        
+        For the desktop app, which runs without the service scheduler; shipped
+        change segments replay onto these backups and are pruned with them.
+        """
+        stop = threading.Event()
+        
+        def run():
+            while True:
+                try:
+                    if self.backup_due(interval_hours):
+                        self.create_backup()
+                except Exception as e:
+                    print(f"Backup failed: {e}")
+                if stop.wait(min(interval_hours, 1) * 3600):
+                    return
+        
+        threading.Thread(target=run, name="backup-schedule", daemon=True).start()
+        return stop
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+def get_database(db_path=None):
+    """Process-wide shared Database for a file (default: the installation database)"""
+    key = os.path.abspath(db_path or default_db_path())
+    with _instances_lock:
+        if key not in _instances:
+            _instances[key] = Database(key)
+        return _instances[key]
 
 # Auto-initialize when run directly
 if __name__ == "__main__":
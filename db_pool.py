@@ -0,0 +1,152 @@
+import atexit
+import os
+import sqlite3
+import threading
+
+from config import Config
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection that is handed back to its pool instead of closed"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # row_factory of each open checkout's enclosing user, outermost first
+        self._checkouts = []
+
+    def checkout(self):
+        if not self._checkouts and self.in_transaction:
+            # Used again after its last close(): drop those writes instead of
+            # holding the write lock and letting the next commit include them
+            print("⚠️ Rolled back a transaction left open on a pooled connection")
+            self.rollback()
+        self._checkouts.append(self.row_factory)
+
+    def close(self):
+        """Release the connection back to the pool.
+
+        Callers keep their existing ``conn.close()`` calls. Nested checkouts on
+        the same thread share one connection, so an inner close() only gives
+        the enclosing user back its row_factory; the outermost one discards
+        uncommitted work, matching what a real close() would do.
+        """
+        if not self._checkouts:
+            return
+        row_factory = self._checkouts.pop()
+        if self._checkouts:
+            self.row_factory = row_factory
+        else:
+            self.release()
+
+    def release(self):
+        if self.in_transaction:
+            self.rollback()
+        self.row_factory = None
+
+    def close_physical(self):
+        """Really close the underlying sqlite3 handle"""
+        super().close()
+
+
+class ConnectionPool:
+    """Hands out one tuned, long-lived connection per thread for a database file"""
+
+    def __init__(self, db_path):
+        self.db_path = os.path.abspath(db_path)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = {}  # thread ident -> PooledConnection
+        self._journal_mode_set = False
+
+    def get_connection(self):
+        """Get this thread's connection (opened and tuned on first use).
+
+        A call made while this thread already has the connection checked out
+        shares it, including any open transaction.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._lock:
+                self._prune_dead_threads()
+                self._connections[threading.get_ident()] = conn
+        conn.checkout()
+        return conn
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=Config.DB_BUSY_TIMEOUT_MS / 1000.0,
+            factory=PooledConnection,
+            # Each connection is only used by its owning thread; this just
+            # lets close_all()/pruning close it from another thread.
+            check_same_thread=False
+        )
+        self._apply_pragmas(conn)
+        return conn
+
+    def _apply_pragmas(self, conn):
+        """Apply the connection PRAGMAs configured in config.Config"""
+        cursor = conn.cursor()
+        if not self._journal_mode_set:
+            # journal_mode is persistent in the database file, so only the
+            # first connection needs to pay for switching it.
+            try:
+                cursor.execute(f"PRAGMA journal_mode = {Config.DB_JOURNAL_MODE}")
+                self._journal_mode_set = True
+            except sqlite3.OperationalError as e:
+                print(f"⚠️ Could not set journal_mode={Config.DB_JOURNAL_MODE}: {e}")
+        cursor.execute(f"PRAGMA busy_timeout = {int(Config.DB_BUSY_TIMEOUT_MS)}")
+        cursor.execute(f"PRAGMA synchronous = {Config.DB_SYNCHRONOUS}")
+        # Negative cache_size is in KiB rather than pages
+        cursor.execute(f"PRAGMA cache_size = -{int(Config.DB_CACHE_SIZE_KB)}")
+        cursor.execute(f"PRAGMA mmap_size = {int(Config.DB_MMAP_SIZE)}")
+        cursor.execute(f"PRAGMA temp_store = {Config.DB_TEMP_STORE}")
+        cursor.close()
+
+    def _prune_dead_threads(self):
+        """Close connections owned by threads that have exited"""
+        alive = {thread.ident for thread in threading.enumerate()}
+        for ident in list(self._connections):
+            if ident not in alive:
+                self._connections.pop(ident).close_physical()
+
+    def close_all(self):
+        """Close every connection opened by this pool"""
+        with self._lock:
+            for conn in self._connections.values():
+                conn.close_physical()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path=None):
+    """Get the shared pool for a database file (Config.DATABASE_PATH by default)"""
+    key = os.path.abspath(db_path or Config.DATABASE_PATH)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(key)
+            _pools[key] = pool
+        return pool
+
+
+def get_connection(db_path=None):
+    """Get the calling thread's pooled connection for a database file"""
+    return get_pool(db_path).get_connection()
+
+
+def close_all_pools():
+    """Close all pooled connections (called automatically at exit)"""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close_all()
+        _pools.clear()
+
+
+atexit.register(close_all_pools)
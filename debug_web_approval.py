@@ -2,6 +2,8 @@ import sqlite3
 import customtkinter as ctk
 from tkinter import messagebox, ttk
 from datetime import datetime
+from record_numbers import next_record_number
+from presence import record_check_event
 
 class ApprovalProcessDebugger:
     def __init__(self):
@@ -296,7 +298,7 @@ class ApprovalProcessDebugger:
                 self.log_message(f"✅ Created new student: ID {student_id}")
             
             # Generate record number
-            record_number = f"WEB{datetime.now().strftime('%Y%m%d%H%M%S')}"
+            record_number = next_record_number(conn)
             self.log_message(f"✅ Generated record number: {record_number}")
             
             # Register gadget
@@ -309,10 +311,7 @@ class ApprovalProcessDebugger:
             self.log_message(f"✅ Gadget registered: ID {gadget_id}")
             
             # Create check-in record
-            cursor.execute('''
-                INSERT INTO check_records (gadget_id, check_in_time, status)
-                VALUES (?, ?, ?)
-            ''', (gadget_id, datetime.now(), 'checked_in'))
+            record_check_event(cursor, gadget_id, 'checked_in')
             self.log_message("✅ Check-in record created")
             
             # Mark web registration as approved
@@ -1,6 +1,7 @@
 # diagnose_api.py
 import requests
 import json
+from config import Config
 
 def diagnose_api():
     print("🔍 DIAGNOSING API RESPONSE FORMAT")
@@ -8,7 +9,7 @@ def diagnose_api():
     
     try:
         # Test the API endpoint
-        response = requests.get('http://localhost:5000/api/pending-registrations', timeout=10)
+        response = requests.get(f'{Config.WEB_BASE_URL}/api/pending-registrations', timeout=10)
         
         print(f"📊 Response Status: {response.status_code}")
         print(f"📋 Response Headers: {dict(response.headers)}")
@@ -0,0 +1,72 @@
+import threading
+from collections import deque
+
+from config import Config
+
+# In-process publish/subscribe for the desktop app. Screens subscribe to the
+# events they display instead of re-querying after every action.
+
+# Payload: gadget_id, action ('checked_in' / 'checked_out'), event_time,
+# student_name, gadget_type, record_number
+GADGET_CHECKED = "gadget.checked"
+# Payload: web_registration_id, record_number
+REGISTRATION_APPROVED = "registration.approved"
+
+
+class EventBus:
+    """Synchronous event dispatch; a failing subscriber does not stop the others"""
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, event_type, callback):
+        """Register callback(**payload); returns a function that unsubscribes it"""
+        with self._lock:
+            self._subscribers.setdefault(event_type, []).append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                callbacks = self._subscribers.get(event_type, [])
+                if callback in callbacks:
+                    callbacks.remove(callback)
+        return unsubscribe
+
+    def publish(self, event_type, **payload):
+        with self._lock:
+            callbacks = list(self._subscribers.get(event_type, []))
+        for callback in callbacks:
+            try:
+                callback(**payload)
+            except Exception as e:
+                print(f"❌ Event handler failed for {event_type}: {e}")
+
+
+class ActivityFeed:
+    """Newest-first ring buffer of recent check in/out activity"""
+
+    def __init__(self, size=None):
+        self.size = size or Config.ACTIVITY_FEED_SIZE
+        self._items = deque(maxlen=self.size)
+        self.loaded = False
+
+    def load(self, activities):
+        """Replace the buffer with activities ordered newest first"""
+        self._items.clear()
+        self._items.extend(list(activities)[:self.size])
+        self.loaded = True
+
+    def add(self, activity):
+        """Insert the newest activity; returns the one evicted from the end, if any"""
+        evicted = self._items[-1] if len(self._items) == self.size else None
+        self._items.appendleft(activity)
+        return evicted
+
+    def __iter__(self):
+        return iter(list(self._items))
+
+    def __len__(self):
+        return len(self._items)
+
+
+bus = EventBus()
@@ -0,0 +1,149 @@
+import re
+import sqlite3
+
+# FTS5 index over the fields officers search by at the gate. rowid is the
+# gadget id; triggers on gadgets/students keep it in sync.
+SEARCH_TABLE = "gadget_search"
+
+RESULT_COLUMNS = '''
+    g.id,
+    g.record_number,
+    g.gadget_type,
+    g.brand,
+    g.model,
+    g.serial_number,
+    g.status,
+    s.full_name,
+    s.registration_number
+'''
+
+SEARCH_TRIGGERS = [
+    '''
+    CREATE TRIGGER IF NOT EXISTS gadget_search_gadget_insert AFTER INSERT ON gadgets
+    BEGIN
+        INSERT INTO gadget_search (rowid, record_number, serial_number, full_name, registration_number)
+        VALUES (new.id, new.record_number, new.serial_number,
+                (SELECT full_name FROM students WHERE id = new.student_id),
+                (SELECT registration_number FROM students WHERE id = new.student_id));
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS gadget_search_gadget_update
+    AFTER UPDATE OF record_number, serial_number, student_id ON gadgets
+    BEGIN
+        DELETE FROM gadget_search WHERE rowid = old.id;
+        INSERT INTO gadget_search (rowid, record_number, serial_number, full_name, registration_number)
+        VALUES (new.id, new.record_number, new.serial_number,
+                (SELECT full_name FROM students WHERE id = new.student_id),
+                (SELECT registration_number FROM students WHERE id = new.student_id));
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS gadget_search_gadget_delete AFTER DELETE ON gadgets
+    BEGIN
+        DELETE FROM gadget_search WHERE rowid = old.id;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS gadget_search_student_update
+    AFTER UPDATE OF full_name, registration_number ON students
+    BEGIN
+        UPDATE gadget_search
+        SET full_name = new.full_name, registration_number = new.registration_number
+        WHERE rowid IN (SELECT id FROM gadgets WHERE student_id = new.id);
+    END
+    ''',
+]
+
+def fts5_available(conn):
+    """Check whether this SQLite build can create FTS5 tables"""
+    try:
+        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp.fts5_probe USING fts5(x)")
+        conn.execute("DROP TABLE temp.fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+def search_index_exists(conn):
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name = ?", (SEARCH_TABLE,)
+    ).fetchone()
+    return row is not None
+
+def create_search_index(cursor):
+    """Create the FTS5 table and sync triggers, then index existing gadgets.
+
+    Returns False (and leaves the schema untouched) when FTS5 is unavailable,
+    in which case search_gadgets() keeps using LIKE.
+    """
+    if not fts5_available(cursor.connection):
+        print("⚠️ SQLite FTS5 not available - gadget search will use LIKE matching")
+        return False
+
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS gadget_search USING fts5(
+            record_number, serial_number, full_name, registration_number,
+            prefix = '2 3'
+        )
+    ''')
+    for trigger in SEARCH_TRIGGERS:
+        cursor.execute(trigger)
+
+    rebuild_search_index(cursor)
+    return True
+
+def rebuild_search_index(cursor):
+    """Re-populate the search index from gadgets/students (drift repair)"""
+    cursor.execute("DELETE FROM gadget_search")
+    cursor.execute('''
+        INSERT INTO gadget_search (rowid, record_number, serial_number, full_name, registration_number)
+        SELECT g.id, g.record_number, g.serial_number, s.full_name, s.registration_number
+        FROM gadgets g
+        LEFT JOIN students s ON g.student_id = s.id
+    ''')
+
+def build_match_query(search_term):
+    """Turn free text into an FTS5 query: every token must match, as a prefix"""
+    tokens = re.findall(r"\w+", search_term, re.UNICODE)
+    return " AND ".join(f'"{token}"*' for token in tokens)
+
+def search_gadgets(conn, search_term, limit=10):
+    """Find gadgets by record number, serial number, student name or reg number.
+
+    Uses the ranked FTS5 index when present; a miss there is an empty
+    result. The original leading-wildcard LIKE scan is only used when the
+    index is missing (no FTS5 in this SQLite build) or the FTS query fails.
+    Rows are (id, record_number, gadget_type, brand, model, serial_number,
+    status, full_name, registration_number).
+    """
+    if search_index_exists(conn):
+        match_query = build_match_query(search_term)
+        if not match_query:
+            return []
+        try:
+            cursor = conn.execute(f'''
+                SELECT {RESULT_COLUMNS}
+                FROM gadget_search fs
+                JOIN gadgets g ON g.id = fs.rowid
+                JOIN students s ON g.student_id = s.id
+                WHERE gadget_search MATCH ?
+                ORDER BY fs.rank, g.created_at DESC
+                LIMIT ?
+            ''', (match_query, limit))
+            return cursor.fetchall()
+        except sqlite3.OperationalError as e:
+            print(f"⚠️ Full-text search failed, falling back to LIKE: {e}")
+
+    pattern = f"%{search_term}%"
+    cursor = conn.execute(f'''
+        SELECT {RESULT_COLUMNS}
+        FROM gadgets g
+        JOIN students s ON g.student_id = s.id
+        WHERE g.record_number LIKE ?
+        OR g.serial_number LIKE ?
+        OR s.full_name LIKE ?
+        OR s.registration_number LIKE ?
+        ORDER BY g.created_at DESC
+        LIMIT ?
+    ''', (pattern, pattern, pattern, pattern, limit))
+    return cursor.fetchall()
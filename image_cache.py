@@ -0,0 +1,95 @@
+import os
+import threading
+from collections import OrderedDict
+
+from config import Config
+
+# LRU cache of decoded images, bounded by the bytes their pixel buffers hold
+# rather than by entry count: one full-size camera photo costs as much as
+# hundreds of thumbnails.
+
+def decoded_size(image):
+    """Bytes held by a decoded PIL image"""
+    return image.width * image.height * len(image.getbands())
+
+
+class LRUImageCache:
+    """Thread-safe LRU cache of decoded images keyed by (path, size).
+
+    Entries remember the source file's mtime and are dropped when the file
+    changes. Values are dicts so callers can attach per-entry objects (e.g.
+    the CTkImage wrapping the decoded image).
+    """
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes or Config.IMAGE_CACHE_MAX_MB * 1024 * 1024
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, source_path):
+        """Cached entry for key, or None if absent or the source file changed"""
+        mtime = self._mtime(source_path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['mtime'] == mtime:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            if entry is not None:
+                self._remove(key)
+                self.invalidations += 1
+            self.misses += 1
+            return None
+
+    def put(self, key, source_path, image, **extra):
+        """Store a decoded image; evicts least recently used entries over budget"""
+        entry = dict(extra, image=image, mtime=self._mtime(source_path), bytes=decoded_size(image))
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self.total_bytes += entry['bytes']
+            while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+        return entry
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self.total_bytes -= entry['bytes']
+
+    @staticmethod
+    def _mtime(path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
@@ -1,29 +1,57 @@
 # launch.py - User-friendly launcher
+import importlib.util
 import os
 import sys
 import subprocess
+import time
 import tkinter as tk
 from tkinter import messagebox
 
 def check_dependencies():
-    """Check if required packages are installed"""
-    required_packages = [
-        'customtkinter',
-        'pillow', 
-        'pandas',
-        'requests',
-        'matplotlib'
-    ]
+    """Check if required packages are installed (without importing them)"""
+    required_packages = {
+        'customtkinter': 'customtkinter',
+        'pillow': 'PIL',
+        'pandas': 'pandas',
+        'requests': 'requests',
+        'matplotlib': 'matplotlib'
+    }
     
     missing = []
-    for package in required_packages:
-        try:
-            __import__(package)
-        except ImportError:
+    for package, module in required_packages.items():
+        if importlib.util.find_spec(module) is None:
             missing.append(package)
     
     return missing
 
+def report_import_times(statement="import main", top=15):
+    """Print where startup import time goes, from a python -X importtime run"""
+    from lazy_imports import parse_importtime
+    
+    print(f"⏱️ Profiling imports: {statement}")
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                            capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        print(f"❌ Import failed:\n{result.stderr.splitlines()[-1] if result.stderr else ''}")
+        return
+    
+    rows = parse_importtime(result.stderr)
+    # Top-level packages, with everything they pulled in
+    packages = {}
+    for name, self_us, cumulative_us, depth in rows:
+        root = name.split(".")[0]
+        packages[root] = packages.get(root, 0) + self_us
+    
+    print(f"{'Package':<30}{'Time (ms)':>12}")
+    print("-" * 42)
+    for root, total_us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"{root:<30}{total_us / 1000:>12.1f}")
+    print("-" * 42)
+    print(f"{'All imports':<30}{sum(packages.values()) / 1000:>12.1f}")
+    print(f"{'Process wall time':<30}{elapsed * 1000:>12.1f}")
+
 def install_dependencies(missing_packages):
     """Install missing packages"""
     try:
@@ -36,6 +64,10 @@ def install_dependencies(missing_packages):
         return False
 
 def main():
+    if "--import-times" in sys.argv:
+        report_import_times()
+        return
+    
     print("🚀 Campus Gadget System Launcher")
     print("=" * 40)
     
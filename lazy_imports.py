@@ -0,0 +1,41 @@
+import importlib.util
+import sys
+
+# Deferred imports for the desktop app. A module returned by lazy_import()
+# is bound immediately but only executed on first attribute access, so
+# heavy dependencies used by a single screen (e.g. requests for web sync)
+# cost nothing until that screen is opened.
+
+def lazy_import(name):
+    """Module object for ``name`` that loads on first use"""
+    if name in sys.modules:
+        return sys.modules[name]
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named '{name}'")
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+def parse_importtime(stderr_text):
+    """Per-module rows from ``python -X importtime`` output.
+
+    Returns (module, self_us, cumulative_us, depth) tuples in import order;
+    depth 0 is a module imported directly by the profiled statement.
+    """
+    rows = []
+    for line in stderr_text.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        except ValueError:
+            continue
+        stripped = name.lstrip()
+        depth = (len(name) - len(stripped) - 1) // 2
+        rows.append((stripped.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
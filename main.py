@@ -7,86 +7,99 @@ from customtkinter import CTkImage  # Important: import CTkImage
 from tkinter import messagebox, ttk
 import tkinter as tk
 from auth import AuthSystem
-from database import Database
+from database import get_database
+from gadget_search import search_gadgets
+from dashboard_counters import get_dashboard_counters
+from report_jobs import ReportJobManager
+from registration_sync import get_sync_cursor, apply_changes
+from record_numbers import allocate_record_numbers, next_record_number
 from datetime import datetime, timedelta
-import pandas as pd
 import os
-from PIL import Image, ImageTk  # Keep this for other uses, but don't use for CTk labels
-import shutil
 import sqlite3
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter, A4
-try:
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-except Exception:
-    SimpleDocTemplate = Table = TableStyle = Paragraph = Spacer = None
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib import colors
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import requests
-from reports_gui import add_reports_to_main_app
+from config import Config
+from PIL import Image  # Keep this for other uses, but don't use for CTk labels
+from thumbnails import best_variant, get_thumbnail_service
+from image_cache import LRUImageCache
+from records_view import VirtualRecordsView
+from event_bus import bus, ActivityFeed, GADGET_CHECKED, REGISTRATION_APPROVED
+from presence import record_check_event
+from write_queue import get_write_queue
+from change_log import start_change_shipping
+from lazy_imports import lazy_import
+from concurrent.futures import ThreadPoolExecutor
+
+# Heavy modules load on first use so the login screen appears quickly:
+# requests on the first web sync, reports_module (pandas, matplotlib,
+# seaborn, reportlab) when the reports screen is opened.
+requests = lazy_import("requests")  # For web API calls
 
 # Image Manager for proper CTkImage handling
 class ImageManager:
     def __init__(self):
-        self.image_cache = {}
+        # Bounded by decoded bytes (Config.IMAGE_CACHE_MAX_MB), LRU eviction
+        self.image_cache = LRUImageCache()
+        self._prefetch_executor = None
+    
+    def _decode(self, image_path, size):
+        """Decode the smallest derivative covering size, reduced to 2x size for HighDPI"""
+        source_path = best_variant(image_path, size)
+        if source_path == image_path:
+            get_thumbnail_service().submit(image_path)
+        
+        pil_image = Image.open(source_path)
+        pil_image.thumbnail((size[0] * 2, size[1] * 2))
+        pil_image.load()
+        return pil_image
+    
+    def _get_entry(self, image_path, size):
+        key = (image_path, tuple(size))
+        entry = self.image_cache.get(key, image_path)
+        if entry is None:
+            entry = self.image_cache.put(key, image_path, self._decode(image_path, size))
+        return entry
     
     def load_ctk_image(self, image_path, size=(100, 100)):
         """Load image as CTkImage for HighDPI compatibility"""
         if not image_path or not os.path.exists(image_path):
             return None
-            
-        cache_key = f"{image_path}_{size[0]}_{size[1]}"
-        if cache_key in self.image_cache:
-            return self.image_cache[cache_key]
         
         try:
-            pil_image = Image.open(image_path)
-            ctk_image = CTkImage(
-                light_image=pil_image,
-                dark_image=pil_image,
-                size=size
-            )
-            self.image_cache[cache_key] = ctk_image
-            return ctk_image
+            entry = self._get_entry(image_path, size)
+            if entry.get('ctk_image') is None:
+                # CTkImage is only created on the UI thread, never by prefetch
+                entry['ctk_image'] = CTkImage(
+                    light_image=entry['image'],
+                    dark_image=entry['image'],
+                    size=size
+                )
+            return entry['ctk_image']
         except Exception as e:
             print(f"Error loading image {image_path}: {e}")
             return None
+    
+    def prefetch(self, image_paths, size=(100, 100)):
+        """Decode images into the cache on a background thread"""
+        if self._prefetch_executor is None:
+            self._prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="image-prefetch")
+        
+        for image_path in image_paths:
+            if image_path and (image_path, tuple(size)) not in self.image_cache:
+                self._prefetch_executor.submit(self._prefetch_one, image_path, size)
+    
+    def _prefetch_one(self, image_path, size):
+        try:
+            if os.path.exists(image_path):
+                self._get_entry(image_path, size)
+        except Exception as e:
+            print(f"⚠️ Prefetch failed for {image_path}: {e}")
+    
+    def cache_stats(self):
+        """Hit/miss/eviction counters and memory use of the image cache"""
+        return self.image_cache.stats()
 
 # Global image manager instance
 image_manager = ImageManager()
 
-ctk.set_appearance_mode("System")
-ctk.set_default_color_theme("blue")
-import customtkinter as ctk
-from tkinter import messagebox, ttk
-import tkinter as tk
-from auth import AuthSystem
-from database import Database
-from datetime import datetime, timedelta
-import pandas as pd
-import os
-import config
-from PIL import Image, ImageTk
-import shutil
-import sqlite3
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter, A4
-try:
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-except Exception:
-    # reportlab.platypus may not be installed in the environment; provide safe fallbacks
-    SimpleDocTemplate = Table = TableStyle = Paragraph = Spacer = None
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib import colors
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import requests  # For web API calls
-from reports_gui import add_reports_to_main_app
-import tkinter as tk
-from tkinter import messagebox, ttk
-
 ctk.set_appearance_mode("System")
 ctk.set_default_color_theme("blue")
 
@@ -97,7 +110,19 @@ class CampusGadgetSystem:
         self.root.geometry("1400x800")
         
         self.auth = AuthSystem()
-        self.db = Database()
+        self.db = get_database()
+        # Check events and registrations are committed in groups by one writer
+        self.write_queue = get_write_queue(self.db.db_path)
+        # Continuous backup: without the service nothing else takes the base
+        # backups or ships the change_log segments that replay onto them
+        if Config.AUTO_BACKUP:
+            self.db.start_backup_schedule(Config.BACKUP_INTERVAL_HOURS)
+        start_change_shipping(self.db.db_path, self.db.backup_dir)
+        self.report_jobs = ReportJobManager(self.root)
+        
+        # Recent activity is kept current from events, not re-queried
+        self.activity_feed = ActivityFeed()
+        bus.subscribe(GADGET_CHECKED, self.on_gadget_checked)
         
         self.setup_ui()
     
@@ -216,29 +241,39 @@ class CampusGadgetSystem:
         conn = self.db.get_connection()
         cursor = conn.cursor()
         
-        # Get comprehensive stats
-        cursor.execute("SELECT COUNT(*) FROM gadgets")
-        total_gadgets = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM gadgets WHERE status = 'checked_in'")
-        gadgets_in_campus = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM gadgets WHERE status = 'checked_out'")
-        gadgets_out_campus = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM students")
-        total_students = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM users")
-        total_users = cursor.fetchone()[0]
-        
-        # Today's activity
+        # Trigger-maintained counters: a single-row read
         today = datetime.now().strftime('%Y-%m-%d')
-        cursor.execute('''
-            SELECT COUNT(*) FROM check_records 
-            WHERE DATE(check_in_time) = ? OR DATE(check_out_time) = ?
-        ''', (today, today))
-        today_activity = cursor.fetchone()[0]
+        counters = get_dashboard_counters(conn, today)
+        
+        if counters:
+            total_gadgets = counters['total_gadgets']
+            gadgets_in_campus = counters['gadgets_in_campus']
+            gadgets_out_campus = counters['gadgets_out_campus']
+            total_students = counters['total_students']
+            total_users = counters['total_users']
+            today_activity = counters['today_activity']
+        else:
+            # Counters not migrated yet - count directly
+            cursor.execute("SELECT COUNT(*) FROM gadgets")
+            total_gadgets = cursor.fetchone()[0]
+            
+            cursor.execute("SELECT COUNT(*) FROM gadgets WHERE status = 'checked_in'")
+            gadgets_in_campus = cursor.fetchone()[0]
+            
+            cursor.execute("SELECT COUNT(*) FROM gadgets WHERE status = 'checked_out'")
+            gadgets_out_campus = cursor.fetchone()[0]
+            
+            cursor.execute("SELECT COUNT(*) FROM students")
+            total_students = cursor.fetchone()[0]
+            
+            cursor.execute("SELECT COUNT(*) FROM users")
+            total_users = cursor.fetchone()[0]
+            
+            cursor.execute('''
+                SELECT COUNT(*) FROM check_records 
+                WHERE DATE(check_in_time) = ? OR DATE(check_out_time) = ?
+            ''', (today, today))
+            today_activity = cursor.fetchone()[0]
         
         conn.close()
         
@@ -315,40 +350,9 @@ class CampusGadgetSystem:
                     messagebox.showerror("Error", f"Please fill in {key.replace('_', ' ')}")
                     return
             
-            conn = self.db.get_connection()
-            cursor = conn.cursor()
-            
-            # Check if student exists
-            cursor.execute("SELECT id FROM students WHERE registration_number = ?", (data['reg_number'],))
-            student = cursor.fetchone()
-            
-            if student:
-                student_id = student[0]
-            else:
-                # Create student
-                cursor.execute('''
-                    INSERT INTO students (full_name, registration_number, national_id)
-                    VALUES (?, ?, ?)
-                ''', (data['student_name'], data['reg_number'], "N/A"))
-                student_id = cursor.lastrowid
-            
-            # Register gadget
-            record_number = f"G{datetime.now().strftime('%Y%m%d%H%M%S')}"
-            cursor.execute('''
-                INSERT INTO gadgets (student_id, record_number, gadget_type, brand, model, serial_number)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (student_id, record_number, data['gadget_type'], "N/A", "N/A", data['serial_number']))
-            
-            gadget_id = cursor.lastrowid
-            
-            # Create check-in record
-            cursor.execute('''
-                INSERT INTO check_records (gadget_id, check_in_time, status)
-                VALUES (?, ?, ?)
-            ''', (gadget_id, datetime.now(), 'checked_in'))
-            
-            conn.commit()
-            conn.close()
+            officer_id = self.officer_id()
+            record_number = self.write_queue.execute(
+                lambda conn: self.insert_simple_registration(conn, data, officer_id))
             
             messagebox.showinfo("Success", f"Gadget registered!\nRecord Number: {record_number}")
             
@@ -361,47 +365,52 @@ class CampusGadgetSystem:
         except Exception as e:
             messagebox.showerror("Error", f"Registration failed: {str(e)}")
     
+    def insert_simple_registration(self, conn, data, officer_id):
+        """Student (if new), gadget and initial check-in for the quick register
+        form; runs inside the caller's transaction. Returns the record number."""
+        cursor = conn.cursor()
+        
+        # Check if student exists
+        cursor.execute("SELECT id FROM students WHERE registration_number = ?", (data['reg_number'],))
+        student = cursor.fetchone()
+        
+        if student:
+            student_id = student[0]
+        else:
+            # Create student
+            cursor.execute('''
+                INSERT INTO students (full_name, registration_number, national_id)
+                VALUES (?, ?, ?)
+            ''', (data['student_name'], data['reg_number'], "N/A"))
+            student_id = cursor.lastrowid
+        
+        # Register gadget
+        record_number = next_record_number(conn, prefix="G")
+        cursor.execute('''
+            INSERT INTO gadgets (student_id, record_number, gadget_type, brand, model, serial_number)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (student_id, record_number, data['gadget_type'], "N/A", "N/A", data['serial_number']))
+        
+        gadget_id = cursor.lastrowid
+        
+        # Create check-in record
+        record_check_event(cursor, gadget_id, 'checked_in', officer_id)
+        return record_number
+    
     def show_records(self):
         self.clear_content()
         
         ctk.CTkLabel(self.content_frame, text="View Records", 
                     font=ctk.CTkFont(size=24, weight="bold")).pack(pady=20)
         
-        # Simple records display
+        # Records display - paged in as the user scrolls
         records_frame = ctk.CTkFrame(self.content_frame)
         records_frame.pack(fill="both", expand=True, padx=20, pady=10)
         
         ctk.CTkLabel(records_frame, text="Gadget Records", 
                     font=ctk.CTkFont(size=18, weight="bold")).pack(pady=10)
         
-        # Create treeview
-        tree = ttk.Treeview(records_frame, columns=("Record No", "Student", "Gadget", "Serial No"), show="headings", height=15)
-        
-        for col in ["Record No", "Student", "Gadget", "Serial No"]:
-            tree.heading(col, text=col)
-            tree.column(col, width=150)
-        
-        scrollbar = ttk.Scrollbar(records_frame, orient="vertical", command=tree.yview)
-        tree.configure(yscrollcommand=scrollbar.set)
-        
-        tree.pack(side="left", fill="both", expand=True, padx=5, pady=5)
-        scrollbar.pack(side="right", fill="y", pady=5)
-        
-        # Load data
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT g.record_number, s.full_name, g.gadget_type, g.serial_number
-            FROM gadgets g
-            JOIN students s ON g.student_id = s.id
-            ORDER BY g.created_at DESC
-        ''')
-        
-        for row in cursor.fetchall():
-            tree.insert("", "end", values=row)
-        
-        conn.close()
+        self.records_view = VirtualRecordsView(records_frame, self.db)
     
     def show_check_io(self):
         self.clear_content()
@@ -451,6 +460,22 @@ class CampusGadgetSystem:
         
         ctk.CTkButton(self.action_frame, text="🔄 Clear", 
                     command=self.clear_check_results).pack(side="left", expand=True, padx=5)
+        
+        # Recent activity panel (updated incrementally by gadget events)
+        activity_frame = ctk.CTkFrame(main_frame)
+        activity_frame.pack(fill="both", expand=True, padx=10, pady=10)
+        
+        ctk.CTkLabel(activity_frame, text="Recent Activity", 
+                    font=ctk.CTkFont(size=16, weight="bold")).pack(anchor="w", pady=5)
+        
+        self.activity_tree = ttk.Treeview(activity_frame, columns=("Time", "Student", "Gadget", "Action", "Record No"),
+                                          show="headings", height=8)
+        for col in ("Time", "Student", "Gadget", "Action", "Record No"):
+            self.activity_tree.heading(col, text=col)
+            self.activity_tree.column(col, width=130)
+        self.activity_tree.pack(fill="both", expand=True, padx=5, pady=5)
+        
+        self.load_recent_activity()
 
     def simple_check_search(self):
         """Simple search functionality for check in/out"""
@@ -466,19 +491,8 @@ class CampusGadgetSystem:
         
         try:
             conn = self.db.get_connection()
-            cursor = conn.cursor()
-            
-            # Search for gadgets
-            cursor.execute('''
-                SELECT g.record_number, g.gadget_type, g.brand, g.model, 
-                    g.serial_number, g.status, s.full_name
-                FROM gadgets g
-                JOIN students s ON g.student_id = s.id
-                WHERE g.record_number LIKE ? OR g.serial_number LIKE ? OR s.full_name LIKE ?
-                LIMIT 5
-            ''', (f"%{search_term}%", f"%{search_term}%", f"%{search_term}%"))
-            
-            results = cursor.fetchall()
+            # Search for gadgets (full-text index, LIKE fallback)
+            results = [row[1:8] for row in search_gadgets(conn, search_term, limit=5)]
             conn.close()
             
             if results:
@@ -550,33 +564,15 @@ class CampusGadgetSystem:
         
         try:
             conn = self.db.get_connection()
-            cursor = conn.cursor()
-            
-            # Search in gadgets with student info
-            cursor.execute('''
-                SELECT 
-                    g.id,
-                    g.record_number,
-                    g.gadget_type,
-                    g.brand,
-                    g.model,
-                    g.serial_number,
-                    g.status,
-                    s.full_name,
-                    s.registration_number
-                FROM gadgets g
-                JOIN students s ON g.student_id = s.id
-                WHERE g.record_number LIKE ? 
-                OR g.serial_number LIKE ?
-                OR s.full_name LIKE ?
-                OR s.registration_number LIKE ?
-                ORDER BY g.created_at DESC
-                LIMIT 10
-            ''', (f"%{search_term}%", f"%{search_term}%", f"%{search_term}%", f"%{search_term}%"))
-            
-            results = cursor.fetchall()
+            # Search in gadgets with student info (full-text index, LIKE fallback)
+            results = search_gadgets(conn, search_term, limit=10)
             conn.close()
             
+            # Warm the image cache for whichever result gets opened next
+            photo_paths = [path for photos in self.get_gadget_photos([row[0] for row in results]).values()
+                           for path in photos]
+            image_manager.prefetch(photo_paths, size=(100, 100))
+            
             if results:
                 if len(results) == 1:
                     # Single result - show details
@@ -591,6 +587,25 @@ class CampusGadgetSystem:
         except Exception as e:
             messagebox.showerror("Error", f"Search failed: {str(e)}")
 
+    def get_gadget_photos(self, gadget_ids):
+        """Map gadget id -> (passport photo, gadget photo) paths that are set"""
+        if not gadget_ids:
+            return {}
+        
+        conn = self.db.get_connection()
+        try:
+            placeholders = ",".join("?" * len(gadget_ids))
+            rows = conn.execute(f'''
+                SELECT id, passport_photo, gadget_photo FROM gadgets
+                WHERE id IN ({placeholders})
+            ''', list(gadget_ids)).fetchall()
+        except sqlite3.OperationalError:
+            rows = []  # Older schema without photo columns
+        finally:
+            conn.close()
+        
+        return {row[0]: tuple(path for path in row[1:] if path) for row in rows}
+    
     def show_search_results(self, results):
         """Show multiple search results for selection"""
         for widget in self.gadget_details_frame.winfo_children():
@@ -658,12 +673,23 @@ class CampusGadgetSystem:
                         font=ctk.CTkFont(weight="bold")).pack(side="left", padx=5)
             ctk.CTkLabel(info_frame, text=value).pack(side="left", padx=5)
         
+        # Photos for visual identification at the gate
+        photos = self.get_gadget_photos([gadget_id]).get(gadget_id, ())
+        photo_images = [image_manager.load_ctk_image(path, size=(100, 100)) for path in photos]
+        if any(photo_images):
+            photos_frame = ctk.CTkFrame(details_frame)
+            photos_frame.pack(fill="x", pady=5)
+            for photo in photo_images:
+                if photo:
+                    ctk.CTkLabel(photos_frame, image=photo, text="").pack(side="left", padx=5)
+        
         # Store current gadget info
         self.current_gadget = {
             'id': gadget_id,
             'record_number': record_no,
             'status': status,
-            'student_name': student_name
+            'student_name': student_name,
+            'gadget_type': gadget_type
         }
         
         # Show appropriate action buttons
@@ -708,30 +734,21 @@ class CampusGadgetSystem:
             return
         
         try:
-            conn = self.db.get_connection()
-            cursor = conn.cursor()
-            
             new_status = "checked_in" if action == "in" else "checked_out"
             timestamp = datetime.now()
+            officer_id = self.officer_id()
             
-            # Update gadget status
-            cursor.execute("UPDATE gadgets SET status = ? WHERE id = ?", 
-                        (new_status, gadget['id']))
+            # Event, presence, check record and gadget status in one transaction
+            self.write_queue.execute(
+                lambda conn: record_check_event(conn.cursor(), gadget['id'], new_status, officer_id, timestamp))
             
-            # Create check record
-            if action == "in":
-                cursor.execute('''
-                    INSERT INTO check_records (gadget_id, check_in_time, status)
-                    VALUES (?, ?, ?)
-                ''', (gadget['id'], timestamp, 'checked_in'))
-            else:
-                cursor.execute('''
-                    INSERT INTO check_records (gadget_id, check_out_time, status)
-                    VALUES (?, ?, ?)
-                ''', (gadget['id'], timestamp, 'checked_out'))
-            
-            conn.commit()
-            conn.close()
+            bus.publish(GADGET_CHECKED,
+                        gadget_id=gadget['id'],
+                        action=new_status,
+                        event_time=timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+                        student_name=gadget['student_name'],
+                        gadget_type=gadget.get('gadget_type', ''),
+                        record_number=gadget['record_number'])
             
             # Show success message
             success_msg = f"✅ Gadget {action_text} successfully!\n\n" \
@@ -739,72 +756,93 @@ class CampusGadgetSystem:
                         f"Time: {timestamp.strftime('%Y-%m-%d %H:%M:%S')}"
             messagebox.showinfo("Success", success_msg)
             
-            # Refresh the interface
+            # Refresh the interface (the activity panel updates from the event)
             self.search_for_check()  # Reload current gadget details
-            self.load_recent_activity()
             
         except Exception as e:
             messagebox.showerror("Error", f"Check {action} failed: {str(e)}")
 
     def load_recent_activity(self):
-        """Load recent check in/out activity"""
+        """Show recent check in/out activity from the in-memory feed.
+
+        The feed is filled from the database once (newest first via the
+        indexed event_time column) and then kept current by GADGET_CHECKED
+        events, so opening the panel does not re-run the query.
+        """
         try:
-            # Clear existing activity
-            for item in self.activity_tree.get_children():
-                self.activity_tree.delete(item)
-            
-            conn = self.db.get_connection()
-            cursor = conn.cursor()
-            
-            # Get recent activity (last 20 records)
-            cursor.execute('''
-                SELECT 
-                    cr.check_in_time,
-                    cr.check_out_time,
-                    cr.status,
-                    s.full_name,
-                    g.gadget_type,
-                    g.record_number
-                FROM check_records cr
-                JOIN gadgets g ON cr.gadget_id = g.id
-                JOIN students s ON g.student_id = s.id
-                ORDER BY COALESCE(cr.check_in_time, cr.check_out_time) DESC
-                LIMIT 20
-            ''')
-            
-            for row in cursor.fetchall():
-                check_in, check_out, status, student, gadget_type, record_no = row
+            if not self.activity_feed.loaded:
+                conn = self.db.get_connection()
+                cursor = conn.cursor()
                 
-                if status == 'checked_in':
-                    time = check_in
-                    action = "CHECK IN"
-                    action_icon = "✅"
-                else:
-                    time = check_out
-                    action = "CHECK OUT"
-                    action_icon = "🚪"
-                
-                # Format time
-                if time:
-                    time_str = time[:19]  # Show only date and time
-                else:
-                    time_str = "N/A"
+                cursor.execute('''
+                    SELECT 
+                        cr.event_time,
+                        cr.status,
+                        s.full_name,
+                        g.gadget_type,
+                        g.record_number,
+                        g.id
+                    FROM check_records cr
+                    JOIN gadgets g ON cr.gadget_id = g.id
+                    JOIN students s ON g.student_id = s.id
+                    WHERE cr.event_time IS NOT NULL
+                    ORDER BY cr.event_time DESC
+                    LIMIT ?
+                ''', (self.activity_feed.size,))
                 
-                # Shorten student name if too long
-                short_student = student[:15] + "..." if len(student) > 15 else student
+                self.activity_feed.load({
+                    'event_time': event_time,
+                    'action': status,
+                    'student_name': student,
+                    'gadget_type': gadget_type,
+                    'record_number': record_no,
+                    'gadget_id': gadget_id
+                } for event_time, status, student, gadget_type, record_no, gadget_id in cursor.fetchall())
                 
-                self.activity_tree.insert("", "end", values=(
-                    time_str,
-                    short_student,
-                    gadget_type,
-                    f"{action_icon} {action}",
-                    record_no
-                ))
+                conn.close()
             
-            conn.close()
+            if not self.activity_panel_visible():
+                return
+            
+            self.activity_tree.delete(*self.activity_tree.get_children())
+            for activity in self.activity_feed:
+                self.activity_tree.insert("", "end", values=self.format_activity_row(activity))
             
         except Exception as e:
             print(f"Error loading activity: {e}")
+    
+    def activity_panel_visible(self):
+        return hasattr(self, 'activity_tree') and self.activity_tree.winfo_exists()
+    
+    def format_activity_row(self, activity):
+        if activity['action'] == 'checked_in':
+            action = "✅ CHECK IN"
+        else:
+            action = "🚪 CHECK OUT"
+        
+        # Show only date and time
+        time_str = str(activity['event_time'])[:19] if activity['event_time'] else "N/A"
+        
+        # Shorten student name if too long
+        student = activity['student_name'] or ""
+        short_student = student[:15] + "..." if len(student) > 15 else student
+        
+        return (time_str, short_student, activity['gadget_type'], action, activity['record_number'])
+    
+    def on_gadget_checked(self, **activity):
+        """GADGET_CHECKED handler: push onto the feed and patch the panel in place"""
+        if not self.activity_feed.loaded:
+            return  # Loaded from the database (including this event) on first view
+        
+        self.activity_feed.add(activity)
+        if not self.activity_panel_visible():
+            return
+        
+        self.activity_tree.insert("", 0, values=self.format_activity_row(activity))
+        children = self.activity_tree.get_children()
+        if len(children) > self.activity_feed.size:
+            self.activity_tree.delete(*children[self.activity_feed.size:])
+    
     def show_reports(self):
         self.clear_content()
         
@@ -875,6 +913,7 @@ class CampusGadgetSystem:
     
     def create_new_user(self):
         """Create a new user account"""
+        conn = None
         try:
             # Collect form data
             user_data = {}
@@ -919,7 +958,6 @@ class CampusGadgetSystem:
             ))
             
             conn.commit()
-            conn.close()
             
             messagebox.showinfo("Success", f"User '{user_data['username']}' created successfully!")
             
@@ -940,6 +978,9 @@ class CampusGadgetSystem:
             messagebox.showerror("Error", "Username already exists!")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to create user: {str(e)}")
+        finally:
+            if conn:
+                conn.close()
 
     def load_users_list(self):
         """Load users into the management list"""
@@ -1137,6 +1178,9 @@ class CampusGadgetSystem:
         ctk.CTkButton(action_frame, text="❌ Reject Selected", command=self.reject_web_registration,
                      fg_color="red").pack(side="left", padx=5)
         ctk.CTkButton(action_frame, text="👁️ View Details", command=self.view_web_registration_details).pack(side="left", padx=5)
+        ctk.CTkButton(action_frame, text="☑️ Select All", command=self.select_all_web_registrations).pack(side="left", padx=5)
+        ctk.CTkButton(action_frame, text="✅ Bulk Approve Selected", command=self.bulk_approve_web_registrations,
+                     fg_color="darkgreen").pack(side="left", padx=5)
         
         self.load_web_registrations()
     def get_selected_web_reg_id(self):
@@ -1181,7 +1225,7 @@ class CampusGadgetSystem:
                 self.web_registrations_tree.delete(item)
             
             # Fetch pending registrations from web API
-            response = requests.get('http://localhost:5000/api/pending-registrations', timeout=10)
+            response = requests.get(f'{Config.WEB_BASE_URL}/api/pending-registrations', timeout=10)
             
             if response.status_code == 200:
                 registrations = response.json()
@@ -1252,7 +1296,7 @@ class CampusGadgetSystem:
                 student_id = cursor.lastrowid
 
             # ✅ Create a new record number
-            record_number = f"WEB{datetime.now().strftime('%Y%m%d%H%M%S')}"
+            record_number = next_record_number(conn)
 
             # ✅ Insert gadget entry
             cursor.execute('''
@@ -1262,10 +1306,7 @@ class CampusGadgetSystem:
             gadget_id = cursor.lastrowid
 
             # ✅ Log a check-in record
-            cursor.execute('''
-                INSERT INTO check_records (gadget_id, check_in_time, status)
-                VALUES (?, ?, ?)
-            ''', (gadget_id, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 'checked_in'))
+            record_check_event(cursor, gadget_id, 'checked_in', self.officer_id())
 
             # ✅ Update web registration status
             cursor.execute('''
@@ -1322,73 +1363,24 @@ class CampusGadgetSystem:
                 return False
             
             print(f"✅ APPROVAL: Found record - ID: {test_record[0]}, Student: {test_record[1]}, Status: {test_record[2]}")
+            conn.close()
             
-            # Get web registration data
-            cursor.execute('''
-                SELECT student_name, registration_number, national_id, 
-                    gadget_type, brand, model, serial_number 
-                FROM web_registrations 
-                WHERE id = ? AND status = 'pending'
-            ''', (web_registration_id,))
-            
-            web_data = cursor.fetchone()
-            
-            if not web_data:
+            try:
+                activity = self.write_queue.execute(
+                    lambda write_conn: self.transfer_web_registration(write_conn.cursor(), web_registration_id))
+            except ValueError:
                 print(f"❌ APPROVAL: Record exists but approval query failed. Current status: {test_record[2]}")
                 messagebox.showerror("Error", f"Web registration not found or already processed. Current status: {test_record[2]}")
-                conn.close()
                 return False
             
-            print(f"✅ APPROVAL: Approval data retrieved: {web_data}")
-            
-            student_name, reg_number, national_id, gadget_type, brand, model, serial_number = web_data
-            
-            # Rest of your approval logic...
-            # Check if student exists
-            cursor.execute("SELECT id FROM students WHERE registration_number = ?", (reg_number,))
-            student = cursor.fetchone()
-            
-            if student:
-                student_id = student[0]
-                cursor.execute('''
-                    UPDATE students SET full_name = ?, national_id = ? 
-                    WHERE id = ?
-                ''', (student_name, national_id, student_id))
-            else:
-                cursor.execute('''
-                    INSERT INTO students (full_name, registration_number, national_id)
-                    VALUES (?, ?, ?)
-                ''', (student_name, reg_number, national_id))
-                student_id = cursor.lastrowid
-            
-            record_number = f"WEB{datetime.now().strftime('%Y%m%d%H%M%S')}"
-            
-            cursor.execute('''
-                INSERT INTO gadgets (student_id, record_number, gadget_type, brand, model, serial_number, status)
-                VALUES (?, ?, ?, ?, ?, ?, 'checked_in')
-            ''', (student_id, record_number, gadget_type, brand, model, serial_number))
-            
-            gadget_id = cursor.lastrowid
-            
-            cursor.execute('''
-                INSERT INTO check_records (gadget_id, check_in_time, status)
-                VALUES (?, ?, ?)
-            ''', (gadget_id, datetime.now(), 'checked_in'))
-            
-            cursor.execute('''
-                UPDATE web_registrations SET status = 'approved' 
-                WHERE id = ?
-            ''', (web_registration_id,))
-            
-            conn.commit()
-            conn.close()
+            self.publish_approval(web_registration_id, activity)
             
             print(f"✅ APPROVAL: Successfully approved ID: {web_registration_id}")
             messagebox.showinfo("Success", 
                             f"Registration approved successfully!\n"
-                            f"Student: {student_name}\n"
-                            f"Gadget: {gadget_type}\n"
-                            f"Record No: {record_number}")
+                            f"Student: {activity['student_name']}\n"
+                            f"Gadget: {activity['gadget_type']}\n"
+                            f"Record No: {activity['record_number']}")
             
             self.load_web_registrations()
             return True
@@ -1397,6 +1389,164 @@ class CampusGadgetSystem:
             print(f"❌ APPROVAL: Error: {str(e)}")
             messagebox.showerror("Error", f"Approval failed: {str(e)}")
             return False
+    def transfer_web_registration(self, cursor, web_registration_id, record_number=None):
+        """Copy a pending web registration into students/gadgets and check it in.
+
+        Runs on the caller's cursor and does not commit. Returns the new
+        gadget's activity (the GADGET_CHECKED payload, to publish once the
+        caller commits); raises ValueError if the registration is missing or
+        no longer pending.
+        """
+        cursor.execute('''
+            SELECT student_name, registration_number, national_id, 
+                gadget_type, brand, model, serial_number 
+            FROM web_registrations 
+            WHERE id = ? AND status = 'pending'
+        ''', (web_registration_id,))
+        
+        web_data = cursor.fetchone()
+        if not web_data:
+            raise ValueError(f"Web registration {web_registration_id} not found or already processed")
+        
+        student_name, reg_number, national_id, gadget_type, brand, model, serial_number = web_data
+        
+        # Check if student exists
+        cursor.execute("SELECT id FROM students WHERE registration_number = ?", (reg_number,))
+        student = cursor.fetchone()
+        
+        if student:
+            student_id = student[0]
+            cursor.execute('''
+                UPDATE students SET full_name = ?, national_id = ? 
+                WHERE id = ?
+            ''', (student_name, national_id, student_id))
+        else:
+            cursor.execute('''
+                INSERT INTO students (full_name, registration_number, national_id)
+                VALUES (?, ?, ?)
+            ''', (student_name, reg_number, national_id))
+            student_id = cursor.lastrowid
+        
+        record_number = record_number or next_record_number(cursor.connection)
+        
+        cursor.execute('''
+            INSERT INTO gadgets (student_id, record_number, gadget_type, brand, model, serial_number, status)
+            VALUES (?, ?, ?, ?, ?, ?, 'checked_in')
+        ''', (student_id, record_number, gadget_type, brand, model, serial_number))
+        
+        gadget_id = cursor.lastrowid
+        
+        check_in_time = datetime.now()
+        record_check_event(cursor, gadget_id, 'checked_in', self.officer_id(), check_in_time)
+        
+        cursor.execute('''
+            UPDATE web_registrations SET status = 'approved' 
+            WHERE id = ?
+        ''', (web_registration_id,))
+        
+        # Pre-size the registration's photos for the desktop views
+        cursor.execute('''
+            SELECT passport_photo, student_card_photo, gadget_photo
+            FROM web_registrations WHERE id = ?
+        ''', (web_registration_id,))
+        get_thumbnail_service().submit(*cursor.fetchone())
+        
+        return {
+            'gadget_id': gadget_id,
+            'action': 'checked_in',
+            'event_time': check_in_time.strftime('%Y-%m-%d %H:%M:%S'),
+            'student_name': student_name,
+            'gadget_type': gadget_type,
+            'record_number': record_number
+        }
+    
+    def officer_id(self):
+        """User id of the logged-in officer, recorded on check events"""
+        user = self.auth.current_user
+        return user['id'] if user else None
+    
+    def publish_approval(self, web_registration_id, activity):
+        bus.publish(REGISTRATION_APPROVED, web_registration_id=web_registration_id,
+                    record_number=activity['record_number'])
+        bus.publish(GADGET_CHECKED, **activity)
+    
+    def get_selected_web_reg_ids(self):
+        """IDs of every selected web registration row (placeholder rows skipped)"""
+        ids = []
+        for item in self.web_registrations_tree.selection():
+            values = self.web_registrations_tree.item(item)['values']
+            if values and isinstance(values[0], int):
+                ids.append(values[0])
+        return ids
+    
+    def select_all_web_registrations(self):
+        self.web_registrations_tree.selection_set(self.web_registrations_tree.get_children())
+    
+    def transfer_web_registrations(self, conn, ids):
+        """Transfer several web registrations on the writer connection.
+
+        Returns (approved, failed): (id, activity) and (id, error) pairs.
+        """
+        cursor = conn.cursor()
+        approved = []
+        failed = []
+        record_numbers = allocate_record_numbers(conn, len(ids))
+        for web_registration_id, record_number in zip(ids, record_numbers):
+            # Savepoint per row: one bad registration does not undo the rest
+            cursor.execute("SAVEPOINT bulk_item")
+            try:
+                activity = self.transfer_web_registration(cursor, web_registration_id,
+                                                          record_number=record_number)
+                cursor.execute("RELEASE SAVEPOINT bulk_item")
+                approved.append((web_registration_id, activity))
+            except (ValueError, sqlite3.Error) as e:
+                cursor.execute("ROLLBACK TO SAVEPOINT bulk_item")
+                cursor.execute("RELEASE SAVEPOINT bulk_item")
+                failed.append((web_registration_id, str(e)))
+        return approved, failed
+    
+    def bulk_approve_web_registrations(self):
+        """Approve every selected web registration in one group commit"""
+        if not hasattr(self, 'web_registrations_tree'):
+            return
+        
+        ids = self.get_selected_web_reg_ids()
+        if not ids:
+            messagebox.showwarning("Warning", "Please select the web registrations to approve")
+            return
+        
+        if not messagebox.askyesno("Confirm Bulk Approval",
+                                   f"Approve {len(ids)} selected registration(s)?"):
+            return
+        
+        try:
+            approved, failed = self.write_queue.execute(self.transfer_web_registrations, ids)
+        except Exception as e:
+            messagebox.showerror("Error", f"Bulk approval failed: {str(e)}")
+            return
+        
+        print(f"✅ BULK APPROVAL: {len(approved)} approved, {len(failed)} failed")
+        for web_registration_id, activity in approved:
+            self.publish_approval(web_registration_id, activity)
+        
+        # Let the web server close them too, so they leave its pending list
+        if approved:
+            try:
+                requests.post(f'{Config.WEB_BASE_URL}/api/registrations/batch',
+                              json={'action': 'approve', 'ids': [reg_id for reg_id, _ in approved]},
+                              timeout=30)
+            except requests.exceptions.RequestException as e:
+                print(f"⚠️ Could not update web server: {e}")
+        
+        summary = f"Approved: {len(approved)}\nFailed: {len(failed)}"
+        if failed:
+            summary += "\n\n" + "\n".join(f"ID {reg_id}: {error}" for reg_id, error in failed[:10])
+            if len(failed) > 10:
+                summary += f"\n... and {len(failed) - 10} more"
+        messagebox.showinfo("Bulk Approval", summary)
+        
+        self.load_web_registrations()
+    
     def approve_selected_web_registration(self):
         """Wrapper method that gets selected ID from treeview and calls approval"""
         try:
@@ -1458,7 +1608,7 @@ class CampusGadgetSystem:
         if messagebox.askyesno("Confirm Rejection", 
                               f"Are you sure you want to reject the registration for {student_name}?"):
             try:
-                response = requests.post(f'http://localhost:5000/api/reject-registration/{registration_id}', timeout=10)
+                response = requests.post(f'{Config.WEB_BASE_URL}/api/reject-registration/{registration_id}', timeout=10)
                 
                 if response.status_code == 200:
                     result = response.json()
@@ -1491,8 +1641,10 @@ class CampusGadgetSystem:
         registration_id = values[0]
         
         try:
-            # Fetch detailed information
-            response = requests.get('http://localhost:5000/api/pending-registrations', timeout=10)
+            # Fetch detailed information - just this row, via the keyset cursor
+            response = requests.get(f'{Config.WEB_BASE_URL}/api/pending-registrations',
+                                    params={'since_id': int(registration_id) - 1, 'limit': 1},
+                                    timeout=10)
             
             if response.status_code == 200:
                 registrations = response.json()
@@ -1531,6 +1683,17 @@ class CampusGadgetSystem:
                         ctk.CTkLabel(frame, text=label, font=ctk.CTkFont(weight="bold"), width=150).pack(side="left", padx=5)
                         ctk.CTkLabel(frame, text=str(value)).pack(side="left", padx=5)
                     
+                    # Photos (pre-sized thumbnails when available)
+                    photos_frame = ctk.CTkFrame(scrollable_frame)
+                    photos_frame.pack(fill="x", pady=5)
+                    for field, caption in (('passport_photo', "Passport"),
+                                           ('student_card_photo', "Student Card"),
+                                           ('gadget_photo', "Gadget")):
+                        photo = image_manager.load_ctk_image(registration.get(field), size=(100, 100))
+                        if photo:
+                            ctk.CTkLabel(photos_frame, image=photo, text=caption,
+                                         compound="top").pack(side="left", padx=5)
+                    
                     # Close button
                     ctk.CTkButton(details_window, text="Close", command=details_window.destroy).pack(pady=10)
                     
@@ -1541,75 +1704,126 @@ class CampusGadgetSystem:
                 
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load details: {str(e)}")
+    def process_pending_web_registrations(self, conn):
+        """Move every pending web registration into students/gadgets.
+
+        Runs on the writer connection; returns (web id, activity) pairs to
+        publish once the write has committed.
+        """
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, student_name, registration_number, national_id,
+                gadget_type, brand, model, serial_number
+            FROM web_registrations WHERE status = 'pending'
+        ''')
+        
+        pending_records = cursor.fetchall()
+        record_numbers = allocate_record_numbers(conn, len(pending_records))
+        activities = []
+        
+        for record, record_number in zip(pending_records, record_numbers):
+            web_id, student_name, reg_number, national_id, gadget_type, brand, model, serial_number = record
+            
+            # Process the registration (same logic as manual registration)
+            cursor.execute("SELECT id FROM students WHERE registration_number = ?", (reg_number,))
+            student = cursor.fetchone()
+            
+            if student:
+                student_id = student[0]
+            else:
+                cursor.execute('''
+                    INSERT INTO students (full_name, registration_number, national_id)
+                    VALUES (?, ?, ?)
+                ''', (student_name, reg_number, national_id))
+                student_id = cursor.lastrowid
+            
+            # Register gadget
+            cursor.execute('''
+                INSERT INTO gadgets (student_id, record_number, gadget_type, brand, model, serial_number)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (student_id, record_number, gadget_type, brand, model, serial_number))
+            
+            gadget_id = cursor.lastrowid
+            
+            # Create check-in record
+            check_in_time = datetime.now()
+            record_check_event(cursor, gadget_id, 'checked_in', self.officer_id(), check_in_time)
+            
+            # Mark web registration as processed
+            cursor.execute('''
+                UPDATE web_registrations SET status = 'processed' 
+                WHERE id = ?
+            ''', (web_id,))
+            
+            activities.append((web_id, {
+                'gadget_id': gadget_id,
+                'action': 'checked_in',
+                'event_time': check_in_time.strftime('%Y-%m-%d %H:%M:%S'),
+                'student_name': student_name,
+                'gadget_type': gadget_type,
+                'record_number': record_number
+            }))
+        return activities
+    
     def sync_web_registrations(self):
         """Check for and process web registration data"""
         try:
             conn = self.db.get_connection()
-            cursor = conn.cursor()
-            
-            # Check if web_registrations table exists
-            cursor.execute('''
-                SELECT name FROM sqlite_master 
-                WHERE type='table' AND name='web_registrations'
-            ''')
-            
-            if cursor.fetchone():
-                # Process pending web registrations
-                cursor.execute('''
-                    SELECT * FROM web_registrations WHERE status = 'pending'
-                ''')
-                
-                pending_records = cursor.fetchall()
-                
-                for record in pending_records:
-                    web_id, student_name, reg_number, national_id, gadget_type, brand, model, serial_number, created_at, status = record
-                    
-                    # Process the registration (same logic as manual registration)
-                    cursor.execute("SELECT id FROM students WHERE registration_number = ?", (reg_number,))
-                    student = cursor.fetchone()
-                    
-                    if student:
-                        student_id = student[0]
-                    else:
-                        cursor.execute('''
-                            INSERT INTO students (full_name, registration_number, national_id)
-                            VALUES (?, ?, ?)
-                        ''', (student_name, reg_number, national_id))
-                        student_id = cursor.lastrowid
-                    
-                    # Generate record number
-                    record_number = f"WEB{datetime.now().strftime('%Y%m%d%H%M%S')}"
-                    
-                    # Register gadget
-                    cursor.execute('''
-                        INSERT INTO gadgets (student_id, record_number, gadget_type, brand, model, serial_number)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    ''', (student_id, record_number, gadget_type, brand, model, serial_number))
-                    
-                    gadget_id = cursor.lastrowid
-                    
-                    # Create check-in record
-                    cursor.execute('''
-                        INSERT INTO check_records (gadget_id, check_in_time, status)
-                        VALUES (?, ?, ?)
-                    ''', (gadget_id, datetime.now(), 'checked_in'))
-                    
-                    # Mark web registration as processed
-                    cursor.execute('''
-                        UPDATE web_registrations SET status = 'processed' 
-                        WHERE id = ?
-                    ''', (web_id,))
-                
-                conn.commit()
-                messagebox.showinfo("Success", f"Processed {len(pending_records)} web registrations")
+            try:
+                # Check if web_registrations table exists
+                has_table = conn.execute('''
+                    SELECT name FROM sqlite_master 
+                    WHERE type='table' AND name='web_registrations'
+                ''').fetchone()
+            finally:
+                conn.close()
             
-            conn.close()
+            if has_table:
+                # Processed in one group commit with other queued writes
+                activities = self.write_queue.execute(self.process_pending_web_registrations)
+                for web_id, activity in activities:
+                    self.publish_approval(web_id, activity)
+                messagebox.showinfo("Success", f"Processed {len(activities)} web registrations")
             
         except Exception as e:
-            messagebox.showerror("Error", f"Sync failed: {str(e)}")   
+            messagebox.showerror("Error", f"Sync failed: {str(e)}")
+    def fetch_pending_registration_pages(self):
+        """Yield pages of pending registrations from the web API.
+
+        Pages are requested with keyset pagination (since_id/limit). The ETag
+        and next cursor of every page are remembered, so pages unchanged since
+        the last refresh come back as 304 and are skipped (yielded as None).
+        """
+        if not hasattr(self, 'pending_page_cache'):
+            self.pending_page_cache = {}  # since_id -> (etag, next_since_id)
+        
+        since_id = 0
+        while since_id is not None:
+            headers = {}
+            cached = self.pending_page_cache.get(since_id)
+            if cached:
+                headers['If-None-Match'] = cached[0]
+            
+            response = requests.get(f'{Config.WEB_BASE_URL}/api/pending-registrations',
+                                    params={'since_id': since_id, 'limit': Config.API_PAGE_SIZE},
+                                    headers=headers, timeout=10)
+            
+            if response.status_code == 304:
+                yield None
+                since_id = cached[1]
+                continue
+            
+            response.raise_for_status()
+            next_since_id = response.headers.get('X-Next-Since-Id')
+            next_since_id = int(next_since_id) if next_since_id else None
+            if response.headers.get('ETag'):
+                self.pending_page_cache[since_id] = (response.headers['ETag'], next_since_id)
+            
+            yield response.json()
+            since_id = next_since_id
+    
     def load_web_registrations(self):
         """Load web registrations from API and store in local database for approval"""
-        response = requests.get('http://localhost:5000/api/pending-registrations', timeout=10)
         if not hasattr(self, 'web_registrations_tree'):
             return
         
@@ -1620,68 +1834,105 @@ class CampusGadgetSystem:
             
             print("🔄 Loading and syncing web registrations...")
             
-            # Step 1: Fetch from API
-            response = requests.get('http://localhost:5000/api/pending-registrations', timeout=10)
-            
-            if response.status_code != 200:
-                print("❌ Failed to fetch from API")
-                self.load_from_local_database()
-                return
-            
-            api_registrations = response.json()
-            
-            if not api_registrations:
-                print("ℹ️ No pending registrations from API")
-                self.load_from_local_database()
-                return
-            
-            print(f"✅ Fetched {len(api_registrations)} records from API")
-            
-            # Step 2: Store in local database with proper mapping
-            conn = self.db.get_connection()
-            cursor = conn.cursor()
-            
-            stored_count = 0
-            for api_reg in api_registrations:
-                # Check if this record already exists in local database
-                cursor.execute("SELECT id FROM web_registrations WHERE id = ?", (api_reg['id'],))
-                existing = cursor.fetchone()
-                
-                if not existing:
-                    # Insert into local database with proper field mapping
-                    cursor.execute('''
-                        INSERT INTO web_registrations 
-                        (id, student_name, registration_number, national_id, gadget_type, 
-                        brand, model, serial_number, color, additional_details, created_at, status)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        api_reg['id'],
-                        api_reg['full_name'],  # Map 'full_name' to 'student_name'
-                        api_reg['registration_number'],
-                        api_reg.get('national_id', 'N/A'),  # Provide default if missing
-                        api_reg['gadget_type'],
-                        api_reg['brand'],
-                        api_reg['model'],
-                        api_reg['serial_number'],
-                        api_reg.get('color', ''),
-                        api_reg.get('additional_details', ''),
-                        api_reg.get('created_at', ''),
-                        'pending'  # Set status to pending for approval
-                    ))
-                    stored_count += 1
-                    print(f"   💾 Stored: ID {api_reg['id']} - {api_reg['full_name']}")
-            
-            conn.commit()
-            print(f"✅ Stored {stored_count} new records in local database")
+            # Step 1 & 2: Pull changes since the last sync into the local database
+            try:
+                if not self.sync_registration_changes():
+                    self.sync_pending_registration_pages()
+            except requests.exceptions.RequestException as e:
+                print(f"❌ Failed to fetch from API: {e}")
             
             # Step 3: Load from local database for display
             self.load_from_local_database()
             
-            conn.close()
-            
         except Exception as e:
             print(f"❌ Load error: {str(e)}")
             self.load_from_local_database()
+    
+    def sync_registration_changes(self):
+        """Apply the web server's change feed since our stored cursor.
+
+        Returns False if the server has no change feed (older web_server.py).
+        """
+        conn = self.db.get_connection()
+        try:
+            since_seq = get_sync_cursor(conn)
+            upserted = closed = 0
+            while True:
+                response = requests.get(f'{Config.WEB_BASE_URL}/api/registration-changes',
+                                        params={'cursor': since_seq, 'limit': Config.API_PAGE_SIZE},
+                                        timeout=10)
+                if response.status_code == 404:
+                    return False
+                response.raise_for_status()
+                feed = response.json()
+                
+                if feed['reset']:
+                    print("⚠️ Web server change log was reset - resyncing from the start")
+                
+                page_upserted, page_closed = apply_changes(conn, feed['changes'], feed['cursor'])
+                upserted += page_upserted
+                closed += page_closed
+                since_seq = feed['cursor']
+                if not feed['has_more']:
+                    break
+            
+            print(f"✅ Synced web registrations: {upserted} new/updated, {closed} closed (cursor {since_seq})")
+            return True
+        finally:
+            conn.close()
+    
+    def sync_pending_registration_pages(self):
+        """Full sync through the paginated pending list (servers without a change feed)"""
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        
+        fetched_count = 0
+        stored_count = 0
+        try:
+            for page in self.fetch_pending_registration_pages():
+                if page is None:
+                    continue  # Unchanged since the last refresh
+                fetched_count += len(page)
+                stored_count += self.store_web_registrations(cursor, page)
+                conn.commit()
+        finally:
+            conn.close()
+        
+        print(f"✅ Fetched {fetched_count} changed records from API")
+        print(f"✅ Stored {stored_count} new records in local database")
+    
+    def store_web_registrations(self, cursor, api_registrations):
+        """Insert API registrations not yet in the local web_registrations table"""
+        stored_count = 0
+        for api_reg in api_registrations:
+            # Check if this record already exists in local database
+            cursor.execute("SELECT id FROM web_registrations WHERE id = ?", (api_reg['id'],))
+            existing = cursor.fetchone()
+            
+            if not existing:
+                # Insert into local database with proper field mapping
+                cursor.execute('''
+                    INSERT INTO web_registrations 
+                    (id, student_name, registration_number, national_id, gadget_type, 
+                    brand, model, serial_number, color, additional_details, created_at, status)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    api_reg['id'],
+                    api_reg['full_name'],  # Map 'full_name' to 'student_name'
+                    api_reg['registration_number'],
+                    api_reg.get('national_id', 'N/A'),  # Provide default if missing
+                    api_reg['gadget_type'],
+                    api_reg['brand'],
+                    api_reg['model'],
+                    api_reg['serial_number'],
+                    api_reg.get('color', ''),
+                    api_reg.get('additional_details', ''),
+                    api_reg.get('created_at', ''),
+                    'pending'  # Set status to pending for approval
+                ))
+                stored_count += 1
+                print(f"   💾 Stored: ID {api_reg['id']} - {api_reg['full_name']}")
+        return stored_count
 
     def load_from_local_database(self):
         """Load web registrations from local database for display"""
@@ -2040,50 +2291,36 @@ class CampusGadgetSystem:
                 messagebox.showerror("Error", "Please enter both start and end dates")
                 return
             
-            self.show_report_loading("Generating Daily Activity Report...")
-            
             if not self.reports:
                 messagebox.showerror("Error", "Reports module not available")
                 return
             
-            # Generate report
-            report_data = self.reports.generate_daily_activity_report(start_date, end_date)
-            
-            # Display results in the main interface
-            self.display_report_in_main(report_data, "Daily Activity Report", start_date, end_date)
+            # Generate report in the background, display it in the main interface
+            self.run_report_job("Daily Activity Report", self.reports.generate_daily_activity_report,
+                                start_date, end_date, date_range=(start_date, end_date))
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to generate report: {str(e)}")
     
     def generate_trend_report(self):
         try:
-            self.show_report_loading("Generating Trend Analysis Report...")
-            
             if not self.reports:
                 messagebox.showerror("Error", "Reports module not available")
                 return
             
-            # Generate report (last 30 days)
-            report_data = self.reports.generate_trend_analysis_report(30)
-            
-            # Display results
-            self.display_report_in_main(report_data, "Trend Analysis Report")
+            # Generate report (last 30 days) in the background
+            self.run_report_job("Trend Analysis Report", self.reports.generate_trend_analysis_report, 30)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to generate trend report: {str(e)}")
     
     def generate_dashboard(self):
         try:
-            self.show_report_loading("Generating System Dashboard...")
-            
             if not self.reports:
                 messagebox.showerror("Error", "Reports module not available")
                 return
             
-            # Generate dashboard
-            report_data = self.reports.generate_comprehensive_dashboard()
-            
-            # Display results
-            self.display_report_in_main(report_data, "System Dashboard")
+            # Generate dashboard in the background
+            self.run_report_job("System Dashboard", self.reports.generate_comprehensive_dashboard)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to generate dashboard: {str(e)}")
     
@@ -2095,34 +2332,74 @@ class CampusGadgetSystem:
                 messagebox.showerror("Error", "Please enter a registration number")
                 return
             
-            self.show_report_loading(f"Generating Report for {registration_number}...")
-            
             if not self.reports:
                 messagebox.showerror("Error", "Reports module not available")
                 return
             
-            # Generate student report
-            report_data = self.reports.generate_student_activity_report(registration_number)
-            
+            # Generate student report in the background
+            self.run_report_job(f"Student Report - {registration_number}",
+                                self.reports.generate_student_activity_report, registration_number,
+                                not_found_message=f"No student found with registration number: {registration_number}")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to generate student report: {str(e)}")
+    
+    def run_report_job(self, title, generate, *args, date_range=None, not_found_message=None):
+        """Generate a report on a background worker so the gate UI stays responsive"""
+        def on_done(report_data):
             if report_data:
-                # Display results
-                self.display_report_in_main(report_data, f"Student Report - {registration_number}")
+                start_date, end_date = date_range or (None, None)
+                self.display_report_in_main(report_data, title, start_date, end_date)
             else:
-                messagebox.showwarning("Not Found", f"No student found with registration number: {registration_number}")
+                messagebox.showwarning("Not Found", not_found_message or "No data found for this report")
                 self.show_report_welcome()
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to generate student report: {str(e)}")
+        
+        def on_error(error):
+            messagebox.showerror("Error", f"Failed to generate {title}: {str(error)}")
+            self.show_report_welcome()
+        
+        job = self.report_jobs.submit(title, generate, *args,
+                                      on_progress=self.update_report_progress,
+                                      on_done=on_done, on_error=on_error,
+                                      on_cancel=self.show_report_welcome)
+        if job is None:
+            messagebox.showwarning("Busy", "Reports are still being generated. Please wait for them to finish.")
+            return
+        
+        self.show_report_loading(f"Generating {title}...", job)
     
-    def show_report_loading(self, message):
+    def show_report_loading(self, message, job=None):
         """Show loading state in reports section"""
         for widget in self.results_frame.winfo_children():
             widget.destroy()
         
         loading_label = ctk.CTkLabel(self.results_frame, text=message, 
                                    font=ctk.CTkFont(size=16))
-        loading_label.pack(expand=True, pady=50)
+        loading_label.pack(expand=True, pady=(50, 10))
+        
+        if job is None:
+            self.results_frame.update()
+            return
         
-        self.results_frame.update()
+        # Background job: progress bar and cancel button
+        self.report_progress_bar = ctk.CTkProgressBar(self.results_frame, width=400)
+        self.report_progress_bar.set(0)
+        self.report_progress_bar.pack(pady=10)
+        
+        self.report_progress_label = ctk.CTkLabel(self.results_frame, text="Queued...",
+                                                  font=ctk.CTkFont(size=12))
+        self.report_progress_label.pack(pady=5)
+        
+        ctk.CTkButton(self.results_frame, text="✖ Cancel", fg_color="red",
+                     command=job.cancel).pack(pady=10)
+    
+    def update_report_progress(self, percent, message):
+        """Progress callback from the report worker (runs on the Tk thread)"""
+        try:
+            self.report_progress_bar.set(percent / 100.0)
+            self.report_progress_label.configure(text=message)
+        except (AttributeError, tk.TclError):
+            # Reports screen was closed while the job was running
+            pass
             
     def display_report_in_main(self, report_data, title, start_date=None, end_date=None):
         """Display report results in the main application interface"""
@@ -2217,8 +2494,13 @@ class CampusGadgetSystem:
             if not self.reports:
                 messagebox.showerror("Error", "Reports module not available")
                 return
-            pdf_path = self.reports.export_report_to_pdf(report_data, title.replace(" ", "_"))
-            messagebox.showinfo("Success", f"Report exported to:\n{pdf_path}")
+            job = self.report_jobs.submit(
+                f"{title} PDF", self.reports.export_report_to_pdf, report_data, title.replace(" ", "_"),
+                on_done=lambda pdf_path: messagebox.showinfo("Success", f"Report exported to:\n{pdf_path}"),
+                on_error=lambda error: messagebox.showerror("Error", f"Failed to export PDF: {str(error)}")
+            )
+            if job is None:
+                messagebox.showwarning("Busy", "Reports are still being generated. Please wait for them to finish.")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to export PDF: {str(e)}")
     
@@ -0,0 +1,302 @@
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+
+from archive import check_events_source
+from config import Config
+
+# Check in/out history as one row per event (check_events: a single
+# event_time, the event type and the officer who scanned it) plus
+# gadget_presence, one current-state row per gadget. A trigger on
+# check_events keeps gadget_presence up to date inside the same statement,
+# so "who is on campus now" and "how long has it been here" are index
+# lookups instead of walks over check_records.
+#
+# check_records is still written alongside each event because the reports
+# read it; gadgets.status is kept in step for the dashboard counters.
+
+CHECKED_IN = "checked_in"
+CHECKED_OUT = "checked_out"
+EVENT_TYPES = (CHECKED_IN, CHECKED_OUT)
+
+PRESENCE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_check_events_gadget_time ON check_events (gadget_id, event_time)",
+    "CREATE INDEX IF NOT EXISTS idx_check_events_time ON check_events (event_time)",
+    "CREATE INDEX IF NOT EXISTS idx_gadget_presence_state ON gadget_presence (state, since)",
+]
+
+PRESENCE_TRIGGERS = [
+    # Every event is stamped with the recording machine's local time when it
+    # happens, so the latest event is the gadget's state
+    '''
+    CREATE TRIGGER IF NOT EXISTS gadget_presence_latest_event AFTER INSERT ON check_events
+    BEGIN
+        INSERT INTO gadget_presence (gadget_id, state, since, last_event_id, officer_id)
+        VALUES (new.gadget_id, new.event_type, new.event_time, new.id, new.officer_id)
+        ON CONFLICT(gadget_id) DO UPDATE SET
+            state = excluded.state,
+            since = excluded.since,
+            last_event_id = excluded.last_event_id,
+            officer_id = excluded.officer_id;
+    END
+    ''',
+    # A gadget starts out in its inserted status (pending web registrations
+    # are checked_in without any event); created_at is UTC, events local time
+    '''
+    CREATE TRIGGER IF NOT EXISTS gadget_presence_gadget_insert AFTER INSERT ON gadgets
+    WHEN new.status IN ('checked_in', 'checked_out')
+    BEGIN
+        INSERT OR IGNORE INTO gadget_presence (gadget_id, state, since)
+        VALUES (new.id, new.status, datetime(COALESCE(new.created_at, 'now'), 'localtime'));
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS gadget_presence_gadget_delete AFTER DELETE ON gadgets
+    BEGIN
+        DELETE FROM gadget_presence WHERE gadget_id = old.id;
+    END
+    ''',
+]
+
+def create_presence_tables(cursor):
+    """Create check_events and gadget_presence and backfill them.
+
+    Existing check_records become events in time order (officer unknown);
+    gadgets without any history take their presence from gadgets.status.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS check_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            gadget_id INTEGER NOT NULL,
+            event_type TEXT NOT NULL CHECK (event_type IN ('checked_in', 'checked_out')),
+            event_time TIMESTAMP NOT NULL,
+            officer_id INTEGER,
+            check_record_id INTEGER,
+            FOREIGN KEY (gadget_id) REFERENCES gadgets (id),
+            FOREIGN KEY (officer_id) REFERENCES users (id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS gadget_presence (
+            gadget_id INTEGER PRIMARY KEY,
+            state TEXT NOT NULL,
+            since TIMESTAMP,
+            last_event_id INTEGER,
+            officer_id INTEGER,
+            FOREIGN KEY (gadget_id) REFERENCES gadgets (id)
+        )
+    ''')
+    cursor.execute("DROP TRIGGER IF EXISTS gadget_presence_event")
+    for statement in PRESENCE_INDEXES + PRESENCE_TRIGGERS:
+        cursor.execute(statement)
+
+    cursor.execute("SELECT COUNT(*) FROM check_events")
+    if cursor.fetchone()[0] == 0:
+        cursor.execute('''
+            INSERT INTO check_events (gadget_id, event_type, event_time, check_record_id)
+            SELECT gadget_id, status, COALESCE(check_in_time, check_out_time), id
+            FROM check_records
+            WHERE gadget_id IS NOT NULL
+              AND status IN ('checked_in', 'checked_out')
+              AND COALESCE(check_in_time, check_out_time) IS NOT NULL
+            ORDER BY COALESCE(check_in_time, check_out_time), id
+        ''')
+    # created_at is UTC (CURRENT_TIMESTAMP); events are local time
+    cursor.execute('''
+        INSERT OR IGNORE INTO gadget_presence (gadget_id, state, since)
+        SELECT id, status, datetime(created_at, 'localtime') FROM gadgets
+        WHERE status IN ('checked_in', 'checked_out')
+    ''')
+
+def use_latest_event_presence(cursor):
+    """Replace the presence trigger that compared event times.
+
+    It skipped any event older than the stored ``since``, but approvals were
+    stamped with gadgets.created_at (UTC) while other events use local time,
+    so west of UTC a check-out right after an approval was dropped. Presence
+    rows seeded from created_at are moved to local time as well.
+    """
+    cursor.execute("DROP TRIGGER IF EXISTS gadget_presence_event")
+    for statement in PRESENCE_TRIGGERS:
+        cursor.execute(statement)
+    cursor.execute('''
+        UPDATE gadget_presence SET since = (
+            SELECT datetime(created_at, 'localtime') FROM gadgets WHERE id = gadget_presence.gadget_id)
+        WHERE last_event_id IS NULL
+    ''')
+    # Re-apply the latest event of gadgets whose newer events were skipped
+    cursor.execute('''
+        INSERT INTO gadget_presence (gadget_id, state, since, last_event_id, officer_id)
+        SELECT e.gadget_id, e.event_type, e.event_time, e.id, e.officer_id
+        FROM check_events e
+        WHERE e.id IN (SELECT MAX(id) FROM check_events GROUP BY gadget_id)
+          AND e.id IS NOT (SELECT last_event_id FROM gadget_presence WHERE gadget_id = e.gadget_id)
+        ON CONFLICT(gadget_id) DO UPDATE SET
+            state = excluded.state,
+            since = excluded.since,
+            last_event_id = excluded.last_event_id,
+            officer_id = excluded.officer_id
+    ''')
+    cursor.execute('''
+        UPDATE gadgets SET status = (SELECT state FROM gadget_presence WHERE gadget_id = gadgets.id)
+        WHERE id IN (SELECT gadget_id FROM gadget_presence)
+          AND status IS NOT (SELECT state FROM gadget_presence WHERE gadget_id = gadgets.id)
+    ''')
+
+def seed_missing_presence(cursor):
+    """Add the gadget insert trigger and a presence row for every gadget
+    inserted without one (they showed up as mismatches in reconcile_presence)"""
+    for statement in PRESENCE_TRIGGERS:
+        cursor.execute(statement)
+    cursor.execute('''
+        INSERT OR IGNORE INTO gadget_presence (gadget_id, state, since)
+        SELECT id, status, datetime(created_at, 'localtime') FROM gadgets
+        WHERE status IN ('checked_in', 'checked_out')
+    ''')
+
+def rebuild_presence(cursor):
+    """Recompute gadget_presence from check_events (latest event per gadget),
+    seeding gadgets without events from gadgets.status"""
+    cursor.execute("DELETE FROM gadget_presence")
+    cursor.execute('''
+        INSERT INTO gadget_presence (gadget_id, state, since, last_event_id, officer_id)
+        SELECT e.gadget_id, e.event_type, e.event_time, e.id, e.officer_id
+        FROM check_events e
+        WHERE e.id IN (SELECT MAX(id) FROM check_events GROUP BY gadget_id)
+          AND e.gadget_id IN (SELECT id FROM gadgets)
+    ''')
+    cursor.execute('''
+        INSERT OR IGNORE INTO gadget_presence (gadget_id, state, since)
+        SELECT id, status, datetime(created_at, 'localtime') FROM gadgets
+        WHERE status IN ('checked_in', 'checked_out')
+    ''')
+
+def record_check_event(cursor, gadget_id, event_type, officer_id=None, event_time=None):
+    """Record a check in/out for a gadget; returns the event_time used.
+
+    Writes the check_events row (which moves gadget_presence), the legacy
+    check_records row and gadgets.status on ``cursor``'s connection. The
+    caller commits, so the event and the state change land together.
+    """
+    if event_type not in EVENT_TYPES:
+        raise ValueError(f"Unknown check event type: {event_type}")
+    if event_time is None:
+        event_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    elif isinstance(event_time, datetime):
+        event_time = event_time.strftime('%Y-%m-%d %H:%M:%S')
+
+    time_column = "check_in_time" if event_type == CHECKED_IN else "check_out_time"
+    cursor.execute(f'''
+        INSERT INTO check_records (gadget_id, {time_column}, status)
+        VALUES (?, ?, ?)
+    ''', (gadget_id, event_time, event_type))
+    check_record_id = cursor.lastrowid
+
+    cursor.execute('''
+        INSERT INTO check_events (gadget_id, event_type, event_time, officer_id, check_record_id)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (gadget_id, event_type, event_time, officer_id, check_record_id))
+
+    cursor.execute("UPDATE gadgets SET status = ? WHERE id = ? AND status IS NOT ?",
+                   (event_type, gadget_id, event_type))
+    return event_time
+
+# -- queries -----------------------------------------------------------------
+
+def _parse_time(value):
+    return value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+
+def gadgets_on_campus(conn, limit=None):
+    """Gadgets currently on campus, longest present first.
+
+    Rows are (gadget_id, record_number, student_name, gadget_type, since,
+    officer_id).
+    """
+    sql = '''
+        SELECT p.gadget_id, g.record_number, s.full_name, g.gadget_type, p.since, p.officer_id
+        FROM gadget_presence p
+        JOIN gadgets g ON g.id = p.gadget_id
+        JOIN students s ON s.id = g.student_id
+        WHERE p.state = 'checked_in'
+        ORDER BY p.since
+    '''
+    params = ()
+    if limit:
+        sql += " LIMIT ?"
+        params = (limit,)
+    return conn.execute(sql, params).fetchall()
+
+def current_stay(conn, gadget_id, now=None):
+    """How long a gadget has been on campus, or None if it is not"""
+    row = conn.execute('''
+        SELECT since FROM gadget_presence WHERE gadget_id = ? AND state = 'checked_in'
+    ''', (gadget_id,)).fetchone()
+    if not row or row[0] is None:
+        return None
+    return (now or datetime.now()) - _parse_time(row[0])
+
+def time_on_campus(conn, gadget_id, start, end):
+    """Total time a gadget spent on campus between two datetimes.
+
+    Reads the last event before ``start`` (the state the range opens in)
+    and the events inside the range, both from the (gadget_id, event_time)
+    index of the main database and of any archives up to ``end``.
+    """
+    start_text = start.strftime('%Y-%m-%d %H:%M:%S')
+    end_text = end.strftime('%Y-%m-%d %H:%M:%S')
+
+    # The opening event can be in any earlier month, archived or not
+    with check_events_source(conn, None, end.strftime('%Y-%m-%d')) as check_events:
+        opening = conn.execute(f'''
+            SELECT event_type FROM {check_events}
+            WHERE gadget_id = ? AND event_time < ?
+            ORDER BY event_time DESC, id DESC LIMIT 1
+        ''', (gadget_id, start_text)).fetchone()
+        events = conn.execute(f'''
+            SELECT event_type, event_time FROM {check_events}
+            WHERE gadget_id = ? AND event_time >= ? AND event_time < ?
+            ORDER BY event_time, id
+        ''', (gadget_id, start_text, end_text)).fetchall()
+
+    total = timedelta()
+    entered = start if opening and opening[0] == CHECKED_IN else None
+    for event_type, event_time in events:
+        if event_type == CHECKED_IN and entered is None:
+            entered = _parse_time(event_time)
+        elif event_type == CHECKED_OUT and entered is not None:
+            total += _parse_time(event_time) - entered
+            entered = None
+    if entered is not None:
+        total += end - entered
+    return total
+
+def reconcile_presence(conn, repair=False):
+    """Gadgets whose gadgets.status disagrees with their presence row.
+
+    Returns (gadget_id, gadgets.status, presence state) tuples; a missing
+    presence row shows as None. With ``repair`` the presence state, which
+    follows the event history, is written back to gadgets.status.
+    """
+    mismatches = conn.execute('''
+        SELECT g.id, g.status, p.state
+        FROM gadgets g
+        LEFT JOIN gadget_presence p ON p.gadget_id = g.id
+        WHERE p.state IS NOT g.status
+    ''').fetchall()
+
+    if repair:
+        conn.executemany("UPDATE gadgets SET status = ? WHERE id = ?",
+                         [(state, gadget_id) for gadget_id, _, state in mismatches if state])
+        conn.commit()
+    return mismatches
+
+# Check gadgets.status against the event history: python presence.py [--repair]
+if __name__ == "__main__":
+    conn = sqlite3.connect(Config.DATABASE_PATH)
+    try:
+        mismatches = reconcile_presence(conn, repair="--repair" in sys.argv)
+        for gadget_id, status, state in mismatches:
+            print(f"⚠️ Gadget {gadget_id}: status={status} presence={state}")
+        print(f"✅ {len(mismatches)} mismatched gadgets")
+    finally:
+        conn.close()
@@ -1,10 +1,11 @@
-import waitress as serve
-from web_server import app
 import logging
+import multiprocessing
 import os
 import sys
 from datetime import datetime
 
+from config import Config
+
 # Configure comprehensive logging
 logging.basicConfig(
     level=logging.INFO,
@@ -17,6 +18,19 @@ logging.basicConfig(
 
 logger = logging.getLogger('CampusSystem')
 
+# Two worker models, picked by Config.WEB_SERVER:
+#
+#   waitress  one process, WEB_THREADS request threads; runs everywhere
+#   gunicorn  WEB_WORKERS pre-forked processes with WEB_THREADS threads each,
+#             so registration intake scales across cores (Linux/macOS only)
+#   uvicorn   WEB_WORKERS asyncio processes running asgi_intake.app; the
+#             registration routes are async, the rest is the Flask app
+#
+# Both listen on Config.WEB_HOST:WEB_PORT, the port the desktop app reaches
+# through Config.WEB_BASE_URL.
+
+SERVERS = ("waitress", "gunicorn", "uvicorn")
+
 def check_directories():
     """Ensure all required directories exist"""
     required_dirs = ['reports', 'student_photos', 'web_uploads', 'backups', 'logs']
@@ -25,57 +39,142 @@ def check_directories():
             os.makedirs(directory)
             logger.info(f"Created directory: {directory}")
 
-def print_startup_banner():
+def worker_count():
+    """Gunicorn worker processes: Config.WEB_WORKERS, or 2 x cores + 1"""
+    return Config.WEB_WORKERS or multiprocessing.cpu_count() * 2 + 1
+
+def load_app():
+    """Import the Flask app and bring the database schema up to date.
+
+    Pooled connections opened for the migration are closed again, so no
+    SQLite handle is inherited by forked workers.
+    """
+    import db_pool
+    from web_server import app, init_web_database
+    init_web_database()
+    db_pool.close_all_pools()
+    return app
+
+def print_startup_banner(server):
     """Display startup information"""
-    banner = """
+    if server == "gunicorn":
+        workers = f"Gunicorn, {worker_count()} workers x {Config.WEB_THREADS} threads"
+    elif server == "uvicorn":
+        workers = f"Uvicorn, {worker_count()} workers (async registration intake)"
+    else:
+        workers = f"Waitress, {Config.WEB_THREADS} threads"
+    banner = f"""
     ╔══════════════════════════════════════════════════════════════╗
     ║                 CAMPUS GADGET SYSTEM SERVER                 ║
     ║                     Production Ready                        ║
     ╚══════════════════════════════════════════════════════════════╝
-    
+
     🚀 Server starting...
-    📍 Local Access: http://localhost:8080
-    🌐 Network Access: http://[YOUR-IP]:8080
-    ⚡ Server: Waitress (Production WSGI)
-    📊 Concurrent connections: Multiple
+    📍 Local Access: {Config.WEB_BASE_URL}
+    🌐 Network Access: http://[YOUR-IP]:{Config.WEB_PORT}
+    ⚡ Server: {workers}
+    📊 Backlog: {Config.WEB_BACKLOG}, connection limit: {Config.WEB_CONNECTION_LIMIT}
     📝 Log file: campus_system.log
     🛡️  Running in production mode
-    
+
     ⏹️  Press Ctrl+C to stop the server gracefully
     """
     print(banner)
 
+def serve_waitress(app):
+    from waitress import serve
+    serve(
+        app,
+        host=Config.WEB_HOST,
+        port=Config.WEB_PORT,
+        threads=Config.WEB_THREADS,
+        backlog=Config.WEB_BACKLOG,
+        connection_limit=Config.WEB_CONNECTION_LIMIT,
+        channel_timeout=Config.WEB_TIMEOUT,
+        url_scheme='http'
+    )
+
+def serve_gunicorn():
+    from gunicorn.app.base import BaseApplication
+
+    class CampusApplication(BaseApplication):
+        """Gunicorn master configured from config.Config instead of the command line"""
+
+        def load_config(self):
+            options = {
+                'bind': f"{Config.WEB_HOST}:{Config.WEB_PORT}",
+                'workers': worker_count(),
+                'worker_class': 'gthread',
+                'threads': Config.WEB_THREADS,
+                'backlog': Config.WEB_BACKLOG,
+                'worker_connections': Config.WEB_CONNECTION_LIMIT,
+                'timeout': Config.WEB_TIMEOUT,
+                'max_requests': Config.WEB_MAX_REQUESTS,
+                'max_requests_jitter': Config.WEB_MAX_REQUESTS // 10,
+                # Import and migrate once in the master; workers share the
+                # loaded code copy-on-write
+                'preload_app': True,
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return load_app()
+
+    CampusApplication().run()
+
+def serve_uvicorn():
+    import uvicorn
+    # Migrate once here; workers are spawned and import asgi_intake themselves
+    load_app()
+    uvicorn.run(
+        "asgi_intake:app",
+        host=Config.WEB_HOST,
+        port=Config.WEB_PORT,
+        workers=worker_count(),
+        backlog=Config.WEB_BACKLOG,
+        limit_concurrency=Config.WEB_CONNECTION_LIMIT,
+        timeout_keep_alive=5,
+        lifespan="on"
+    )
+
+def serve_app(server=None):
+    """Run the web server with the worker model from Config.WEB_SERVER"""
+    server = server or Config.WEB_SERVER
+    if server not in SERVERS:
+        raise ValueError(f"Unknown WEB_SERVER '{server}' (expected one of: {', '.join(SERVERS)})")
+    if server == "gunicorn" and sys.platform.startswith("win"):
+        logger.warning("⚠️ Gunicorn does not run on Windows; using Waitress")
+        server = "waitress"
+
+    try:
+        __import__(server)
+    except ImportError:
+        logger.error(f"❌ {server.capitalize()} not installed. Run: pip install {server}")
+        sys.exit(1)
+    logger.info(f"✅ {server.capitalize()} production server loaded")
+
+    check_directories()
+    print_startup_banner(server)
+
+    startup_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    logger.info(f"🚀 Campus Gadget System starting at {startup_time}")
+    logger.info(f"📍 Server URL: http://{Config.WEB_HOST}:{Config.WEB_PORT}")
+
+    if server == "gunicorn":
+        serve_gunicorn()
+    elif server == "uvicorn":
+        serve_uvicorn()
+    else:
+        serve_waitress(load_app())
+
+# Worker model can be overridden per run: python production_server.py [waitress|gunicorn|uvicorn]
 if __name__ == "__main__":
     try:
-        # Check if waitress is installed
-        try:
-            import waitress
-            logger.info("✅ Waitress production server loaded")
-        except ImportError as e:
-            logger.error("❌ Waitress not installed. Run: pip install waitress")
-            sys.exit(1)
-        
-        # Setup environment
-        check_directories()
-        print_startup_banner()
-        
-        startup_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        logger.info(f"🚀 Campus Gadget System starting at {startup_time}")
-        logger.info("📍 Server URL: http://0.0.0.0:8080")
-        logger.info("⚡ Production mode: Waitress WSGI Server")
-        
-        # Start Waitress production server
-        serve(
-            app,
-            host='0.0.0.0',      # Listen on all interfaces
-            port=8080,           # Port 8080
-            threads=4,           # Number of threads
-            url_scheme='http'    # URL scheme
-        )
-        
+        serve_app(sys.argv[1] if len(sys.argv) > 1 else None)
     except KeyboardInterrupt:
         logger.info("🛑 Server stopped by user (Ctrl+C)")
     except Exception as e:
         logger.error(f"❌ Server error: {str(e)}")
         print(f"❌ Critical error: {e}")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
@@ -0,0 +1,62 @@
+import sqlite3
+from datetime import datetime
+
+# Record numbers used to be "WEB" + a seconds timestamp, so two registrations
+# in the same second collided on gadgets.record_number. They now come from a
+# per-prefix sequence row in the database: the increment happens under
+# SQLite's write lock, so numbers are unique across threads and across the
+# desktop app and web server sharing a database file. The date part is only
+# for readability and the "-" keeps new numbers distinct from old ones.
+
+def create_record_sequences(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS record_sequences (
+            prefix TEXT PRIMARY KEY,
+            last_value INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+
+def format_record_number(prefix, value, day=None):
+    day = day or datetime.now().strftime('%Y%m%d')
+    return f"{prefix}{day}-{value:06d}"
+
+def _reserve(conn, prefix, count):
+    conn.execute('''
+        INSERT INTO record_sequences (prefix, last_value) VALUES (?, ?)
+        ON CONFLICT(prefix) DO UPDATE SET last_value = last_value + excluded.last_value
+    ''', (prefix, count))
+    return conn.execute("SELECT last_value FROM record_sequences WHERE prefix = ?", (prefix,)).fetchone()[0]
+
+def allocate_record_numbers(conn, count=1, prefix="WEB"):
+    """Reserve a block of ``count`` consecutive record numbers.
+
+    Inside a caller's open transaction the reservation joins it (and is
+    released again if the caller rolls back); otherwise it commits on its own.
+    """
+    if count < 1:
+        return []
+
+    own_transaction = not conn.in_transaction
+    try:
+        if own_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        try:
+            last_value = _reserve(conn, prefix, count)
+        except sqlite3.OperationalError:
+            # Database not migrated yet
+            create_record_sequences(conn.cursor())
+            last_value = _reserve(conn, prefix, count)
+        if own_transaction:
+            conn.commit()
+    except Exception:
+        if own_transaction:
+            conn.rollback()
+        raise
+
+    day = datetime.now().strftime('%Y%m%d')
+    return [format_record_number(prefix, value, day)
+            for value in range(last_value - count + 1, last_value + 1)]
+
+def next_record_number(conn, prefix="WEB"):
+    """Reserve a single record number"""
+    return allocate_record_numbers(conn, 1, prefix)[0]
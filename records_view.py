@@ -0,0 +1,264 @@
+import customtkinter as ctk
+from tkinter import ttk
+
+from config import Config
+from dashboard_counters import get_dashboard_counters
+
+# Records browser that never holds the whole gadgets table: rows are fetched
+# a page at a time with keyset pagination on (sort column, gadget id) and
+# the tree keeps a sliding window of at most Config.RECORDS_MAX_ROWS rows.
+
+# Display column -> SQL expression its prefix filter is range-compared on;
+# text columns ignore ASCII case like the LIKE filter they replace, through
+# the NOCASE indexes in migrate_database.RECORD_VIEW_INDEXES
+RECORD_COLUMNS = {
+    "Record No": "g.record_number COLLATE NOCASE",
+    "Student": "s.full_name COLLATE NOCASE",
+    "Gadget": "g.gadget_type COLLATE NOCASE",
+    "Serial No": "g.serial_number COLLATE NOCASE",
+    "Registered": "g.created_at",
+}
+
+# Display column -> sort key ahead of g.id. No part may be NULL (a NULL
+# drops out of the keyset comparison), and each key has indexes delivering
+# it in order: s.id keeps a student's gadgets together so the students
+# (full_name) and gadgets (student_id) indexes walk Student order
+RECORD_SORT_KEYS = {
+    "Record No": ("g.record_number",),
+    "Student": ("s.full_name", "s.id"),
+    "Gadget": ("g.gadget_type",),
+    "Serial No": ("g.serial_number",),
+    "Registered": ("COALESCE(g.created_at, '')",),
+}
+
+def prefix_bounds(text, nocase=True):
+    """[low, high) range of the strings starting with ``text``; with
+    ``nocase`` ASCII letters are folded the way SQLite's NOCASE does"""
+    if nocase:
+        text = "".join(char.lower() if char < "\x80" else char for char in text)
+    return text, text[:-1] + chr(ord(text[-1]) + 1)
+
+def fetch_records_page(conn, sort_column="Registered", descending=True, filters=None,
+                       after=None, before=None, limit=100):
+    """One page of records in display order.
+
+    ``after``/``before`` are the sort keys (sort values then gadget id) of
+    the row the page continues from; pass neither for the first page.
+    ``filters`` maps display columns to a prefix the column must start
+    with. Returns a list of (key, values) tuples.
+    """
+    sort_keys = RECORD_SORT_KEYS[sort_column]
+    where = []
+    params = []
+
+    for column, text in (filters or {}).items():
+        if text:
+            expr = RECORD_COLUMNS[column]
+            where.append(f"{expr} >= ? AND {expr} < ?")
+            params.extend(prefix_bounds(text, expr.endswith("NOCASE")))
+
+    # Walking backwards (before) reverses both the comparison and the order
+    backwards = before is not None
+    key = before if backwards else after
+    forward_op = "<" if descending else ">"
+    reverse_op = ">" if descending else "<"
+    if key is not None:
+        op = reverse_op if backwards else forward_op
+        # The plain bound on the leading key is what SQLite seeks the index
+        # with; the row value alone is only checked row by row
+        where.append(f"{sort_keys[0]} {op}= ?")
+        where.append(f"({', '.join(sort_keys)}, g.id) {op} ({', '.join('?' for _ in key)})")
+        params.append(key[0])
+        params.extend(key)
+
+    direction = "DESC" if descending != backwards else "ASC"
+    where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+    order_sql = ", ".join(f"{expr} {direction}" for expr in sort_keys + ("g.id",))
+    rows = conn.execute(f'''
+        SELECT {', '.join(sort_keys)}, g.id, g.record_number, s.full_name, g.gadget_type,
+               g.serial_number, g.created_at
+        FROM gadgets g
+        JOIN students s ON g.student_id = s.id
+        {where_sql}
+        ORDER BY {order_sql}
+        LIMIT ?
+    ''', params + [limit]).fetchall()
+
+    if backwards:
+        rows.reverse()
+    key_size = len(sort_keys) + 1
+    return [(tuple(row[:key_size]), row[key_size:]) for row in rows]
+
+
+class VirtualRecordsView:
+    """Lazily loaded, windowed records table with sortable, filterable columns"""
+
+    def __init__(self, parent, db, page_size=None, max_rows=None):
+        self.db = db
+        self.page_size = page_size or Config.RECORDS_PAGE_SIZE
+        self.max_rows = max_rows or Config.RECORDS_MAX_ROWS
+        self.sort_column = "Registered"
+        self.descending = True
+        self.filters = {}
+        self._keys = {}  # tree item -> sort key (sort values, gadget id)
+        self._more_before = False
+        self._more_after = True
+        self._loading = False
+
+        # Filter controls
+        filter_frame = ctk.CTkFrame(parent)
+        filter_frame.pack(fill="x", padx=5, pady=5)
+
+        ctk.CTkLabel(filter_frame, text="Filter:").pack(side="left", padx=5)
+        self.filter_column = ctk.CTkOptionMenu(filter_frame, values=list(RECORD_COLUMNS))
+        self.filter_column.set("Student")
+        self.filter_column.pack(side="left", padx=5)
+        self.filter_entry = ctk.CTkEntry(filter_frame, placeholder_text="Starts with...")
+        self.filter_entry.pack(side="left", fill="x", expand=True, padx=5)
+        self.filter_entry.bind("<Return>", lambda event: self.apply_filter())
+        ctk.CTkButton(filter_frame, text="Apply", width=80, command=self.apply_filter).pack(side="left", padx=5)
+        ctk.CTkButton(filter_frame, text="Clear", width=80, command=self.clear_filter).pack(side="left", padx=5)
+        self.count_label = ctk.CTkLabel(filter_frame, text="")
+        self.count_label.pack(side="right", padx=10)
+
+        # Table
+        table_frame = ctk.CTkFrame(parent)
+        table_frame.pack(fill="both", expand=True, padx=5, pady=5)
+
+        self.tree = ttk.Treeview(table_frame, columns=list(RECORD_COLUMNS), show="headings", height=15)
+        for col in RECORD_COLUMNS:
+            self.tree.heading(col, text=col, command=lambda c=col: self.sort_by(c))
+            self.tree.column(col, width=150)
+
+        self.scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_scroll)
+
+        self.tree.pack(side="left", fill="both", expand=True, padx=5, pady=5)
+        self.scrollbar.pack(side="right", fill="y", pady=5)
+
+        self.reload()
+
+    # -- user actions -------------------------------------------------------
+
+    def sort_by(self, column):
+        """Sort on a column; clicking the current sort column flips direction"""
+        if column == self.sort_column:
+            self.descending = not self.descending
+        else:
+            self.sort_column = column
+            self.descending = False
+        self.reload()
+
+    def apply_filter(self):
+        text = self.filter_entry.get().strip()
+        self.filters = {self.filter_column.get(): text} if text else {}
+        self.reload()
+
+    def clear_filter(self):
+        self.filter_entry.delete(0, "end")
+        self.filters = {}
+        self.reload()
+
+    def reload(self):
+        """Start again from the first page with the current sort and filter"""
+        self.tree.delete(*self.tree.get_children())
+        self._keys.clear()
+        self._more_before = False
+        self._more_after = True
+
+        for col in RECORD_COLUMNS:
+            arrow = (" ▼" if self.descending else " ▲") if col == self.sort_column else ""
+            self.tree.heading(col, text=col + arrow)
+
+        self._load_after()
+        self._update_count()
+
+    # -- paging -------------------------------------------------------------
+
+    def _fetch(self, after=None, before=None):
+        conn = self.db.get_connection()
+        try:
+            return fetch_records_page(conn, self.sort_column, self.descending, self.filters,
+                                      after=after, before=before, limit=self.page_size)
+        finally:
+            conn.close()
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if self._loading:
+            return
+        if float(last) > 0.9 and self._more_after:
+            self.tree.after_idle(self._load_after)
+        elif float(first) < 0.1 and self._more_before:
+            self.tree.after_idle(self._load_before)
+
+    def _top_index(self):
+        return int(round(float(self.tree.yview()[0]) * len(self.tree.get_children())))
+
+    def _load_after(self):
+        if self._loading or not self._more_after:
+            return
+        self._loading = True
+        try:
+            children = self.tree.get_children()
+            after = self._keys[children[-1]] if children else None
+            page = self._fetch(after=after)
+            self._more_after = len(page) == self.page_size
+
+            top = self._top_index()
+            for key, values in page:
+                item = self.tree.insert("", "end", values=values)
+                self._keys[item] = key
+
+            # Slide the window: drop rows from the top beyond max_rows
+            children = self.tree.get_children()
+            excess = len(children) - self.max_rows
+            if excess > 0:
+                self._drop(children[:excess])
+                self._more_before = True
+                self.tree.yview_moveto(max(top - excess, 0) / max(len(children) - excess, 1))
+        finally:
+            self._loading = False
+
+    def _load_before(self):
+        if self._loading or not self._more_before:
+            return
+        self._loading = True
+        try:
+            children = self.tree.get_children()
+            if not children:
+                return
+            page = self._fetch(before=self._keys[children[0]])
+            self._more_before = len(page) == self.page_size
+
+            top = self._top_index()
+            for index, (key, values) in enumerate(page):
+                item = self.tree.insert("", index, values=values)
+                self._keys[item] = key
+
+            children = self.tree.get_children()
+            excess = len(children) - self.max_rows
+            if excess > 0:
+                self._drop(children[-excess:])
+                self._more_after = True
+            self.tree.yview_moveto((top + len(page)) / max(len(self.tree.get_children()), 1))
+        finally:
+            self._loading = False
+
+    def _drop(self, items):
+        self.tree.delete(*items)
+        for item in items:
+            self._keys.pop(item, None)
+
+    def _update_count(self):
+        """Total from the dashboard counters - no COUNT(*) over gadgets"""
+        if self.filters:
+            self.count_label.configure(text="Filtered")
+            return
+        conn = self.db.get_connection()
+        try:
+            counters = get_dashboard_counters(conn)
+        finally:
+            conn.close()
+        if counters:
+            self.count_label.configure(text=f"{counters['total_gadgets']} records")
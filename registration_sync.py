@@ -0,0 +1,205 @@
+import sqlite3
+
+# Change feed for web registrations. The web server logs every change to a
+# gadget (or the student it belongs to) in registration_changes, whose seq is
+# a monotonically increasing cursor. The desktop remembers the last seq it
+# applied in sync_state and only pulls changes after it.
+
+SYNC_CURSOR_KEY = "web_registrations_cursor"
+
+# Columns the desktop mirrors; check-in/out status changes are not logged
+WATCHED_GADGET_COLUMNS = (
+    "student_id, record_number, gadget_type, brand, model, serial_number, color, "
+    "additional_details, passport_photo, student_card_photo, gadget_photo, "
+    "web_registered, registration_status"
+)
+
+CHANGE_TRIGGERS = [
+    '''
+    CREATE TRIGGER IF NOT EXISTS registration_changes_gadget_insert AFTER INSERT ON gadgets
+    BEGIN
+        INSERT INTO registration_changes (gadget_id) VALUES (new.id);
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS registration_changes_gadget_update
+    AFTER UPDATE OF {WATCHED_GADGET_COLUMNS} ON gadgets
+    BEGIN
+        INSERT INTO registration_changes (gadget_id) VALUES (new.id);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS registration_changes_gadget_delete AFTER DELETE ON gadgets
+    BEGIN
+        INSERT INTO registration_changes (gadget_id) VALUES (old.id);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS registration_changes_student_update
+    AFTER UPDATE OF full_name, registration_number, national_id ON students
+    BEGIN
+        INSERT INTO registration_changes (gadget_id)
+        SELECT id FROM gadgets WHERE student_id = new.id;
+    END
+    ''',
+]
+
+def create_change_feed(cursor):
+    """Create the change log, its triggers and the client cursor table.
+
+    Pending web registrations that already exist are logged once so a client
+    starting from cursor 0 receives them.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS registration_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            gadget_id INTEGER NOT NULL,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sync_state (
+            name TEXT PRIMARY KEY,
+            value TEXT
+        )
+    ''')
+    for trigger in CHANGE_TRIGGERS:
+        cursor.execute(trigger)
+
+    cursor.execute('''
+        INSERT INTO registration_changes (gadget_id)
+        SELECT id FROM gadgets
+        WHERE web_registered = 1 AND registration_status = 'pending'
+        ORDER BY id
+    ''')
+
+# -- server side -------------------------------------------------------------
+
+def get_changes(conn, since_seq=0, limit=500):
+    """Changes after ``since_seq``, collapsed to the latest state per gadget.
+
+    Returns a dict with ``changes`` (one dict per changed web registration:
+    its current fields, or ``deleted: True``), ``cursor`` (the seq to pass
+    next time), ``has_more`` and ``reset`` (the client's cursor is ahead of
+    this log, e.g. after a database restore, and it should resync from 0).
+    """
+    latest_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM registration_changes").fetchone()[0]
+    if since_seq > latest_seq:
+        return {'changes': [], 'cursor': 0, 'has_more': True, 'reset': True}
+
+    cursor = conn.execute('''
+        SELECT c.seq, c.gadget_id, g.id IS NULL AS deleted, g.web_registered,
+               g.registration_status, g.record_number, s.full_name, s.registration_number,
+               s.national_id, g.gadget_type, g.brand, g.model, g.serial_number, g.color,
+               g.additional_details, g.passport_photo, g.student_card_photo,
+               g.gadget_photo, g.created_at
+        FROM (
+            SELECT gadget_id, MAX(seq) AS seq
+            FROM registration_changes
+            WHERE seq > ?
+            GROUP BY gadget_id
+            ORDER BY seq
+            LIMIT ?
+        ) c
+        LEFT JOIN gadgets g ON g.id = c.gadget_id
+        LEFT JOIN students s ON s.id = g.student_id
+        ORDER BY c.seq
+    ''', (since_seq, limit))
+    columns = [column[0] for column in cursor.description]
+    rows = cursor.fetchall()
+
+    changes = []
+    for row in rows:
+        change = dict(zip(columns, row))
+        if change['deleted'] or change['web_registered']:
+            change['id'] = change.pop('gadget_id')
+            change['deleted'] = bool(change['deleted'])
+            del change['web_registered']
+            changes.append(change)
+
+    return {
+        'changes': changes,
+        'cursor': rows[-1][0] if rows else since_seq,
+        'has_more': len(rows) == limit,
+        'reset': False
+    }
+
+# -- desktop side ------------------------------------------------------------
+
+def get_sync_cursor(conn):
+    row = conn.execute("SELECT value FROM sync_state WHERE name = ?", (SYNC_CURSOR_KEY,)).fetchone()
+    return int(row[0]) if row else 0
+
+UPSERT_REGISTRATION = '''
+    INSERT INTO web_registrations
+    (id, student_name, registration_number, national_id, gadget_type, brand, model,
+     serial_number, color, additional_details, gadget_photo, passport_photo,
+     student_card_photo, record_number, created_at, status)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'pending')
+    ON CONFLICT(id) DO UPDATE SET
+        student_name = excluded.student_name,
+        registration_number = excluded.registration_number,
+        national_id = excluded.national_id,
+        gadget_type = excluded.gadget_type,
+        brand = excluded.brand,
+        model = excluded.model,
+        serial_number = excluded.serial_number,
+        color = excluded.color,
+        additional_details = excluded.additional_details,
+        gadget_photo = excluded.gadget_photo,
+        passport_photo = excluded.passport_photo,
+        student_card_photo = excluded.student_card_photo,
+        record_number = excluded.record_number
+'''
+
+def apply_changes(conn, changes, new_cursor):
+    """Apply one page of changes and advance the stored cursor atomically.
+
+    Registrations still pending on the server are upserted (a local approval
+    is never overwritten); ones the server approved, rejected or deleted leave
+    the local pending list. Returns (upserted, closed) counts.
+    """
+    upserts = []
+    closed = []
+    for change in changes:
+        if change['deleted']:
+            closed.append(('removed', change['id']))
+        elif change['registration_status'] != 'pending':
+            closed.append((change['registration_status'], change['id']))
+        else:
+            upserts.append((
+                change['id'], change['full_name'], change['registration_number'],
+                change.get('national_id') or 'N/A', change['gadget_type'], change['brand'],
+                change['model'], change['serial_number'], change.get('color') or '',
+                change.get('additional_details') or '', change.get('gadget_photo'),
+                change.get('passport_photo'), change.get('student_card_photo'),
+                change.get('record_number'), change.get('created_at') or ''
+            ))
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            cursor.executemany(UPSERT_REGISTRATION, upserts)
+        except sqlite3.IntegrityError:
+            # One row clashes with a local record (e.g. duplicate serial
+            # number): apply the rest row by row rather than stall the feed.
+            for params in upserts:
+                try:
+                    cursor.execute(UPSERT_REGISTRATION, params)
+                except sqlite3.IntegrityError as e:
+                    print(f"⚠️ Skipped web registration {params[0]}: {e}")
+        cursor.executemany(
+            "UPDATE web_registrations SET status = ? WHERE id = ? AND status = 'pending'",
+            closed
+        )
+        cursor.execute('''
+            INSERT INTO sync_state (name, value) VALUES (?, ?)
+            ON CONFLICT(name) DO UPDATE SET value = excluded.value
+        ''', (SYNC_CURSOR_KEY, str(new_cursor)))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    return len(upserts), len(closed)
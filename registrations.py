@@ -0,0 +1,124 @@
+import sqlite3
+
+from record_numbers import next_record_number
+
+# Validation and inserts for student registrations submitted over the web,
+# shared by the Flask routes in web_server.py and the async intake path in
+# asgi_intake.py. Nothing here commits: callers own the transaction.
+
+STUDENT_FIELDS = ('full_name', 'registration_number', 'national_id')
+GADGET_FIELDS = ('gadget_type', 'brand', 'model', 'serial_number', 'color', 'additional_details')
+REQUIRED_GADGET_FIELDS = ('gadget_type', 'brand', 'model', 'serial_number')
+PHOTO_FIELDS = ('passport_photo', 'student_card_photo', 'gadget_photo')
+
+# /api/register (JSON) lands in the web_registrations staging table
+API_REQUIRED_FIELDS = ('student_name', 'registration_number', 'national_id',
+                       'gadget_type', 'brand', 'model', 'serial_number')
+
+REGISTRATION_SUBMITTED = ('Gadget registration submitted successfully! '
+                          'Your registration is pending approval from campus security.')
+
+class RegistrationError(Exception):
+    """A submission that cannot be stored; the message is shown to the student"""
+
+
+def parse_registration_form(form):
+    """(student_data, gadget_data) from /register form fields.
+
+    Raises RegistrationError naming the first missing required field.
+    """
+    student_data = {field: form.get(field, '').strip() for field in STUDENT_FIELDS}
+    student_data['registration_number'] = student_data['registration_number'].upper()
+    gadget_data = {field: form.get(field, '').strip() for field in GADGET_FIELDS}
+
+    for field in STUDENT_FIELDS:
+        if not student_data[field]:
+            raise RegistrationError(f'Please fill in {field.replace("_", " ").title()}')
+    for field in REQUIRED_GADGET_FIELDS:
+        if not gadget_data[field]:
+            raise RegistrationError(f'Please fill in gadget {field.replace("_", " ").title()}')
+    return student_data, gadget_data
+
+def serial_registered(cursor, serial_number):
+    cursor.execute("SELECT id FROM gadgets WHERE serial_number = ?", (serial_number,))
+    return cursor.fetchone() is not None
+
+def save_registration(conn, student_data, gadget_data, photos):
+    """Store a pending web registration; returns its record number.
+
+    ``photos`` maps PHOTO_FIELDS to stored photo paths (missing ones are
+    NULL). The student is created, or updated if the registration number is
+    known.
+    """
+    cursor = conn.cursor()
+    if serial_registered(cursor, gadget_data['serial_number']):
+        raise RegistrationError('This serial number is already registered')
+
+    cursor.execute("SELECT id FROM students WHERE registration_number = ?", (student_data['registration_number'],))
+    student = cursor.fetchone()
+    if student:
+        student_id = student[0]
+        cursor.execute('''
+            UPDATE students SET full_name = ?, national_id = ?
+            WHERE id = ?
+        ''', (student_data['full_name'], student_data['national_id'], student_id))
+    else:
+        cursor.execute('''
+            INSERT INTO students (full_name, registration_number, national_id)
+            VALUES (?, ?, ?)
+        ''', (student_data['full_name'], student_data['registration_number'], student_data['national_id']))
+        student_id = cursor.lastrowid
+
+    # Generated in the caller's transaction, so it is released on failure
+    record_number = next_record_number(conn)
+
+    cursor.execute('''
+        INSERT INTO gadgets (student_id, record_number, gadget_type, brand, model,
+                          serial_number, color, additional_details, passport_photo,
+                          student_card_photo, gadget_photo, web_registered, registration_status)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (student_id, record_number, gadget_data['gadget_type'], gadget_data['brand'],
+          gadget_data['model'], gadget_data['serial_number'], gadget_data['color'],
+          gadget_data['additional_details'], photos.get('passport_photo'),
+          photos.get('student_card_photo'), photos.get('gadget_photo'), 1, 'pending'))
+    return record_number
+
+def validate_api_registration(data):
+    """Raise RegistrationError unless every required /api/register field is present"""
+    if not isinstance(data, dict):
+        raise RegistrationError('Expected a JSON object')
+    for field in API_REQUIRED_FIELDS:
+        if not data.get(field) or not str(data[field]).strip():
+            raise RegistrationError(f'Missing required field: {field}')
+
+def save_web_registration(conn, data):
+    """Stage an /api/register submission in web_registrations; returns its id"""
+    cursor = conn.cursor()
+    cursor.execute('SELECT id FROM web_registrations WHERE serial_number = ?', (data['serial_number'],))
+    if cursor.fetchone():
+        raise RegistrationError('Serial number already registered')
+
+    cursor.execute('''
+        INSERT INTO web_registrations
+        (student_name, registration_number, national_id, gadget_type, brand, model, serial_number, color, additional_details)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (
+        data['student_name'].strip(),
+        data['registration_number'].strip(),
+        data['national_id'].strip(),
+        data['gadget_type'].strip(),
+        data['brand'].strip(),
+        data['model'].strip(),
+        data['serial_number'].strip(),
+        data.get('color', '').strip(),
+        data.get('additional_details', '').strip()
+    ))
+    return cursor.lastrowid
+
+def registration_failure_message(error):
+    """Student-facing message for an exception raised while saving /register"""
+    if isinstance(error, RegistrationError):
+        return str(error)
+    if isinstance(error, sqlite3.IntegrityError):
+        return 'Registration number or serial number already exists'
+    return f'Registration failed: {str(error)}'
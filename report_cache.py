@@ -0,0 +1,268 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import threading
+import time
+
+from config import Config
+
+# Tables whose contents feed the reports. Migration 4 adds data_versions,
+# a per-table change counter bumped by triggers on every insert/update/delete.
+TRACKED_TABLES = ["gadgets", "students", "check_records"]
+
+def create_data_versions(cursor):
+    """Create the change-counter table and its triggers"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS data_versions (
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    for table in TRACKED_TABLES:
+        cursor.execute("INSERT OR IGNORE INTO data_versions (table_name, version) VALUES (?, 0)", (table,))
+        for operation in ("INSERT", "UPDATE", "DELETE"):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS data_version_{table}_{operation.lower()}
+                AFTER {operation} ON {table}
+                BEGIN
+                    UPDATE data_versions SET version = version + 1 WHERE table_name = '{table}';
+                END
+            ''')
+
+def get_data_version(conn):
+    """Stamp identifying the current contents of the report tables"""
+    try:
+        rows = conn.execute("SELECT table_name, version FROM data_versions ORDER BY table_name").fetchall()
+    except Exception:
+        rows = None
+
+    if not rows:
+        # Unmigrated database: max rowid and row count catch inserts/deletes
+        rows = []
+        for table in TRACKED_TABLES:
+            rows.append((table, conn.execute(f"SELECT MAX(rowid), COUNT(*) FROM {table}").fetchone()))
+
+    return "|".join(f"{table}:{version}" for table, version in rows)
+
+
+class ReportCache:
+    """Caches generated report data, charts and PDFs on disk.
+
+    Entries are keyed by (report type, parameters, data version), so any
+    change to the underlying tables produces a new key and old entries simply
+    age out. Report data (DataFrames etc.) is pickled and charts are copied
+    into the cache directory, which the cache owns and evicts from by age and
+    total size. Exported PDFs stay in reports/ and are only referenced: they
+    are reused while their size and mtime are unchanged and never deleted.
+
+    The index file is written by whole-file replace, so use the shared
+    instance from get_report_cache() rather than constructing more than one
+    per cache directory.
+    """
+
+    INDEX_FILE = "index.json"
+
+    def __init__(self, cache_dir=None, max_bytes=None, max_age_seconds=None):
+        self.cache_dir = cache_dir or Config.REPORT_CACHE_DIR
+        self.max_bytes = max_bytes or Config.REPORT_CACHE_MAX_MB * 1024 * 1024
+        self.max_age_seconds = max_age_seconds or Config.REPORT_CACHE_MAX_AGE_HOURS * 3600
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._index = self._load_index()
+
+    # -- keys -------------------------------------------------------------
+
+    @staticmethod
+    def make_key(report_type, params, data_version):
+        raw = json.dumps([report_type, list(params), data_version], default=str)
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    # -- report data --------------------------------------------------------
+
+    def get(self, report_type, params, data_version):
+        """Return cached report data or None"""
+        key = self.make_key(report_type, params, data_version)
+
+        with self._lock:
+            entry = self._index.get(key)
+            if entry and self._entry_valid(entry):
+                try:
+                    with open(self._data_path(key), 'rb') as f:
+                        report_data = pickle.load(f)
+                except Exception:
+                    self._drop(key)
+                else:
+                    entry['last_access'] = time.time()
+                    self.hits += 1
+                    self._save_index()
+                    report_data['cache_key'] = key
+                    return report_data
+            elif entry:
+                self._drop(key)
+
+            self.misses += 1
+            return None
+
+    def put(self, report_type, params, data_version, report_data):
+        """Store report data; returns its cache key (also set on report_data)"""
+        key = self.make_key(report_type, params, data_version)
+        data_path = self._data_path(key)
+
+        with self._lock:
+            # Keep a copy of the chart images so a later run with the same
+            # file name cannot overwrite what this entry points at; the
+            # originals stay in reports/ for the user.
+            payload = {k: v for k, v in report_data.items() if k != 'cache_key'}
+            files = {}
+            for field in ('chart_path', 'dashboard_path'):
+                if report_data.get(field) and os.path.exists(report_data[field]):
+                    cached_path = os.path.join(self.cache_dir, f"{key}_{field}.png")
+                    shutil.copy2(report_data[field], cached_path)
+                    payload[field] = cached_path
+                    files[field] = self._file_stamp(cached_path)
+
+            with open(data_path, 'wb') as f:
+                pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+            now = time.time()
+            self._index[key] = {
+                'report_type': report_type,
+                'created': now,
+                'last_access': now,
+                'data_bytes': os.path.getsize(data_path),
+                'files': files,
+                'pdfs': {}
+            }
+            self._evict()
+            self._save_index()
+
+        report_data['cache_key'] = key
+        return key
+
+    # -- PDFs ---------------------------------------------------------------
+
+    def get_pdf(self, cache_key, report_type):
+        """Path of a PDF already exported for this cached report, or None"""
+        with self._lock:
+            entry = self._index.get(cache_key)
+            stamp = entry and entry['pdfs'].get(report_type)
+            if stamp and self._stamp_valid(stamp):
+                entry['last_access'] = time.time()
+                self.hits += 1
+                return stamp['path']
+            self.misses += 1
+            return None
+
+    def put_pdf(self, cache_key, report_type, pdf_path):
+        with self._lock:
+            entry = self._index.get(cache_key)
+            if entry is None:
+                return
+            entry['pdfs'][report_type] = self._file_stamp(pdf_path)
+            self._evict()
+            self._save_index()
+
+    # -- maintenance ----------------------------------------------------------
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._index),
+                'bytes': sum(self._entry_bytes(e) for e in self._index.values())
+            }
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._index):
+                self._drop(key)
+            self._save_index()
+
+    def _evict(self):
+        """Drop expired entries, then least recently used ones over the size limit"""
+        now = time.time()
+        for key, entry in list(self._index.items()):
+            if now - entry['created'] > self.max_age_seconds:
+                self._drop(key)
+                self.evictions += 1
+
+        total = sum(self._entry_bytes(e) for e in self._index.values())
+        for key, entry in sorted(self._index.items(), key=lambda item: item[1]['last_access']):
+            if total <= self.max_bytes:
+                break
+            total -= self._entry_bytes(entry)
+            self._drop(key)
+            self.evictions += 1
+
+    def _drop(self, key):
+        """Forget an entry and delete the files the cache owns (not PDFs)"""
+        entry = self._index.pop(key, None)
+        if entry is None:
+            return
+        paths = [self._data_path(key)] + [stamp['path'] for stamp in entry['files'].values()]
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _entry_valid(self, entry):
+        if time.time() - entry['created'] > self.max_age_seconds:
+            return False
+        return all(self._stamp_valid(stamp) for stamp in entry['files'].values())
+
+    @staticmethod
+    def _file_stamp(path):
+        stat = os.stat(path)
+        return {'path': path, 'size': stat.st_size, 'mtime': stat.st_mtime}
+
+    @staticmethod
+    def _stamp_valid(stamp):
+        try:
+            stat = os.stat(stamp['path'])
+        except OSError:
+            return False
+        return stat.st_size == stamp['size'] and stat.st_mtime == stamp['mtime']
+
+    @staticmethod
+    def _entry_bytes(entry):
+        return entry['data_bytes'] + sum(stamp['size'] for stamp in entry['files'].values())
+
+    def _data_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def _load_index(self):
+        try:
+            with open(os.path.join(self.cache_dir, self.INDEX_FILE), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        path = os.path.join(self.cache_dir, self.INDEX_FILE)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, path)
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_report_cache(cache_dir=None):
+    """Shared ReportCache for a cache directory (Config.REPORT_CACHE_DIR by default)"""
+    key = os.path.abspath(cache_dir or Config.REPORT_CACHE_DIR)
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = ReportCache(key)
+        return _caches[key]
@@ -0,0 +1,163 @@
+import itertools
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Config
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when the user cancelled it"""
+
+
+class ReportJob:
+    """A unit of report work running on the job manager's worker pool"""
+
+    def __init__(self, job_id, name, manager, on_progress=None, on_done=None,
+                 on_error=None, on_cancel=None):
+        self.job_id = job_id
+        self.name = name
+        self.state = "queued"
+        self.progress = 0
+        self.message = ""
+        self._manager = manager
+        self._cancel_event = threading.Event()
+        self._callbacks = {
+            'progress': on_progress,
+            'done': on_done,
+            'error': on_error,
+            'cancel': on_cancel
+        }
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        """Ask the job to stop at its next progress checkpoint"""
+        self._cancel_event.set()
+
+    def report_progress(self, percent, message=""):
+        """Progress callback handed to the report function.
+
+        Runs on the worker thread: it only queues the update for the UI
+        thread, and doubles as the cancellation checkpoint.
+        """
+        if self.cancelled:
+            raise JobCancelled(self.name)
+        self._manager._post(self, 'progress', percent, message)
+
+
+class ReportJobManager:
+    """Runs report generation off the Tk main thread.
+
+    Work runs on a bounded thread pool; results, errors and progress are
+    queued and delivered on the Tk thread by polling with root.after, so
+    callbacks can touch widgets directly.
+    """
+
+    POLL_INTERVAL_MS = 50
+
+    def __init__(self, root, max_workers=None, max_pending=None):
+        self.root = root
+        self.max_workers = max_workers or Config.REPORT_WORKERS
+        self.max_pending = max_pending or Config.REPORT_MAX_PENDING
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix="report-worker")
+        self._events = queue.Queue()
+        self._jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._polling = False
+
+    def submit(self, name, func, *args, on_progress=None, on_done=None,
+               on_error=None, on_cancel=None, **kwargs):
+        """Queue func(*args, progress=job.report_progress, **kwargs).
+
+        Returns the ReportJob, or None if too many jobs are already queued or
+        running. on_done receives the function's return value, on_error the
+        exception, on_progress (percent, message); all run on the Tk thread.
+        """
+        with self._lock:
+            if len(self._jobs) >= self.max_pending:
+                return None
+            job = ReportJob(next(self._ids), name, self, on_progress, on_done,
+                            on_error, on_cancel)
+            self._jobs[job.job_id] = job
+
+        self._executor.submit(self._run, job, func, args, kwargs)
+        self._ensure_polling()
+        return job
+
+    def _run(self, job, func, args, kwargs):
+        if job.cancelled:
+            self._post(job, 'cancel')
+            return
+        job.state = "running"
+        try:
+            result = func(*args, progress=job.report_progress, **kwargs)
+        except JobCancelled:
+            self._post(job, 'cancel')
+        except Exception as e:
+            self._post(job, 'error', e)
+        else:
+            if job.cancelled:
+                self._post(job, 'cancel')
+            else:
+                self._post(job, 'done', result)
+
+    def _post(self, job, event, *payload):
+        self._events.put((job, event, payload))
+
+    def _ensure_polling(self):
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.POLL_INTERVAL_MS, self._drain_events)
+
+    def _drain_events(self):
+        """Deliver queued job events on the Tk thread"""
+        while True:
+            try:
+                job, event, payload = self._events.get_nowait()
+            except queue.Empty:
+                break
+
+            if event == 'progress':
+                job.progress, job.message = payload
+            else:
+                job.state = {'done': "done", 'error': "failed", 'cancel': "cancelled"}[event]
+                with self._lock:
+                    self._jobs.pop(job.job_id, None)
+
+            callback = job._callbacks.get(event)
+            if callback:
+                try:
+                    callback(*payload)
+                except Exception as e:
+                    print(f"❌ Report job callback failed ({job.name}): {e}")
+
+        with self._lock:
+            busy = bool(self._jobs)
+        if busy or not self._events.empty():
+            self.root.after(self.POLL_INTERVAL_MS, self._drain_events)
+        else:
+            self._polling = False
+
+    def active_jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job:
+            job.cancel()
+
+    def cancel_all(self):
+        for job in self.active_jobs():
+            job.cancel()
+
+    def shutdown(self):
+        """Cancel outstanding jobs and stop the worker threads"""
+        self.cancel_all()
+        self._executor.shutdown(wait=False)
@@ -4,12 +4,16 @@ import tkinter as tk
 from datetime import datetime, timedelta
 import os
 from reports_module import AdvancedReports
+from report_jobs import ReportJobManager
 from PIL import Image, ImageTk
 
 class ReportsGUI:
     def __init__(self, parent=None):
         self.parent = parent
         self.reports = AdvancedReports()
+        self.job_manager = None
+        self.progress_bar = None
+        self.progress_label = None
         
         if parent is None:
             self.root = ctk.CTk()
@@ -111,51 +115,27 @@ class ReportsGUI:
                 messagebox.showerror("Error", "Please enter both start and end dates")
                 return
             
-            # Show loading
-            self.show_loading("Generating Daily Activity Report...")
-            
-            # Generate report
-            report_data = self.reports.generate_daily_activity_report(start_date, end_date)
-            
-            # Export to PDF
-            pdf_path = self.reports.export_report_to_pdf(report_data, "Daily_Activity_Report")
-            
-            # Display results
-            self.display_report_results(report_data, pdf_path, "Daily Activity Report")
+            # Generate report and PDF in the background
+            self.run_report_job("Daily Activity Report", "Daily_Activity_Report",
+                                self.reports.generate_daily_activity_report, start_date, end_date)
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to generate report: {str(e)}")
     
     def generate_trend_report(self):
         try:
-            # Show loading
-            self.show_loading("Generating Trend Analysis Report...")
-            
-            # Generate report (last 30 days)
-            report_data = self.reports.generate_trend_analysis_report(30)
-            
-            # Export to PDF
-            pdf_path = self.reports.export_report_to_pdf(report_data, "Trend_Analysis_Report")
-            
-            # Display results
-            self.display_report_results(report_data, pdf_path, "Trend Analysis Report")
+            # Generate report (last 30 days) in the background
+            self.run_report_job("Trend Analysis Report", "Trend_Analysis_Report",
+                                self.reports.generate_trend_analysis_report, 30)
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to generate report: {str(e)}")
     
     def generate_dashboard(self):
         try:
-            # Show loading
-            self.show_loading("Generating Comprehensive Dashboard...")
-            
-            # Generate dashboard
-            report_data = self.reports.generate_comprehensive_dashboard()
-            
-            # Export to PDF
-            pdf_path = self.reports.export_report_to_pdf(report_data, "Comprehensive_Dashboard")
-            
-            # Display results
-            self.display_report_results(report_data, pdf_path, "Comprehensive Dashboard")
+            # Generate dashboard in the background
+            self.run_report_job("Comprehensive Dashboard", "Comprehensive_Dashboard",
+                                self.reports.generate_comprehensive_dashboard)
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to generate dashboard: {str(e)}")
@@ -168,25 +148,50 @@ class ReportsGUI:
                 messagebox.showerror("Error", "Please enter a registration number")
                 return
             
-            # Show loading
-            self.show_loading(f"Generating Report for {registration_number}...")
-            
-            # Generate student report
-            report_data = self.reports.generate_student_activity_report(registration_number)
-            
-            if report_data:
-                # Export to PDF
-                pdf_path = self.reports.export_report_to_pdf(report_data, f"Student_Report_{registration_number}")
-                
-                # Display results
-                self.display_report_results(report_data, pdf_path, f"Student Report - {registration_number}")
-            else:
-                messagebox.showwarning("Not Found", f"No student found with registration number: {registration_number}")
+            # Generate student report in the background
+            self.run_report_job(f"Student Report - {registration_number}",
+                                f"Student_Report_{registration_number}",
+                                self.reports.generate_student_activity_report, registration_number,
+                                not_found_message=f"No student found with registration number: {registration_number}")
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to generate student report: {str(e)}")
     
-    def show_loading(self, message):
+    def run_report_job(self, title, pdf_name, generate, *args, not_found_message=None):
+        """Generate a report and its PDF on a worker thread, then display it"""
+        if self.job_manager is None:
+            self.job_manager = ReportJobManager(self.results_frame)
+        
+        def build_report(*args, progress=None):
+            report_data = generate(*args, progress=progress)
+            if not report_data:
+                return None, None
+            pdf_path = self.reports.export_report_to_pdf(report_data, pdf_name, progress=progress)
+            return report_data, pdf_path
+        
+        def on_done(result):
+            report_data, pdf_path = result
+            if report_data:
+                self.display_report_results(report_data, pdf_path, title)
+            else:
+                messagebox.showwarning("Not Found", not_found_message or "No data found for this report")
+                self.clear_results()
+        
+        def on_error(error):
+            messagebox.showerror("Error", f"Failed to generate {title}: {str(error)}")
+            self.clear_results()
+        
+        job = self.job_manager.submit(title, build_report, *args,
+                                      on_progress=self.update_loading,
+                                      on_done=on_done, on_error=on_error,
+                                      on_cancel=self.clear_results)
+        if job is None:
+            messagebox.showwarning("Busy", "Reports are still being generated. Please wait for them to finish.")
+            return
+        
+        self.show_loading(f"Generating {title}...", job)
+    
+    def show_loading(self, message, job=None):
         # Clear results frame
         for widget in self.results_frame.winfo_children():
             widget.destroy()
@@ -195,7 +200,32 @@ class ReportsGUI:
                                    font=ctk.CTkFont(size=16))
         loading_label.pack(expand=True)
         
-        self.results_frame.update()
+        if job is None:
+            self.results_frame.update()
+            return
+        
+        # Background job: show progress and allow cancelling
+        self.progress_bar = ctk.CTkProgressBar(self.results_frame, width=400)
+        self.progress_bar.set(0)
+        self.progress_bar.pack(pady=10)
+        
+        self.progress_label = ctk.CTkLabel(self.results_frame, text="Queued...",
+                                           font=ctk.CTkFont(size=12))
+        self.progress_label.pack(pady=5)
+        
+        ctk.CTkButton(self.results_frame, text="✖ Cancel", fg_color="red",
+                     command=job.cancel).pack(pady=10)
+    
+    def update_loading(self, percent, message):
+        """Progress callback from the report worker (runs on the Tk thread)"""
+        try:
+            if self.progress_bar is not None:
+                self.progress_bar.set(percent / 100.0)
+            if self.progress_label is not None:
+                self.progress_label.configure(text=message)
+        except tk.TclError:
+            # Loading widgets were destroyed (user navigated away)
+            pass
     
     def display_report_results(self, report_data, pdf_path, title):
         # Clear results frame
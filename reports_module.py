@@ -1,194 +1,314 @@
-import sqlite3
+import threading
 import pandas as pd
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import seaborn as sns
 from datetime import datetime, timedelta
 import os
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib import colors
-from reportlab.lib.units import inch
 import matplotlib
 matplotlib.use('Agg')  # For server-side plotting
+from config import Config
+import db_pool
+from dashboard_counters import get_dashboard_counters
+from report_cache import get_report_cache, get_data_version
+from rollups import rollups_exist
+from archive import check_records_source
+
+# Charts are drawn on standalone Figure objects rather than through pyplot's
+# global state so reports can be generated on background worker threads
+# (see report_jobs); the lock keeps concurrent renders from interleaving.
+_render_lock = threading.Lock()
+
+# Same results from the raw tables, for a database the rollup migration has
+# not reached yet (e.g. opened read-only or by an older web server).
+RAW_DAILY_ACTIVITY_QUERY = """
+SELECT 
+    DATE(COALESCE(check_in_time, check_out_time)) as activity_date,
+    COUNT(CASE WHEN status = 'checked_in' THEN 1 END) as check_ins,
+    COUNT(CASE WHEN status = 'checked_out' THEN 1 END) as check_outs,
+    COUNT(*) as total_activities
+FROM {check_records} 
+WHERE DATE(COALESCE(check_in_time, check_out_time)) BETWEEN ? AND ?
+GROUP BY DATE(COALESCE(check_in_time, check_out_time))
+ORDER BY activity_date
+"""
+
+RAW_GADGET_TYPE_QUERY = """
+SELECT gadget_type, COUNT(*) as count
+FROM gadgets 
+WHERE DATE(created_at) BETWEEN ? AND ?
+GROUP BY gadget_type
+ORDER BY count DESC
+"""
+
+RAW_TREND_QUERY = """
+SELECT 
+    DATE(created_at) as date,
+    COUNT(*) as daily_registrations,
+    SUM(COUNT(*)) OVER (ORDER BY DATE(created_at)) as cumulative_registrations
+FROM gadgets 
+WHERE DATE(created_at) BETWEEN ? AND ?
+GROUP BY DATE(created_at)
+ORDER BY date
+"""
+
+RAW_STATUS_QUERY = """
+SELECT 
+    COALESCE(registration_status, 'pending') as registration_status,
+    COUNT(*) as count
+FROM gadgets 
+WHERE DATE(created_at) BETWEEN ? AND ?
+GROUP BY COALESCE(registration_status, 'pending')
+"""
+
+RAW_HOURLY_QUERY = """
+SELECT 
+    strftime('%H', check_in_time) as hour,
+    COUNT(*) as activity_count
+FROM {check_records} 
+WHERE DATE(check_in_time) BETWEEN ? AND ? AND status = 'checked_in'
+GROUP BY strftime('%H', check_in_time)
+ORDER BY hour
+"""
 
 class AdvancedReports:
-    def __init__(self, db_path="campus_gadgets.db"):
+    def __init__(self, db_path=Config.DATABASE_PATH):
         self.db_path = db_path
         self.reports_dir = "reports"
         os.makedirs(self.reports_dir, exist_ok=True)
+        self.cache = get_report_cache()
         
         # Set style for better looking charts
         plt.style.use('seaborn-v0_8')
         sns.set_palette("husl")
     
     def get_connection(self):
-        return sqlite3.connect(self.db_path)
+        return db_pool.get_connection(self.db_path)
     
-    def generate_daily_activity_report(self, start_date, end_date):
+    def _report_progress(self, progress, percent, message):
+        """Forward progress to an optional callback (may raise to cancel)"""
+        if progress:
+            progress(percent, message)
+    
+    def _read_report_query(self, conn, rollup_query, raw_query, start_date, end_date):
+        """Run a report query against the rollups, or against the raw tables
+        (archived months included) when the rollup tables are missing"""
+        params = (start_date, end_date)
+        if rollups_exist(conn):
+            return pd.read_sql_query(rollup_query, conn, params=params)
+        with check_records_source(conn, start_date, end_date) as check_records:
+            return pd.read_sql_query(raw_query.format(check_records=check_records), conn, params=params)
+    
+    def _cached_report(self, conn, report_type, params, progress):
+        """Look a report up in the cache; returns (data_version, cached data or None)"""
+        data_version = get_data_version(conn)
+        cached = self.cache.get(report_type, params, data_version)
+        if cached is not None:
+            conn.close()
+            stats = self.cache.stats()
+            print(f"📦 Report cache hit: {report_type} (hit rate {stats['hit_rate']:.0%})")
+            self._report_progress(progress, 90, "Loaded from report cache")
+        return data_version, cached
+    
+    def generate_daily_activity_report(self, start_date, end_date, progress=None):
         """Generate daily activity report with charts"""
+        self._report_progress(progress, 5, "Querying daily activity...")
         conn = self.get_connection()
         
-        # Daily activity data
+        params = (start_date, end_date)
+        data_version, cached = self._cached_report(conn, 'daily_activity', params, progress)
+        if cached is not None:
+            return cached
+        
+        # Daily activity data - from the hourly rollup, archived months included
         daily_query = """
         SELECT 
-            DATE(check_in_time) as activity_date,
-            COUNT(CASE WHEN status = 'checked_in' THEN 1 END) as check_ins,
-            COUNT(CASE WHEN status = 'checked_out' THEN 1 END) as check_outs,
-            COUNT(*) as total_activities
-        FROM check_records 
-        WHERE DATE(check_in_time) BETWEEN ? AND ?
-        GROUP BY DATE(check_in_time)
+            activity_date,
+            SUM(CASE WHEN status = 'checked_in' THEN activity_count ELSE 0 END) as check_ins,
+            SUM(CASE WHEN status = 'checked_out' THEN activity_count ELSE 0 END) as check_outs,
+            SUM(activity_count) as total_activities
+        FROM check_activity_hourly 
+        WHERE activity_date BETWEEN ? AND ?
+        GROUP BY activity_date
         ORDER BY activity_date
         """
         
-        daily_df = pd.read_sql_query(daily_query, conn, params=(start_date, end_date))
-        
-        # Create visualization
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 10))
-        
-        # Daily activity line chart
-        if not daily_df.empty:
-            ax1.plot(daily_df['activity_date'], daily_df['check_ins'], marker='o', label='Check-ins', linewidth=2)
-            ax1.plot(daily_df['activity_date'], daily_df['check_outs'], marker='s', label='Check-outs', linewidth=2)
-            ax1.set_title('Daily Check-in/Check-out Activity', fontsize=14, fontweight='bold')
-            ax1.set_xlabel('Date')
-            ax1.set_ylabel('Number of Activities')
-            ax1.legend()
-            ax1.grid(True, alpha=0.3)
-            plt.setp(ax1.xaxis.get_majorticklabels(), rotation=45)
+        daily_df = self._read_report_query(conn, daily_query, RAW_DAILY_ACTIVITY_QUERY, start_date, end_date)
         
         # Gadget type distribution
         gadget_query = """
-        SELECT gadget_type, COUNT(*) as count
-        FROM gadgets 
-        WHERE created_at BETWEEN ? AND ?
+        SELECT gadget_type, SUM(registration_count) as count
+        FROM gadget_registrations_daily 
+        WHERE registration_date BETWEEN ? AND ?
         GROUP BY gadget_type
         ORDER BY count DESC
         """
         
-        gadget_df = pd.read_sql_query(gadget_query, conn, params=(start_date, end_date))
-        
-        if not gadget_df.empty:
-            ax2.pie(gadget_df['count'], labels=gadget_df['gadget_type'], autopct='%1.1f%%', startangle=90)
-            ax2.set_title('Gadget Type Distribution', fontsize=14, fontweight='bold')
-        
-        plt.tight_layout()
-        
-        # Save chart
-        chart_path = os.path.join(self.reports_dir, f"daily_activity_{start_date}_to_{end_date}.png")
-        plt.savefig(chart_path, dpi=300, bbox_inches='tight')
-        plt.close()
+        gadget_df = self._read_report_query(conn, gadget_query, RAW_GADGET_TYPE_QUERY, start_date, end_date)
         
         conn.close()
         
-        return {
+        self._report_progress(progress, 40, "Rendering charts...")
+        
+        # Create visualization
+        with _render_lock:
+            fig = Figure(figsize=(12, 10))
+            (ax1, ax2) = fig.subplots(2, 1)
+        
+            # Daily activity line chart
+            if not daily_df.empty:
+                ax1.plot(daily_df['activity_date'], daily_df['check_ins'], marker='o', label='Check-ins', linewidth=2)
+                ax1.plot(daily_df['activity_date'], daily_df['check_outs'], marker='s', label='Check-outs', linewidth=2)
+                ax1.set_title('Daily Check-in/Check-out Activity', fontsize=14, fontweight='bold')
+                ax1.set_xlabel('Date')
+                ax1.set_ylabel('Number of Activities')
+                ax1.legend()
+                ax1.grid(True, alpha=0.3)
+                plt.setp(ax1.xaxis.get_majorticklabels(), rotation=45)
+        
+            if not gadget_df.empty:
+                ax2.pie(gadget_df['count'], labels=gadget_df['gadget_type'], autopct='%1.1f%%', startangle=90)
+                ax2.set_title('Gadget Type Distribution', fontsize=14, fontweight='bold')
+        
+            fig.tight_layout()
+        
+            # Save chart
+            chart_path = os.path.join(self.reports_dir, f"daily_activity_{start_date}_to_{end_date}.png")
+            fig.savefig(chart_path, dpi=300, bbox_inches='tight')
+        
+        self._report_progress(progress, 90, "Chart saved")
+        
+        report_data = {
             'daily_data': daily_df,
             'gadget_data': gadget_df,
             'chart_path': chart_path
         }
+        self.cache.put('daily_activity', params, data_version, report_data)
+        return report_data
     
-    def generate_trend_analysis_report(self, period_days=30):
+    def generate_trend_analysis_report(self, period_days=30, progress=None):
         """Generate trend analysis with multiple charts"""
         end_date = datetime.now().strftime('%Y-%m-%d')
         start_date = (datetime.now() - timedelta(days=period_days)).strftime('%Y-%m-%d')
         
+        self._report_progress(progress, 5, "Querying registration trends...")
         conn = self.get_connection()
         
+        params = (period_days, end_date)
+        data_version, cached = self._cached_report(conn, 'trend_analysis', params, progress)
+        if cached is not None:
+            return cached
+        
         # Registration trends
         trend_query = """
         SELECT 
-            DATE(created_at) as date,
-            COUNT(*) as daily_registrations,
-            SUM(COUNT(*)) OVER (ORDER BY DATE(created_at)) as cumulative_registrations
-        FROM gadgets 
-        WHERE DATE(created_at) BETWEEN ? AND ?
-        GROUP BY DATE(created_at)
+            registration_date as date,
+            SUM(registration_count) as daily_registrations,
+            SUM(SUM(registration_count)) OVER (ORDER BY registration_date) as cumulative_registrations
+        FROM gadget_registrations_daily 
+        WHERE registration_date BETWEEN ? AND ?
+        GROUP BY registration_date
         ORDER BY date
         """
         
-        trend_df = pd.read_sql_query(trend_query, conn, params=(start_date, end_date))
+        trend_df = self._read_report_query(conn, trend_query, RAW_TREND_QUERY, start_date, end_date)
         
         # Status distribution
         status_query = """
         SELECT 
             registration_status,
-            COUNT(*) as count
-        FROM gadgets 
-        WHERE created_at BETWEEN ? AND ?
+            SUM(registration_count) as count
+        FROM gadget_registrations_daily 
+        WHERE registration_date BETWEEN ? AND ?
         GROUP BY registration_status
         """
         
-        status_df = pd.read_sql_query(status_query, conn, params=(start_date, end_date))
-        
-        # Create comprehensive visualization
-        fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(15, 12))
-        
-        # Registration trend
-        if not trend_df.empty:
-            ax1.plot(trend_df['date'], trend_df['daily_registrations'], marker='o', color='blue', linewidth=2)
-            ax1.set_title('Daily Registration Trend', fontsize=12, fontweight='bold')
-            ax1.set_xlabel('Date')
-            ax1.set_ylabel('Registrations')
-            ax1.grid(True, alpha=0.3)
-            plt.setp(ax1.xaxis.get_majorticklabels(), rotation=45)
-            
-            # Cumulative trend
-            ax2.plot(trend_df['date'], trend_df['cumulative_registrations'], marker='s', color='green', linewidth=2)
-            ax2.set_title('Cumulative Registrations', fontsize=12, fontweight='bold')
-            ax2.set_xlabel('Date')
-            ax2.set_ylabel('Total Registrations')
-            ax2.grid(True, alpha=0.3)
-            plt.setp(ax2.xaxis.get_majorticklabels(), rotation=45)
-        
-        # Status distribution
-        if not status_df.empty:
-            ax3.bar(status_df['registration_status'], status_df['count'], color=['#28a745', '#ffc107', '#dc3545'])
-            ax3.set_title('Registration Status Distribution', fontsize=12, fontweight='bold')
-            ax3.set_xlabel('Status')
-            ax3.set_ylabel('Count')
-            ax3.tick_params(axis='x', rotation=45)
+        status_df = self._read_report_query(conn, status_query, RAW_STATUS_QUERY, start_date, end_date)
         
         # Hourly activity pattern
         hourly_query = """
         SELECT 
-            strftime('%H', check_in_time) as hour,
-            COUNT(*) as activity_count
-        FROM check_records 
-        WHERE DATE(check_in_time) BETWEEN ? AND ?
-        GROUP BY strftime('%H', check_in_time)
+            hour,
+            SUM(activity_count) as activity_count
+        FROM check_activity_hourly 
+        WHERE activity_date BETWEEN ? AND ? AND status = 'checked_in'
+        GROUP BY hour
         ORDER BY hour
         """
         
-        hourly_df = pd.read_sql_query(hourly_query, conn, params=(start_date, end_date))
-        
-        if not hourly_df.empty:
-            ax4.bar(hourly_df['hour'], hourly_df['activity_count'], color='orange', alpha=0.7)
-            ax4.set_title('Hourly Activity Pattern', fontsize=12, fontweight='bold')
-            ax4.set_xlabel('Hour of Day')
-            ax4.set_ylabel('Activity Count')
-        
-        plt.tight_layout()
-        
-        # Save chart
-        chart_path = os.path.join(self.reports_dir, f"trend_analysis_{start_date}_to_{end_date}.png")
-        plt.savefig(chart_path, dpi=300, bbox_inches='tight')
-        plt.close()
+        hourly_df = self._read_report_query(conn, hourly_query, RAW_HOURLY_QUERY, start_date, end_date)
         
         conn.close()
         
-        return {
+        self._report_progress(progress, 40, "Rendering charts...")
+        
+        # Create comprehensive visualization
+        with _render_lock:
+            fig = Figure(figsize=(15, 12))
+            ((ax1, ax2), (ax3, ax4)) = fig.subplots(2, 2)
+        
+            # Registration trend
+            if not trend_df.empty:
+                ax1.plot(trend_df['date'], trend_df['daily_registrations'], marker='o', color='blue', linewidth=2)
+                ax1.set_title('Daily Registration Trend', fontsize=12, fontweight='bold')
+                ax1.set_xlabel('Date')
+                ax1.set_ylabel('Registrations')
+                ax1.grid(True, alpha=0.3)
+                plt.setp(ax1.xaxis.get_majorticklabels(), rotation=45)
+            
+                # Cumulative trend
+                ax2.plot(trend_df['date'], trend_df['cumulative_registrations'], marker='s', color='green', linewidth=2)
+                ax2.set_title('Cumulative Registrations', fontsize=12, fontweight='bold')
+                ax2.set_xlabel('Date')
+                ax2.set_ylabel('Total Registrations')
+                ax2.grid(True, alpha=0.3)
+                plt.setp(ax2.xaxis.get_majorticklabels(), rotation=45)
+        
+            # Status distribution
+            if not status_df.empty:
+                ax3.bar(status_df['registration_status'], status_df['count'], color=['#28a745', '#ffc107', '#dc3545'])
+                ax3.set_title('Registration Status Distribution', fontsize=12, fontweight='bold')
+                ax3.set_xlabel('Status')
+                ax3.set_ylabel('Count')
+                ax3.tick_params(axis='x', rotation=45)
+        
+            if not hourly_df.empty:
+                ax4.bar(hourly_df['hour'], hourly_df['activity_count'], color='orange', alpha=0.7)
+                ax4.set_title('Hourly Activity Pattern', fontsize=12, fontweight='bold')
+                ax4.set_xlabel('Hour of Day')
+                ax4.set_ylabel('Activity Count')
+        
+            fig.tight_layout()
+        
+            # Save chart
+            chart_path = os.path.join(self.reports_dir, f"trend_analysis_{start_date}_to_{end_date}.png")
+            fig.savefig(chart_path, dpi=300, bbox_inches='tight')
+        
+        self._report_progress(progress, 90, "Chart saved")
+        
+        report_data = {
             'trend_data': trend_df,
             'status_data': status_df,
             'hourly_data': hourly_df,
             'chart_path': chart_path
         }
+        self.cache.put('trend_analysis', params, data_version, report_data)
+        return report_data
     
-    def generate_comprehensive_dashboard(self):
+    def generate_comprehensive_dashboard(self, progress=None):
         """Generate a comprehensive dashboard with multiple metrics"""
+        self._report_progress(progress, 5, "Querying system statistics...")
         conn = self.get_connection()
         
-        # Overall statistics
+        # "Today" figures change at midnight even when the data does not
+        params = (datetime.now().strftime('%Y-%m-%d'),)
+        data_version, cached = self._cached_report(conn, 'comprehensive_dashboard', params, progress)
+        if cached is not None:
+            return cached
+        
+        # Overall statistics - from the trigger-maintained counters when available
+        counters = get_dashboard_counters(conn)
+        
         stats_query = """
         SELECT 
             (SELECT COUNT(*) FROM students) as total_students,
@@ -196,10 +316,20 @@ class AdvancedReports:
             (SELECT COUNT(*) FROM gadgets WHERE status = 'checked_in') as gadgets_in_campus,
             (SELECT COUNT(*) FROM gadgets WHERE registration_status = 'approved') as approved_gadgets,
             (SELECT COUNT(*) FROM gadgets WHERE registration_status = 'pending') as pending_gadgets,
-            (SELECT COUNT(*) FROM check_records WHERE DATE(check_in_time) = DATE('now')) as today_activities
+            (SELECT COUNT(*) FROM check_records WHERE DATE(check_in_time) = DATE('now', 'localtime')) as today_activities
         """
         
-        stats = pd.read_sql_query(stats_query, conn).iloc[0]
+        if counters:
+            stats = pd.Series({
+                'total_students': counters['total_students'],
+                'total_gadgets': counters['total_gadgets'],
+                'gadgets_in_campus': counters['gadgets_in_campus'],
+                'approved_gadgets': counters['approved_gadgets'],
+                'pending_gadgets': counters['pending_gadgets'],
+                'today_activities': counters['today_activity']
+            })
+        else:
+            stats = pd.read_sql_query(stats_query, conn).iloc[0]
         
         # Top students with most gadgets
         top_students_query = """
@@ -231,64 +361,77 @@ class AdvancedReports:
         
         brand_popularity = pd.read_sql_query(brand_query, conn)
         
-        # Create dashboard visualization
-        fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(16, 12))
-        
-        # Statistics summary
-        stats_labels = ['Total Students', 'Total Gadgets', 'In Campus', 'Approved', 'Pending', "Today's Activity"]
-        stats_values = [stats['total_students'], stats['total_gadgets'], stats['gadgets_in_campus'], 
-                       stats['approved_gadgets'], stats['pending_gadgets'], stats['today_activities']]
-        
-        bars = ax1.bar(stats_labels, stats_values, color=sns.color_palette("Set2"))
-        ax1.set_title('System Overview Statistics', fontsize=14, fontweight='bold')
-        ax1.tick_params(axis='x', rotation=45)
-        
-        # Add value labels on bars
-        for bar, value in zip(bars, stats_values):
-            ax1.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.1, 
-                    int(value), ha='center', va='bottom', fontweight='bold')
-        
-        # Top students
-        if not top_students.empty:
-            ax2.barh(top_students['full_name'], top_students['gadget_count'], color='lightblue')
-            ax2.set_title('Top Students by Gadget Count', fontsize=14, fontweight='bold')
-            ax2.set_xlabel('Number of Gadgets')
-        
-        # Brand popularity
-        if not brand_popularity.empty:
-            ax3.bar(brand_popularity['brand'], brand_popularity['count'], color='lightgreen')
-            ax3.set_title('Top Gadget Brands', fontsize=14, fontweight='bold')
-            ax3.set_xlabel('Brand')
-            ax3.set_ylabel('Count')
-            ax3.tick_params(axis='x', rotation=45)
-        
-        # Registration status pie chart
-        status_counts = [stats['approved_gadgets'], stats['pending_gadgets']]
-        status_labels = ['Approved', 'Pending']
-        ax4.pie(status_counts, labels=status_labels, autopct='%1.1f%%', startangle=90)
-        ax4.set_title('Registration Status Distribution', fontsize=14, fontweight='bold')
-        
-        plt.tight_layout()
-        
-        # Save dashboard
-        dashboard_path = os.path.join(self.reports_dir, f"comprehensive_dashboard_{datetime.now().strftime('%Y%m%d')}.png")
-        plt.savefig(dashboard_path, dpi=300, bbox_inches='tight')
-        plt.close()
-        
         conn.close()
         
-        return {
+        self._report_progress(progress, 40, "Rendering dashboard...")
+        
+        # Create dashboard visualization
+        with _render_lock:
+            fig = Figure(figsize=(16, 12))
+            ((ax1, ax2), (ax3, ax4)) = fig.subplots(2, 2)
+        
+            # Statistics summary
+            stats_labels = ['Total Students', 'Total Gadgets', 'In Campus', 'Approved', 'Pending', "Today's Activity"]
+            stats_values = [stats['total_students'], stats['total_gadgets'], stats['gadgets_in_campus'], 
+                           stats['approved_gadgets'], stats['pending_gadgets'], stats['today_activities']]
+        
+            bars = ax1.bar(stats_labels, stats_values, color=sns.color_palette("Set2"))
+            ax1.set_title('System Overview Statistics', fontsize=14, fontweight='bold')
+            ax1.tick_params(axis='x', rotation=45)
+        
+            # Add value labels on bars
+            for bar, value in zip(bars, stats_values):
+                ax1.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.1, 
+                        int(value), ha='center', va='bottom', fontweight='bold')
+        
+            # Top students
+            if not top_students.empty:
+                ax2.barh(top_students['full_name'], top_students['gadget_count'], color='lightblue')
+                ax2.set_title('Top Students by Gadget Count', fontsize=14, fontweight='bold')
+                ax2.set_xlabel('Number of Gadgets')
+        
+            # Brand popularity
+            if not brand_popularity.empty:
+                ax3.bar(brand_popularity['brand'], brand_popularity['count'], color='lightgreen')
+                ax3.set_title('Top Gadget Brands', fontsize=14, fontweight='bold')
+                ax3.set_xlabel('Brand')
+                ax3.set_ylabel('Count')
+                ax3.tick_params(axis='x', rotation=45)
+        
+            # Registration status pie chart
+            status_counts = [stats['approved_gadgets'], stats['pending_gadgets']]
+            status_labels = ['Approved', 'Pending']
+            ax4.pie(status_counts, labels=status_labels, autopct='%1.1f%%', startangle=90)
+            ax4.set_title('Registration Status Distribution', fontsize=14, fontweight='bold')
+        
+            fig.tight_layout()
+        
+            # Save dashboard
+            dashboard_path = os.path.join(self.reports_dir, f"comprehensive_dashboard_{datetime.now().strftime('%Y%m%d')}.png")
+            fig.savefig(dashboard_path, dpi=300, bbox_inches='tight')
+        
+        self._report_progress(progress, 90, "Dashboard saved")
+        
+        report_data = {
             'statistics': stats.to_dict(),
             'top_students': top_students,
             'brand_popularity': brand_popularity,
             'dashboard_path': dashboard_path
         }
+        self.cache.put('comprehensive_dashboard', params, data_version, report_data)
+        return report_data
     
-    def generate_student_activity_report(self, registration_number=None):
+    def generate_student_activity_report(self, registration_number=None, progress=None):
         """Generate individual student activity report"""
+        self._report_progress(progress, 5, "Querying student records...")
         conn = self.get_connection()
         
         if registration_number:
+            params = (registration_number,)
+            data_version, cached = self._cached_report(conn, 'student_activity', params, progress)
+            if cached is not None:
+                return cached
+            
             # Specific student report
             student_query = """
             SELECT 
@@ -325,37 +468,62 @@ class AdvancedReports:
                 
                 gadgets_data = pd.read_sql_query(student_gadgets_query, conn, params=(registration_number,))
                 
+                conn.close()
+                
+                self._report_progress(progress, 40, "Rendering charts...")
+                
                 # Create student report visualization
-                fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 6))
+                with _render_lock:
+                    fig = Figure(figsize=(12, 6))
+                    (ax1, ax2) = fig.subplots(1, 2)
                 
-                # Gadget status
-                status_counts = gadgets_data['registration_status'].value_counts()
-                ax1.pie(status_counts.values, labels=status_counts.index, autopct='%1.1f%%', startangle=90)
-                ax1.set_title('Gadget Registration Status', fontweight='bold')
+                    # Gadget status
+                    status_counts = gadgets_data['registration_status'].value_counts()
+                    ax1.pie(status_counts.values, labels=status_counts.index, autopct='%1.1f%%', startangle=90)
+                    ax1.set_title('Gadget Registration Status', fontweight='bold')
                 
-                # Gadget types
-                type_counts = gadgets_data['gadget_type'].value_counts()
-                ax2.bar(type_counts.index, type_counts.values, color=sns.color_palette("Set3"))
-                ax2.set_title('Gadget Types', fontweight='bold')
-                ax2.tick_params(axis='x', rotation=45)
+                    # Gadget types
+                    type_counts = gadgets_data['gadget_type'].value_counts()
+                    ax2.bar(type_counts.index, type_counts.values, color=sns.color_palette("Set3"))
+                    ax2.set_title('Gadget Types', fontweight='bold')
+                    ax2.tick_params(axis='x', rotation=45)
                 
-                plt.tight_layout()
+                    fig.tight_layout()
                 
-                chart_path = os.path.join(self.reports_dir, f"student_report_{registration_number}.png")
-                plt.savefig(chart_path, dpi=300, bbox_inches='tight')
-                plt.close()
+                    chart_path = os.path.join(self.reports_dir, f"student_report_{registration_number}.png")
+                    fig.savefig(chart_path, dpi=300, bbox_inches='tight')
                 
-                return {
+                self._report_progress(progress, 90, "Chart saved")
+                
+                report_data = {
                     'student_info': student_data.iloc[0].to_dict(),
                     'gadgets_list': gadgets_data,
                     'chart_path': chart_path
                 }
+                self.cache.put('student_activity', params, data_version, report_data)
+                return report_data
         
         conn.close()
         return None
     
-    def export_report_to_pdf(self, report_data, report_type, filename=None):
+    def export_report_to_pdf(self, report_data, report_type, filename=None, progress=None):
         """Export report to PDF format"""
+        cache_key = report_data.get('cache_key')
+        if not filename and cache_key:
+            cached_pdf = self.cache.get_pdf(cache_key, report_type)
+            if cached_pdf:
+                self._report_progress(progress, 100, "PDF loaded from report cache")
+                return cached_pdf
+        
+        self._report_progress(progress, 92, "Building PDF...")
+        
+        # reportlab is only needed here; importing it lazily keeps it out of startup
+        from reportlab.lib.pagesizes import A4
+        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
+        from reportlab.lib.styles import getSampleStyleSheet
+        from reportlab.lib import colors
+        from reportlab.lib.units import inch
+        
         if not filename:
             filename = f"{report_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
         
@@ -401,6 +569,9 @@ class AdvancedReports:
                 story.append(Spacer(1, 12))
         
         doc.build(story)
+        if cache_key:
+            self.cache.put_pdf(cache_key, report_type, filepath)
+        self._report_progress(progress, 100, "PDF saved")
         return filepath
     
     def get_available_reports(self):
@@ -0,0 +1,197 @@
+import sqlite3
+import sys
+from datetime import date, timedelta
+
+from config import Config
+from archive import check_records_source
+
+# Pre-aggregated counts for the activity and trend reports, so a report
+# reads a few rows per day in its range instead of grouping raw history:
+#
+#   check_activity_hourly       per (day, hour, status, gadget type)
+#   gadget_registrations_daily  per (day, gadget type, registration status)
+#
+# Triggers keep both current as rows are written. rebuild_rollups() is the
+# catch-up job: it recomputes a date range from the raw tables (archived
+# months included), for rows written before the triggers existed or changed
+# behind their back. Archiving check_records does not touch the rollups.
+
+ROLLUP_TRIGGERS = [
+    '''
+    CREATE TRIGGER IF NOT EXISTS rollup_check_record_insert AFTER INSERT ON check_records
+    WHEN DATE(COALESCE(new.check_in_time, new.check_out_time)) IS NOT NULL
+    BEGIN
+        INSERT INTO check_activity_hourly (activity_date, hour, status, gadget_type, activity_count)
+        VALUES (
+            DATE(COALESCE(new.check_in_time, new.check_out_time)),
+            strftime('%H', COALESCE(new.check_in_time, new.check_out_time)),
+            new.status,
+            COALESCE((SELECT gadget_type FROM gadgets WHERE id = new.gadget_id), 'Unknown'),
+            1
+        )
+        ON CONFLICT(activity_date, hour, status, gadget_type)
+        DO UPDATE SET activity_count = activity_count + 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS rollup_gadget_insert AFTER INSERT ON gadgets
+    WHEN DATE(new.created_at) IS NOT NULL
+    BEGIN
+        INSERT INTO gadget_registrations_daily (registration_date, gadget_type, registration_status, registration_count)
+        VALUES (DATE(new.created_at), new.gadget_type, COALESCE(new.registration_status, 'pending'), 1)
+        ON CONFLICT(registration_date, gadget_type, registration_status)
+        DO UPDATE SET registration_count = registration_count + 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS rollup_gadget_update
+    AFTER UPDATE OF created_at, gadget_type, registration_status ON gadgets
+    BEGIN
+        UPDATE gadget_registrations_daily SET registration_count = registration_count - 1
+        WHERE registration_date = DATE(old.created_at) AND gadget_type = old.gadget_type
+          AND registration_status = COALESCE(old.registration_status, 'pending');
+        DELETE FROM gadget_registrations_daily
+        WHERE registration_date = DATE(old.created_at) AND gadget_type = old.gadget_type
+          AND registration_status = COALESCE(old.registration_status, 'pending')
+          AND registration_count <= 0;
+        INSERT INTO gadget_registrations_daily (registration_date, gadget_type, registration_status, registration_count)
+        SELECT DATE(new.created_at), new.gadget_type, COALESCE(new.registration_status, 'pending'), 1
+        WHERE DATE(new.created_at) IS NOT NULL
+        ON CONFLICT(registration_date, gadget_type, registration_status)
+        DO UPDATE SET registration_count = registration_count + 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS rollup_gadget_delete AFTER DELETE ON gadgets
+    BEGIN
+        UPDATE gadget_registrations_daily SET registration_count = registration_count - 1
+        WHERE registration_date = DATE(old.created_at) AND gadget_type = old.gadget_type
+          AND registration_status = COALESCE(old.registration_status, 'pending');
+        DELETE FROM gadget_registrations_daily
+        WHERE registration_date = DATE(old.created_at) AND gadget_type = old.gadget_type
+          AND registration_status = COALESCE(old.registration_status, 'pending')
+          AND registration_count <= 0;
+    END
+    ''',
+]
+
+ROLLUP_TABLES = ("check_activity_hourly", "gadget_registrations_daily")
+
+def rollups_exist(conn):
+    """Both rollup tables are present (migration 11 has run on this database)"""
+    row = conn.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name IN (?, ?)", ROLLUP_TABLES
+    ).fetchone()
+    return row[0] == len(ROLLUP_TABLES)
+
+def create_rollups(cursor):
+    """Create the rollup tables and triggers and fill them from the main database.
+
+    Months already moved to archive files are not attached here (a migration
+    runs inside a transaction); run ``python rollups.py --rebuild`` once
+    afterwards to include them.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS check_activity_hourly (
+            activity_date TEXT NOT NULL,
+            hour TEXT NOT NULL,
+            status TEXT NOT NULL,
+            gadget_type TEXT NOT NULL,
+            activity_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (activity_date, hour, status, gadget_type)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS gadget_registrations_daily (
+            registration_date TEXT NOT NULL,
+            gadget_type TEXT NOT NULL,
+            registration_status TEXT NOT NULL,
+            registration_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (registration_date, gadget_type, registration_status)
+        ) WITHOUT ROWID
+    ''')
+    for trigger in ROLLUP_TRIGGERS:
+        cursor.execute(trigger)
+    _refill(cursor, "check_records", "0000-01-01", "9999-12-31")
+
+def _refill(cursor, check_records, start_date, end_date):
+    """Replace the rollup rows for [start_date, end_date] with counts from raw data"""
+    _refill_activity(cursor, check_records, start_date, end_date)
+    _refill_registrations(cursor, start_date, end_date)
+
+def _refill_activity(cursor, check_records, start_date, end_date):
+    cursor.execute("DELETE FROM check_activity_hourly WHERE activity_date BETWEEN ? AND ?",
+                   (start_date, end_date))
+    cursor.execute(f'''
+        INSERT INTO check_activity_hourly (activity_date, hour, status, gadget_type, activity_count)
+        SELECT DATE(COALESCE(check_records.check_in_time, check_records.check_out_time)),
+               strftime('%H', COALESCE(check_records.check_in_time, check_records.check_out_time)),
+               check_records.status,
+               COALESCE(g.gadget_type, 'Unknown'),
+               COUNT(*)
+        FROM {check_records}
+        LEFT JOIN gadgets g ON g.id = check_records.gadget_id
+        WHERE DATE(COALESCE(check_records.check_in_time, check_records.check_out_time)) BETWEEN ? AND ?
+        GROUP BY 1, 2, 3, 4
+    ''', (start_date, end_date))
+
+def _refill_registrations(cursor, start_date, end_date):
+    cursor.execute("DELETE FROM gadget_registrations_daily WHERE registration_date BETWEEN ? AND ?",
+                   (start_date, end_date))
+    cursor.execute('''
+        INSERT INTO gadget_registrations_daily (registration_date, gadget_type, registration_status, registration_count)
+        SELECT DATE(created_at), gadget_type, COALESCE(registration_status, 'pending'), COUNT(*)
+        FROM gadgets
+        WHERE DATE(created_at) BETWEEN ? AND ?
+        GROUP BY 1, 2, 3
+    ''', (start_date, end_date))
+
+def refill_rollups_since(cursor, start_date):
+    """Recompute activity from ``start_date`` on and every registration count.
+
+    For a restored database: the check records replayed onto its backup are
+    all newer than the backup (older months may sit in archives that are not
+    next to the restored file), while replayed gadget updates can move any
+    day's registration counts. Runs in the caller's transaction.
+    """
+    _refill_activity(cursor, "check_records", start_date, "9999-12-31")
+    _refill_registrations(cursor, "0000-01-01", "9999-12-31")
+
+def rebuild_rollups(conn, start_date=None, end_date=None):
+    """Recompute the rollups for a date range (default: all history).
+
+    Reads check_records through the archives as well. Must be called with no
+    transaction open.
+    """
+    with check_records_source(conn, start_date, end_date) as check_records:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            _refill(conn.cursor(), check_records, start_date or "0000-01-01", end_date or "9999-12-31")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+def catch_up_rollups(db_path=None, days=None):
+    """Recompute the last few days of rollups; used by the service scheduler"""
+    days = days or Config.ROLLUP_CATCHUP_DAYS
+    conn = sqlite3.connect(db_path or Config.DATABASE_PATH, timeout=Config.DB_BUSY_TIMEOUT_MS / 1000.0)
+    try:
+        rebuild_rollups(conn, (date.today() - timedelta(days=days)).isoformat(), date.today().isoformat())
+        print(f"✅ Report rollups caught up for the last {days} days")
+    except Exception as e:
+        print(f"❌ Rollup catch-up failed: {e}")
+    finally:
+        conn.close()
+
+# Catch up recent days, or recompute everything: python rollups.py [--rebuild]
+if __name__ == "__main__":
+    if "--rebuild" in sys.argv:
+        conn = sqlite3.connect(Config.DATABASE_PATH)
+        try:
+            rebuild_rollups(conn)
+            print("✅ Report rollups rebuilt from full history")
+        finally:
+            conn.close()
+    else:
+        catch_up_rollups()
@@ -0,0 +1,122 @@
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+from config import Config
+
+# Pre-sized JPEG derivatives of uploaded photos, stored next to the original
+# as <name>_<w>x<h>.jpg, so photo views decode a few KB instead of a full
+# camera image.
+
+PHOTO_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp')
+
+def thumbnail_path(image_path, size):
+    stem = os.path.splitext(image_path)[0]
+    return f"{stem}_{size[0]}x{size[1]}.jpg"
+
+def is_thumbnail(image_path):
+    stem = os.path.splitext(os.path.basename(image_path))[0]
+    return any(stem.endswith(f"_{w}x{h}") for w, h in Config.THUMBNAIL_SIZES)
+
+def best_variant(image_path, size):
+    """Smallest existing derivative covering ``size``, else the original"""
+    for variant_size in sorted(Config.THUMBNAIL_SIZES):
+        if variant_size[0] >= size[0] and variant_size[1] >= size[1]:
+            variant = thumbnail_path(image_path, variant_size)
+            if os.path.exists(variant):
+                return variant
+    return image_path
+
+def generate_thumbnails(image_path, sizes=None):
+    """Write every missing derivative of one photo; returns the paths written"""
+    sizes = sizes or Config.THUMBNAIL_SIZES
+    missing = [size for size in sizes if not os.path.exists(thumbnail_path(image_path, size))]
+    if not missing:
+        return []
+
+    written = []
+    with Image.open(image_path) as original:
+        # Let the JPEG decoder downscale while decoding when it can
+        original.draft('RGB', max(missing))
+        image = ImageOps.exif_transpose(original)
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        # Largest first, so each smaller size resamples an already reduced image
+        for size in sorted(missing, reverse=True):
+            image.thumbnail(size, Image.Resampling.LANCZOS)
+            target = thumbnail_path(image_path, size)
+            tmp_path = target + ".tmp"
+            image.save(tmp_path, 'JPEG', quality=85, optimize=True)
+            os.replace(tmp_path, target)
+            written.append(target)
+    return written
+
+
+class ThumbnailService:
+    """Generates photo derivatives on a small worker pool"""
+
+    def __init__(self, max_workers=None):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or Config.THUMBNAIL_WORKERS,
+                                            thread_name_prefix="thumbnail-worker")
+        self._lock = threading.Lock()
+        self._in_flight = set()
+
+    def submit(self, *image_paths):
+        """Queue derivative generation for photos that exist; returns the futures"""
+        futures = []
+        for image_path in image_paths:
+            if not image_path or not os.path.exists(image_path):
+                continue
+            with self._lock:
+                if image_path in self._in_flight:
+                    continue
+                self._in_flight.add(image_path)
+            futures.append(self._executor.submit(self._run, image_path))
+        return futures
+
+    def _run(self, image_path):
+        try:
+            return generate_thumbnails(image_path)
+        except Exception as e:
+            print(f"⚠️ Thumbnail generation failed for {image_path}: {e}")
+            return []
+        finally:
+            with self._lock:
+                self._in_flight.discard(image_path)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_thumbnail_service():
+    """Shared ThumbnailService for this process"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = ThumbnailService()
+        return _service
+
+def backfill(root):
+    """Generate missing derivatives for every photo under ``root``"""
+    count = 0
+    for directory, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(directory, name)
+            if name.lower().endswith(PHOTO_EXTENSIONS) and not is_thumbnail(path):
+                try:
+                    count += len(generate_thumbnails(path))
+                except Exception as e:
+                    print(f"⚠️ Skipped {path}: {e}")
+    return count
+
+# Backfill existing photos: python thumbnails.py [photo_dir]
+if __name__ == "__main__":
+    root = sys.argv[1] if len(sys.argv) > 1 else Config.PHOTO_STORE_DIR
+    print(f"✅ Generated {backfill(root)} thumbnails under {root}")
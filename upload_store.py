@@ -0,0 +1,144 @@
+import hashlib
+import os
+import sqlite3
+import tempfile
+
+from config import Config
+
+# Content-addressed photo storage. Uploads are spooled to a temp file inside
+# the store while the multipart body is parsed, hashing as they go; keeping
+# one is then a rename into <root>/<aa>/<sha256><ext>, and a photo that is
+# already stored is not written twice.
+
+INCOMING_DIR = ".incoming"
+
+
+class HashingSpoolFile:
+    """Temp file that hashes everything written to it.
+
+    Handed to werkzeug as the target stream for an uploaded part. Unless
+    PhotoStore.commit_spooled() claims it, close() deletes the temp file.
+    """
+
+    def __init__(self, directory):
+        fd, self.path = tempfile.mkstemp(dir=directory, suffix=".part")
+        self._file = os.fdopen(fd, "w+b")
+        self._hash = hashlib.sha256()
+        self.size = 0
+        self.committed = False
+
+    def write(self, data):
+        self._hash.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+        if not self.committed:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    def __getattr__(self, name):
+        # read/seek/tell/flush etc. go to the underlying file
+        return getattr(self._file, name)
+
+
+class PhotoStore:
+    """Stores uploaded photos once, named by their SHA-256"""
+
+    def __init__(self, root=None):
+        self.root = root or Config.PHOTO_STORE_DIR
+        self.incoming_dir = os.path.join(self.root, INCOMING_DIR)
+        os.makedirs(self.incoming_dir, exist_ok=True)
+
+    def spool(self):
+        """New temp file for an upload being received"""
+        return HashingSpoolFile(self.incoming_dir)
+
+    def path_for(self, digest, extension):
+        return os.path.join(self.root, digest[:2], digest + extension.lower())
+
+    def spooled(self, file_storage):
+        """spool() file holding a werkzeug FileStorage upload: its own stream
+        when it came from spool(), otherwise (e.g. the default in-memory
+        spool) a copy"""
+        stream = file_storage.stream
+        if isinstance(stream, HashingSpoolFile):
+            return stream
+        spooled = self.spool()
+        stream.seek(0)
+        for chunk in iter(lambda: stream.read(64 * 1024), b""):
+            spooled.write(chunk)
+        return spooled
+
+    def commit_spooled(self, stream, filename):
+        """Move a spool() file to its content-addressed path.
+
+        Returns the stored path, shared by every upload with the same content.
+        Call it from commit_and_save() on the write queue.
+        """
+        stream.flush()
+        extension = os.path.splitext(filename or "")[1]
+        final_path = self.path_for(stream.hexdigest(), extension)
+
+        if os.path.exists(final_path):
+            # Duplicate photo: reference the copy we already have
+            stream.close()
+            return final_path
+
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        stream._file.close()
+        os.replace(stream.path, final_path)
+        stream.committed = True
+        return final_path
+
+    def commit_and_save(self, conn, uploads, stored, save, *args):
+        """Write-queue job: keep ``uploads`` ({field: (spool file, filename)})
+        and return save(conn, *args, stored) from the same transaction.
+
+        A duplicate photo is only referenced while the write lock is held,
+        so discard_unreferenced (another write-queue job, in this or any
+        other server process) either removed the file first, and the spool
+        is renamed into place instead, or sees the new reference. ``stored``
+        is filled with the kept paths as they are committed, for the caller
+        to discard if the save fails.
+        """
+        for field, (spool, filename) in uploads.items():
+            stored[field] = self.commit_spooled(spool, filename)
+        return save(conn, *args, stored)
+
+    def discard_unreferenced(self, conn, paths):
+        """Delete stored photos that no gadget or web registration references.
+
+        Used when the registration they were kept for fails to save. Run it
+        on the write queue, like commit_and_save(), so no registration can
+        commit a reference to the same (content-addressed) file between the
+        check and the delete.
+        """
+        for path in set(paths):
+            if not self._referenced(conn, path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _referenced(self, conn, path):
+        for table in ("gadgets", "web_registrations"):
+            try:
+                row = conn.execute(f'''
+                    SELECT 1 FROM {table}
+                    WHERE passport_photo = ? OR student_card_photo = ? OR gadget_photo = ?
+                    LIMIT 1
+                ''', (path, path, path)).fetchone()
+            except sqlite3.OperationalError:
+                # web_registrations created without photo columns
+                continue
+            if row is not None:
+                return True
+        return False
@@ -1,11 +1,31 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from flask import Flask, Request, render_template, request, jsonify, Response, stream_with_context
 import sqlite3
-import os
-from datetime import datetime
-import shutil
-from werkzeug.utils import secure_filename
+import json
+import hashlib
+from config import Config
+import db_pool
+from migrate_database import apply_migrations
+from report_cache import get_data_version
+from registration_sync import get_changes
+from upload_store import PhotoStore
+from thumbnails import get_thumbnail_service
+from presence import record_check_event
+from write_queue import get_write_queue
+from registrations import (RegistrationError, PHOTO_FIELDS, REGISTRATION_SUBMITTED, parse_registration_form,
+                           serial_registered, save_registration, validate_api_registration,
+                           save_web_registration, registration_failure_message)
+
+photo_store = PhotoStore()
+
+class UploadRequest(Request):
+    """Request that spools uploaded files straight into the photo store"""
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None,
+                         content_length=None):
+        return photo_store.spool()
 
 app = Flask(__name__)
+app.request_class = UploadRequest
 app.config['SECRET_KEY'] = 'your-secret-key-here'
 app.config['UPLOAD_FOLDER'] = 'web_uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
@@ -17,7 +37,7 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 def get_db_connection():
-    conn = sqlite3.connect('campus_gadgets.db')
+    conn = db_pool.get_connection(Config.DATABASE_PATH)
     conn.row_factory = sqlite3.Row
     return conn
 
@@ -31,18 +51,36 @@ def init_web_database():
         cursor.execute("PRAGMA table_info(gadgets)")
         columns = [column[1] for column in cursor.fetchall()]
         
-        if 'web_registered' not in columns:
+        # Only older gadgets tables lack these; a new database gets the full
+        # base schema from apply_migrations() below
+        if columns and 'web_registered' not in columns:
             cursor.execute("ALTER TABLE gadgets ADD COLUMN web_registered BOOLEAN DEFAULT 0")
         
-        if 'registration_status' not in columns:
+        if columns and 'registration_status' not in columns:
             cursor.execute("ALTER TABLE gadgets ADD COLUMN registration_status TEXT DEFAULT 'pending'")
             
     except Exception as e:
         print(f"Database initialization warning: {e}")
     
     conn.commit()
+    
+    try:
+        apply_migrations(conn)
+    except Exception as e:
+        print(f"Database migration warning: {e}")
+    
     conn.close()
 
+def discard_photos(paths):
+    """Remove photos kept for a registration that was not saved"""
+    paths = list(paths)
+    if not paths:
+        return
+    try:
+        get_write_queue().execute(photo_store.discard_unreferenced, paths)
+    except Exception as e:
+        print(f"⚠️ Could not remove unused photos: {e}")
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -51,131 +89,48 @@ def index():
 def register():
     if request.method == 'POST':
         try:
-            # Get form data
-            student_data = {
-                'full_name': request.form.get('full_name', '').strip(),
-                'registration_number': request.form.get('registration_number', '').strip().upper(),
-                'national_id': request.form.get('national_id', '').strip()
-            }
-            
-            gadget_data = {
-                'gadget_type': request.form.get('gadget_type', '').strip(),
-                'brand': request.form.get('brand', '').strip(),
-                'model': request.form.get('model', '').strip(),
-                'serial_number': request.form.get('serial_number', '').strip(),
-                'color': request.form.get('color', '').strip(),
-                'additional_details': request.form.get('additional_details', '').strip()
-            }
-            
-            # Validate required fields
-            required_student = ['full_name', 'registration_number', 'national_id']
-            required_gadget = ['gadget_type', 'brand', 'model', 'serial_number']
-            
-            for field in required_student:
-                if not student_data[field]:
-                    return jsonify({'success': False, 'message': f'Please fill in {field.replace("_", " ").title()}'})
-            
-            for field in required_gadget:
-                if not gadget_data[field]:
-                    return jsonify({'success': False, 'message': f'Please fill in gadget {field.replace("_", " ").title()}'})
-            
-            conn = get_db_connection()
-            cursor = conn.cursor()
+            student_data, gadget_data = parse_registration_form(request.form)
             
             # Check if serial number already exists
-            cursor.execute("SELECT id FROM gadgets WHERE serial_number = ?", (gadget_data['serial_number'],))
-            if cursor.fetchone():
-                conn.close()
+            conn = get_db_connection()
+            duplicate = serial_registered(conn.cursor(), gadget_data['serial_number'])
+            conn.close()
+            if duplicate:
                 return jsonify({'success': False, 'message': 'This serial number is already registered'})
             
-            # Check if student exists
-            cursor.execute("SELECT id FROM students WHERE registration_number = ?", (student_data['registration_number'],))
-            student = cursor.fetchone()
-            
-            if student:
-                student_id = student[0]
-                # Update student info
-                cursor.execute('''
-                    UPDATE students SET full_name = ?, national_id = ? 
-                    WHERE id = ?
-                ''', (student_data['full_name'], student_data['national_id'], student_id))
-            else:
-                # Create new student
-                cursor.execute('''
-                    INSERT INTO students (full_name, registration_number, national_id)
-                    VALUES (?, ?, ?)
-                ''', (student_data['full_name'], student_data['registration_number'], student_data['national_id']))
-                student_id = cursor.lastrowid
-            
-            # Handle file uploads
-            photos_dir = "student_photos"
-            os.makedirs(photos_dir, exist_ok=True)
-            web_uploads_dir = app.config['UPLOAD_FOLDER']
-            os.makedirs(web_uploads_dir, exist_ok=True)
-            
-            passport_filename = None
-            card_filename = None
-            gadget_filename = None
-            
-            # Process passport photo
-            if 'passport_photo' in request.files:
-                file = request.files['passport_photo']
-                if file and file.filename and allowed_file(file.filename):
-                    filename = secure_filename(f"{student_data['registration_number']}_passport_{datetime.now().strftime('%Y%m%d%H%M%S')}{os.path.splitext(file.filename)[1]}")
-                    file_path = os.path.join(web_uploads_dir, filename)
-                    file.save(file_path)
-                    passport_filename = os.path.join(photos_dir, filename)
-                    shutil.copy2(file_path, passport_filename)
-            
-            # Process student card photo
-            if 'student_card_photo' in request.files:
-                file = request.files['student_card_photo']
+            # Handle file uploads - already spooled into the photo store while
+            # the form was parsed; keeping one is a rename (or a reference to an
+            # identical photo that is already stored)
+            uploads = {}
+            for field in PHOTO_FIELDS:
+                file = request.files.get(field)
                 if file and file.filename and allowed_file(file.filename):
-                    filename = secure_filename(f"{student_data['registration_number']}_card_{datetime.now().strftime('%Y%m%d%H%M%S')}{os.path.splitext(file.filename)[1]}")
-                    file_path = os.path.join(web_uploads_dir, filename)
-                    file.save(file_path)
-                    card_filename = os.path.join(photos_dir, filename)
-                    shutil.copy2(file_path, card_filename)
-            
-            # Process gadget photo
-            if 'gadget_photo' in request.files:
-                file = request.files['gadget_photo']
-                if file and file.filename and allowed_file(file.filename):
-                    filename = secure_filename(f"{student_data['registration_number']}_{gadget_data['serial_number']}_gadget_{datetime.now().strftime('%Y%m%d%H%M%S')}{os.path.splitext(file.filename)[1]}")
-                    file_path = os.path.join(web_uploads_dir, filename)
-                    file.save(file_path)
-                    gadget_filename = os.path.join(photos_dir, filename)
-                    shutil.copy2(file_path, gadget_filename)
-            
-            # Generate record number
-            record_number = f"WEB{datetime.now().strftime('%Y%m%d%H%M%S')}"
+                    uploads[field] = (photo_store.spooled(file), file.filename)
             
-            # Register gadget (pending approval)
-            cursor.execute('''
-                INSERT INTO gadgets (student_id, record_number, gadget_type, brand, model, 
-                                  serial_number, color, additional_details, passport_photo, 
-                                  student_card_photo, gadget_photo, web_registered, registration_status)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (student_id, record_number, gadget_data['gadget_type'], gadget_data['brand'], 
-                  gadget_data['model'], gadget_data['serial_number'], gadget_data['color'],
-                  gadget_data['additional_details'], passport_filename, card_filename, 
-                  gadget_filename, 1, 'pending'))
+            # Keep the photos and register the gadget (pending approval) in one
+            # write, committed with concurrent writes
+            stored_photos = {}
+            try:
+                record_number = get_write_queue().execute(photo_store.commit_and_save, uploads, stored_photos,
+                                                          save_registration, student_data, gadget_data)
+            except Exception:
+                discard_photos(stored_photos.values())
+                raise
+            finally:
+                for spool, _ in uploads.values():
+                    # Deletes the temp file unless the store kept it
+                    spool.close()
             
-            gadget_id = cursor.lastrowid
-            
-            conn.commit()
-            conn.close()
+            get_thumbnail_service().submit(*stored_photos.values())
             
             return jsonify({
                 'success': True, 
-                'message': 'Gadget registration submitted successfully! Your registration is pending approval from campus security.',
+                'message': REGISTRATION_SUBMITTED,
                 'record_number': record_number
             })
             
-        except sqlite3.IntegrityError as e:
-            return jsonify({'success': False, 'message': 'Registration number or serial number already exists'})
         except Exception as e:
-            return jsonify({'success': False, 'message': f'Registration failed: {str(e)}'})
+            return jsonify({'success': False, 'message': registration_failure_message(e)})
     
     return render_template('register.html')
 
@@ -209,12 +164,40 @@ def check_status():
     
     return render_template('status.html')
 
+def _int_arg(name, default=None):
+    try:
+        return int(request.args.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
 @app.route('/api/pending-registrations')
 def get_pending_registrations():
-    """API endpoint for desktop app to get pending registrations"""
+    """API endpoint for desktop app to get pending registrations.
+
+    Keyset-paginated by gadget id: ``since_id`` (exclusive) and ``limit``.
+    The JSON response is a list of rows; when more rows may follow, the
+    ``X-Next-Since-Id`` header carries the cursor for the next page.
+    ``format=ndjson`` (or Accept: application/x-ndjson) streams one JSON
+    object per line instead. Responses carry an ETag derived from the data
+    version, so an unchanged poll with If-None-Match gets 304.
+    """
+    since_id = _int_arg('since_id', 0)
+    limit = _int_arg('limit', Config.API_PAGE_SIZE)
+    limit = max(1, min(limit, Config.API_MAX_PAGE_SIZE))
+    ndjson = (request.args.get('format') == 'ndjson' or
+              request.accept_mimetypes.best == 'application/x-ndjson')
+    
     conn = get_db_connection()
-    cursor = conn.cursor()
     
+    etag_source = f"{get_data_version(conn)}|{since_id}|{limit}|{ndjson}"
+    etag = hashlib.sha1(etag_source.encode()).hexdigest()
+    if request.if_none_match.contains(etag):
+        conn.close()
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    
+    cursor = conn.cursor()
     cursor.execute('''
         SELECT g.id, g.record_number, s.full_name, s.registration_number, 
                g.gadget_type, g.brand, g.model, g.serial_number, g.color,
@@ -223,89 +206,86 @@ def get_pending_registrations():
         FROM gadgets g
         JOIN students s ON g.student_id = s.id
         WHERE g.registration_status = 'pending' AND g.web_registered = 1
-        ORDER BY g.created_at DESC
-    ''')
+          AND g.id > ?
+        ORDER BY g.id
+        LIMIT ?
+    ''', (since_id, limit))
+    
+    if ndjson:
+        def generate():
+            try:
+                while True:
+                    rows = cursor.fetchmany(100)
+                    if not rows:
+                        break
+                    for row in rows:
+                        yield json.dumps(dict(row), default=str) + "\n"
+            finally:
+                conn.close()
+        
+        response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        response.set_etag(etag)
+        return response
     
     pending = [dict(row) for row in cursor.fetchall()]
     conn.close()
     
-    return jsonify(pending)
+    response = jsonify(pending)
+    response.set_etag(etag)
+    if len(pending) == limit:
+        response.headers['X-Next-Since-Id'] = str(pending[-1]['id'])
+    return response
+
+@app.route('/api/registration-changes')
+def get_registration_changes():
+    """Change feed for desktop sync: registrations changed after ``cursor``"""
+    since_seq = _int_arg('cursor', 0)
+    limit = _int_arg('limit', Config.API_PAGE_SIZE)
+    limit = max(1, min(limit, Config.API_MAX_PAGE_SIZE))
+    
+    conn = get_db_connection()
+    try:
+        return jsonify(get_changes(conn, since_seq, limit))
+    finally:
+        conn.close()
+
+def _approve_gadget(cursor, gadget_id):
+    """Mark a registration approved and create its initial check-in record"""
+    cursor.execute('''
+        UPDATE gadgets SET registration_status = 'approved' 
+        WHERE id = ?
+    ''', (gadget_id,))
+    
+    # Stamped now, like every other event; not backdated to created_at
+    if cursor.rowcount:
+        record_check_event(cursor, gadget_id, 'checked_in')
+
+def _reject_gadget(cursor, gadget_id):
+    cursor.execute('''
+        UPDATE gadgets SET registration_status = 'rejected' 
+        WHERE id = ?
+    ''', (gadget_id,))
+
+BATCH_ACTIONS = {'approve': _approve_gadget, 'reject': _reject_gadget}
 
 @app.route('/api/approve-registration/<int:gadget_id>', methods=['POST'])
 def approve_registration(gadget_id):
     """API endpoint for desktop app to approve a registration"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     try:
-        # Update registration status
-        cursor.execute('''
-            UPDATE gadgets SET registration_status = 'approved' 
-            WHERE id = ?
-        ''', (gadget_id,))
-        
-        # Create initial check-in record
-        cursor.execute('''
-            INSERT INTO check_records (gadget_id, check_in_time, status)
-            SELECT id, created_at, 'checked_in' FROM gadgets WHERE id = ?
-        ''', (gadget_id,))
-        
-        conn.commit()
-        conn.close()
-        
+        get_write_queue().execute(lambda conn: _approve_gadget(conn.cursor(), gadget_id))
         return jsonify({'success': True, 'message': 'Registration approved successfully'})
         
     except Exception as e:
-        conn.rollback()
-        conn.close()
         return jsonify({'success': False, 'message': str(e)})
-# Add these routes to your existing web_server.py
-
-
 
 @app.route('/api/register', methods=['POST'])
 def register_gadget():
     """API endpoint for web form submissions"""
     try:
         data = request.get_json()
+        validate_api_registration(data)
         
-        # Validate required fields
-        required_fields = ['student_name', 'registration_number', 'national_id', 
-                          'gadget_type', 'brand', 'model', 'serial_number']
-        
-        for field in required_fields:
-            if not data.get(field) or not str(data[field]).strip():
-                return jsonify({'error': f'Missing required field: {field}'}), 400
-        
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Check for duplicates
-        cursor.execute('SELECT id FROM web_registrations WHERE serial_number = ?', (data['serial_number'],))
-        if cursor.fetchone():
-            conn.close()
-            return jsonify({'error': 'Serial number already registered'}), 400
-        
-        # Insert registration
-        cursor.execute('''
-            INSERT INTO web_registrations 
-            (student_name, registration_number, national_id, gadget_type, brand, model, serial_number, color, additional_details)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            data['student_name'].strip(),
-            data['registration_number'].strip(),
-            data['national_id'].strip(),
-            data['gadget_type'].strip(),
-            data['brand'].strip(),
-            data['model'].strip(),
-            data['serial_number'].strip(),
-            data.get('color', '').strip(),
-            data.get('additional_details', '').strip()
-        ))
-        
-        record_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        record_id = get_write_queue().execute(save_web_registration, data)
         
         return jsonify({
             'success': True,
@@ -313,73 +293,87 @@ def register_gadget():
             'id': record_id
         }), 200
         
+    except RegistrationError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Registration failed: {str(e)}'}), 500
+
 @app.route('/api/reject-registration/<int:gadget_id>', methods=['POST'])
 def reject_registration(gadget_id):
     """API endpoint for desktop app to reject a registration"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     try:
-        cursor.execute('''
-            UPDATE gadgets SET registration_status = 'rejected' 
-            WHERE id = ?
-        ''', (gadget_id,))
-        
-        conn.commit()
-        conn.close()
-        
+        get_write_queue().execute(lambda conn: _reject_gadget(conn.cursor(), gadget_id))
         return jsonify({'success': True, 'message': 'Registration rejected'})
         
     except Exception as e:
-        conn.rollback()
-        conn.close()
         return jsonify({'success': False, 'message': str(e)})
 
-# web_server.py - PRODUCTION VERSION
-from flask import Flask, request, jsonify, render_template
-import sqlite3
-import os
-from datetime import datetime
-from flask_cors import CORS  # Add this import
-
-app = Flask(__name__)
-CORS(app)  # Enable Cross-Origin Requests
-
-# Use environment variable for database or default
-DB_PATH = os.environ.get('DATABASE_URL', 'campus_gadgets_online.db')
-
-def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-@app.route('/')
-def index():
-    return render_template('index.html')  # You'll create this
-
-@app.route('/api/register', methods=['POST'])
-def register_gadget():
-    # Your existing registration logic
-    pass
-
-@app.route('/api/pending-registrations', methods=['GET'])
-def get_pending_registrations():
-    # Your existing pending registrations logic
-    pass
+def _apply_batch(conn, action, ids):
+    """Run a batch action on the writer connection; returns a result per id"""
+    cursor = conn.cursor()
+    results = []
+    for gadget_id in ids:
+        try:
+            gadget_id = int(gadget_id)
+        except (TypeError, ValueError):
+            results.append({'id': gadget_id, 'success': False, 'message': 'Invalid id'})
+            continue
+        
+        cursor.execute("SELECT registration_status FROM gadgets WHERE id = ?", (gadget_id,))
+        row = cursor.fetchone()
+        if row is None:
+            results.append({'id': gadget_id, 'success': False, 'message': 'Registration not found'})
+            continue
+        if row['registration_status'] != 'pending':
+            results.append({'id': gadget_id, 'success': False,
+                            'message': f"Already {row['registration_status']}"})
+            continue
+        
+        cursor.execute("SAVEPOINT batch_item")
+        try:
+            action(cursor, gadget_id)
+            cursor.execute("RELEASE SAVEPOINT batch_item")
+            results.append({'id': gadget_id, 'success': True})
+        except sqlite3.Error as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT batch_item")
+            cursor.execute("RELEASE SAVEPOINT batch_item")
+            results.append({'id': gadget_id, 'success': False, 'message': str(e)})
+    return results
 
-# Add security middleware
-@app.after_request
-def after_request(response):
-    response.headers.add('Access-Control-Allow-Origin', '*')
-    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
-    response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
-    return response
+@app.route('/api/registrations/batch', methods=['POST'])
+def batch_registrations():
+    """Approve or reject many registrations in one group commit.
 
-if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=False)
+    Body: {"action": "approve" | "reject", "ids": [gadget_id, ...]}. Each id
+    runs under its own savepoint, so one failure does not undo the others;
+    the response lists a result per id.
+    """
+    data = request.get_json(silent=True) or {}
+    action = BATCH_ACTIONS.get(data.get('action'))
+    ids = data.get('ids')
+    
+    if action is None:
+        return jsonify({'success': False, 'message': "action must be 'approve' or 'reject'"}), 400
+    if not isinstance(ids, list) or not ids:
+        return jsonify({'success': False, 'message': 'ids must be a non-empty list'}), 400
+    if len(ids) > Config.API_MAX_BATCH_SIZE:
+        return jsonify({'success': False,
+                        'message': f'At most {Config.API_MAX_BATCH_SIZE} ids per batch'}), 400
+    
+    try:
+        results = get_write_queue().execute(_apply_batch, action, ids)
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+    
+    succeeded = sum(1 for result in results if result['success'])
+    return jsonify({
+        'success': True,
+        'processed': succeeded,
+        'failed': len(results) - succeeded,
+        'results': results
+    })
 
+# Development server only; production runs through production_server.py
 if __name__ == '__main__':
     init_web_database()
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    app.run(debug=True, host=Config.WEB_HOST, port=Config.WEB_PORT)
@@ -0,0 +1,128 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from config import Config
+import db_pool
+
+# Group commit. Every write used to commit its own transaction, paying for
+# a WAL sync and a round on SQLite's write lock each time. Writes submitted
+# here are applied by one writer thread instead: it takes the first pending
+# write, keeps collecting for Config.WRITE_BATCH_WINDOW_MS (or until
+# WRITE_BATCH_MAX writes), and applies them all in one transaction with a
+# savepoint per write, so one failing write does not undo the others. Each
+# caller gets its own result (or exception) once the transaction commits.
+
+class WriteQueueFull(Exception):
+    """More than Config.WRITE_QUEUE_MAX writes are waiting"""
+
+
+class GroupCommitQueue:
+    """Single writer thread applying queued writes in shared transactions"""
+
+    def __init__(self, db_path=None, window_ms=None, max_batch=None, max_pending=None):
+        self.db_path = db_path or Config.DATABASE_PATH
+        self.window = (Config.WRITE_BATCH_WINDOW_MS if window_ms is None else window_ms) / 1000.0
+        self.max_batch = max_batch or Config.WRITE_BATCH_MAX
+        self._pending = queue.Queue(maxsize=max_pending or Config.WRITE_QUEUE_MAX)
+        self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+        self._thread.start()
+
+    def submit(self, func, *args):
+        """Queue func(conn, *args); returns a Future for its return value.
+
+        ``func`` runs on the writer thread inside the shared transaction and
+        must not commit or roll back. Raises WriteQueueFull when the queue is
+        at capacity.
+        """
+        future = Future()
+        try:
+            self._pending.put_nowait((func, args, future))
+        except queue.Full:
+            raise WriteQueueFull(f"{self._pending.maxsize} writes already pending")
+        return future
+
+    def execute(self, func, *args):
+        """Run func(conn, *args) in the next group commit and wait for its result"""
+        return self.submit(func, *args).result()
+
+    def close(self):
+        """Apply what is already queued, then stop the writer thread"""
+        self._pending.put(None)
+        self._thread.join()
+
+    def _collect(self):
+        """Next batch of writes, or None once close() was called"""
+        first = self._pending.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._pending.get(timeout=remaining) if remaining > 0 else self._pending.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Stop after this batch
+                self._pending.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                results = self._apply(batch)
+            except Exception as e:
+                results = [e] * len(batch)
+            for (_, _, future), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def _apply(self, batch):
+        conn = db_pool.get_connection(self.db_path)
+        conn.row_factory = sqlite3.Row
+        results = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for func, args, _ in batch:
+                conn.execute("SAVEPOINT group_write")
+                try:
+                    results.append(func(conn, *args))
+                    conn.execute("RELEASE SAVEPOINT group_write")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO SAVEPOINT group_write")
+                    conn.execute("RELEASE SAVEPOINT group_write")
+                    results.append(e)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return results
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+def get_write_queue(db_path=None):
+    """Shared group-commit queue for a database file (Config.DATABASE_PATH by default)"""
+    key = os.path.abspath(db_path or Config.DATABASE_PATH)
+    with _queues_lock:
+        if key not in _queues:
+            _queues[key] = GroupCommitQueue(key)
+        return _queues[key]